@@ -0,0 +1,156 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from classifier import MSG_TYPES
+
+# Mensagens que fecham uma operação; STOP é a única perdedora
+RESULT_TYPES = ['WIN', 'WIN_G1', 'WIN_G2', 'STOP']
+_RESULT_CODES = [MSG_TYPES.index(tipo) for tipo in RESULT_TYPES]
+_STOP_CODE = MSG_TYPES.index('STOP')
+
+# Nome do "par" quando todas as operações são analisadas juntas
+ALL_PAIRS = 'Todos'
+
+
+def result_events(df_classified, by_pair=True):
+    """Operações finalizadas do frame classificado: colunas `par`, `data`, `win`.
+
+    Cada mensagem WIN/WIN_G1/WIN_G2/STOP é uma operação. As linhas saem
+    ordenadas por par e data (empates na ordem do frame), que é a ordem que
+    as outras funções do módulo esperam. Com `by_pair=False`, todas as
+    operações ficam no par ALL_PAIRS.
+    """
+    codigos = df_classified['msg_type'].astype(pd.CategoricalDtype(MSG_TYPES)).cat.codes.to_numpy()
+    mascara = np.isin(codigos, _RESULT_CODES)
+    datas = df_classified['data'].to_numpy()[mascara]
+    win = codigos[mascara] != _STOP_CODE
+
+    if by_pair:
+        par = df_classified['par']
+        if not isinstance(par.dtype, pd.CategoricalDtype):
+            par = par.astype('category')
+        categorias, pares = par.cat.categories, par.cat.codes.to_numpy()[mascara]
+    else:
+        categorias, pares = pd.Index([ALL_PAIRS]), np.zeros(len(datas), dtype=np.int8)
+    ordem = np.lexsort((datas, pares))
+    return pd.DataFrame({
+        'par': pd.Categorical.from_codes(pares[ordem], categorias),
+        'data': datas[ordem],
+        'win': win[ordem],
+    })
+
+
+def _group_starts(pares):
+    """Posição da primeira linha do grupo (par) de cada linha."""
+    posicoes = np.arange(len(pares))
+    inicio = np.ones(len(pares), dtype=bool)
+    inicio[1:] = pares[1:] != pares[:-1]
+    return np.maximum.accumulate(np.where(inicio, posicoes, 0))
+
+
+def rolling_assertiveness(eventos, window, min_periods=None):
+    """Assertividade móvel por par, em uma passada de somas acumuladas.
+
+    `window` inteiro usa as últimas N operações do par; um Timedelta (ou
+    texto como '24h') usa as operações do par no intervalo (data - window,
+    data]. Retorna `par`, `data`, `trades`, `wins` e `assertividade` por
+    operação; a assertividade fica NaN com menos de `min_periods` operações
+    na janela (padrão: N para janelas de operações, 1 para de tempo).
+    """
+    pares = eventos['par'].cat.codes.to_numpy()
+    posicoes = np.arange(len(eventos))
+    if isinstance(window, (int, np.integer)):
+        inicios = np.maximum(posicoes - window + 1, _group_starts(pares))
+        min_periods = window if min_periods is None else min_periods
+    else:
+        # Chave única em segundos: cada par fica num trecho separado da reta,
+        # então uma busca binária acha o início da janela sem cruzar pares
+        janela = int(pd.Timedelta(window).total_seconds())
+        segundos = eventos['data'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        if len(segundos):
+            segundos = segundos - segundos.min()
+        passo = (int(segundos.max()) if len(segundos) else 0) + janela + 1
+        chave = segundos + pares.astype(np.int64) * passo
+        inicios = np.searchsorted(chave, chave - janela, side='right')
+        min_periods = 1 if min_periods is None else min_periods
+
+    acumulado = np.concatenate([[0], np.cumsum(eventos['win'].to_numpy(), dtype=np.int64)])
+    wins = acumulado[posicoes + 1] - acumulado[inicios]
+    operacoes = posicoes + 1 - inicios
+    assertividade = np.where(operacoes >= min_periods, wins / np.maximum(operacoes, 1) * 100, np.nan)
+    return pd.DataFrame({
+        'par': eventos['par'].to_numpy(),
+        'data': eventos['data'].to_numpy(),
+        'trades': operacoes,
+        'wins': wins,
+        'assertividade': assertividade,
+    })
+
+
+def streak_runs(eventos):
+    """Sequências de WINs ou STOPs seguidos de cada par (run-length encoding).
+
+    Retorna uma linha por sequência: `par`, `outcome` (WIN ou STOP),
+    `length`, `start` e `end` (datas da primeira e da última operação).
+    """
+    pares = eventos['par'].cat.codes.to_numpy()
+    win = eventos['win'].to_numpy()
+    datas = eventos['data'].to_numpy()
+    quebra = np.ones(len(eventos), dtype=bool)
+    quebra[1:] = (pares[1:] != pares[:-1]) | (win[1:] != win[:-1])
+    inicios = np.flatnonzero(quebra)
+    fins = np.append(inicios[1:], len(eventos))
+    return pd.DataFrame({
+        'par': eventos['par'].to_numpy()[inicios],
+        'outcome': np.where(win[inicios], 'WIN', 'STOP'),
+        'length': fins - inicios,
+        'start': datas[inicios],
+        'end': datas[fins - 1],
+    })
+
+
+def longest_streaks(runs):
+    """Maior sequência de WINs e de STOPs por par (colunas WIN e STOP)."""
+    maiores = runs.groupby(['par', 'outcome'], observed=True)['length'].max().unstack(fill_value=0)
+    return maiores.reindex(columns=['WIN', 'STOP'], fill_value=0).astype('int64').sort_index()
+
+
+def time_between_stops(eventos):
+    """Intervalo entre STOPs seguidos do mesmo par: `par`, `data` (do STOP) e `intervalo`."""
+    stops = eventos[~eventos['win'].to_numpy()]
+    pares = stops['par'].cat.codes.to_numpy()
+    datas = stops['data'].to_numpy()
+    mesmo_par = pares[1:] == pares[:-1]
+    return pd.DataFrame({
+        'par': stops['par'].to_numpy()[1:][mesmo_par],
+        'data': datas[1:][mesmo_par],
+        'intervalo': (datas[1:] - datas[:-1])[mesmo_par],
+    })
+
+
+if __name__ == "__main__":
+    # python analytics.py [arquivo.csv] [janela]: janela em operações (50) ou tempo (24h)
+    from store import DATA_FILE, load_classified_csv
+
+    df = load_classified_csv(sys.argv[1] if len(sys.argv) > 1 else DATA_FILE)
+    janela = sys.argv[2] if len(sys.argv) > 2 else '50'
+    janela = int(janela) if janela.isdigit() else janela
+
+    inicio = time.perf_counter()
+    eventos = result_events(df)
+    moveis = rolling_assertiveness(eventos, janela)
+    sequencias = longest_streaks(streak_runs(eventos))
+    intervalos = time_between_stops(eventos)
+    segundos = time.perf_counter() - inicio
+
+    print(f"{len(eventos):,} operações de {len(df):,} mensagens em {segundos:.3f}s")
+    print(f"\nAssertividade móvel ({janela}) na última operação de cada par:")
+    print(moveis.groupby('par', observed=True).last()[['data', 'trades', 'assertividade']].round(1))
+    print("\nMaiores sequências:")
+    print(sequencias)
+    print("\nHoras entre STOPs (quartis):")
+    horas = intervalos['intervalo'].dt.total_seconds() / 3600
+    print(horas.groupby(intervalos['par'], observed=True).quantile([0.25, 0.5, 0.75]).unstack().round(1))
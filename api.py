@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from live import LiveFrame
+from simulation import build_grid, payoff_table
+from store import DATA_FILE
+
+# Endereço do serviço (só local por padrão)
+HOST = '127.0.0.1'
+PORT = 8600
+
+# Respostas guardadas: no máximo CACHE_SIZE, cada uma por até CACHE_TTL segundos
+CACHE_SIZE = 1024
+CACHE_TTL = 30.0
+
+# De quanto em quanto tempo o fim do CSV é lido (LiveFrame.update)
+REFRESH_SECONDS = 2.0
+
+# Cenário da simulação: entrada de $10, gales de 2x e 4x, payout de 90%
+SIMULATION_STAKE, SIMULATION_MULTIPLIER, SIMULATION_PAYOUT = 10, 2, 0.9
+_GANHO_WIN, _GANHO_G1, _GANHO_G2, _PERDA_STOP = payoff_table(
+    build_grid([SIMULATION_STAKE], [SIMULATION_MULTIPLIER], [SIMULATION_PAYOUT]))[0]
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class ApiError(Exception):
+    """Erro do pedido, respondido com `status` e a mensagem em JSON."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _date_param(parametros, nome):
+    valor = parametros.get(nome)
+    if valor is None:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ApiError(400, f"Data inválida em '{nome}': {valor} (use AAAA-MM-DD)")
+
+
+def _filters(parametros):
+    """(início, fim, par, canal) a partir da query string."""
+    canal = parametros.get('channel')
+    if canal is not None:
+        try:
+            canal = int(canal)
+        except ValueError:
+            raise ApiError(400, f"Canal inválido: {canal}")
+    return _date_param(parametros, 'start'), _date_param(parametros, 'end'), parametros.get('pair'), canal
+
+
+def _rate(parte, total):
+    return parte / total * 100 if total > 0 else 0
+
+
+class MetricsService:
+    """Métricas dos acumuladores pré-agregados de um LiveFrame, em JSON.
+
+    Cada resposta fica num cache LRU com validade (CACHE_TTL) cuja chave
+    inclui a revisão dos dados, então mensagens novas invalidam tudo na
+    hora. O ETag é o hash do corpo: um cliente que manda If-None-Match com
+    o ETag atual recebe 304 sem corpo.
+    """
+
+    def __init__(self, path=DATA_FILE, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL):
+        self.live = LiveFrame(path)
+        self.live.update()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.cache = OrderedDict()
+        self.routes = {
+            '/health': self.health,
+            '/metrics': self.metrics,
+            '/pairs': self.pairs,
+            '/daily': self.daily,
+            '/channels': self.channels,
+        }
+
+    def refresh(self):
+        """Lê o que foi acrescentado ao CSV; retorna quantas mensagens entraram."""
+        return self.live.update()
+
+    def _accumulator(self, canal):
+        if canal is None:
+            return self.live.accumulator
+        acumulador = self.live.channels.get(canal)
+        if acumulador is None:
+            raise ApiError(404, f"Canal desconhecido: {canal}")
+        return acumulador
+
+    def health(self, parametros):
+        resumo = self.live.summary()
+        return {
+            'revision': self.live.revision,
+            'messages': resumo['total'],
+            'first_day': resumo['first_day'],
+            'last_day': resumo['last_day'],
+        }
+
+    def metrics(self, parametros):
+        """Métricas gerais do período (e do par/canal), taxas de gale e a simulação de $10."""
+        inicio, fim, par, canal = _filters(parametros)
+        metricas = self._accumulator(canal).metrics(inicio, fim, par)
+        resultado = (metricas['win_direto'] * _GANHO_WIN + metricas['win_g1'] * _GANHO_G1
+                     + metricas['win_g2'] * _GANHO_G2 + metricas['stop_loss'] * _PERDA_STOP)
+        return {
+            'filters': {'start': inicio, 'end': fim, 'pair': par, 'channel': canal},
+            'metrics': metricas,
+            'recovery': {
+                'g1': _rate(metricas['win_g1'], metricas['gale1_calls']),
+                'g2': _rate(metricas['win_g2'], metricas['gale2_calls']),
+                'total': _rate(metricas['win_g1'] + metricas['win_g2'], metricas['gale1_calls']),
+            },
+            'simulation': {
+                'stake': SIMULATION_STAKE,
+                'gale_multiplier': SIMULATION_MULTIPLIER,
+                'payout': SIMULATION_PAYOUT,
+                'result': float(resultado),
+            },
+        }
+
+    def pairs(self, parametros):
+        """Operações, WINs e assertividade por par no período."""
+        inicio, fim, _, canal = _filters(parametros)
+        por_par = self._accumulator(canal).by_pair(inicio, fim)
+        return [
+            {'pair': par, 'total': int(total), 'wins': int(wins), 'assertividade': _rate(wins, total)}
+            for par, total, wins in por_par.itertuples(index=False)
+        ]
+
+    def daily(self, parametros):
+        """Série diária de operações, WINs e assertividade."""
+        inicio, fim, par, canal = _filters(parametros)
+        por_dia = self._accumulator(canal).by_day(inicio, fim, par)
+        return [
+            {'date': dia, 'total_ops': int(total), 'wins': int(wins), 'assertividade': _rate(wins, total)}
+            for dia, total, wins in por_dia.itertuples(index=False)
+        ]
+
+    def channels(self, parametros):
+        """Canais com mensagens e o total de operações de cada um."""
+        inicio, fim, _, _ = _filters(parametros)
+        return [
+            {'channel': canal, 'total_operations': acumulador.metrics(inicio, fim)['total_operations']}
+            for canal, acumulador in self.live.channels.items()
+        ]
+
+    def respond(self, caminho, query, if_none_match=None):
+        """(status, cabeçalhos, corpo) de um GET, usando o cache de respostas."""
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(query).items()}
+        chave = (caminho, tuple(sorted(parametros.items())), self.live.revision)
+        agora = time.monotonic()
+        guardada = self.cache.get(chave)
+        if guardada is not None and guardada[0] > agora:
+            self.cache.move_to_end(chave)
+            status, etag, corpo = guardada[1:]
+        else:
+            status, corpo = 200, None
+            rota = self.routes.get(caminho)
+            try:
+                if rota is None:
+                    raise ApiError(404, f"Caminho desconhecido: {caminho}")
+                dados = rota(parametros)
+            except ApiError as erro:
+                status, dados = erro.status, {'error': str(erro)}
+            corpo = json.dumps(dados, default=str, ensure_ascii=False).encode('utf-8')
+            etag = '"' + hashlib.blake2b(corpo, digest_size=12).hexdigest() + '"'
+            self.cache[chave] = (agora + self.cache_ttl, status, etag, corpo)
+            self.cache.move_to_end(chave)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        cabecalhos = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'ETag': etag,
+            'Cache-Control': f'max-age={int(self.cache_ttl)}',
+        }
+        if status == 200 and if_none_match is not None and etag in [
+                valor.strip() for valor in if_none_match.split(',')]:
+            return 304, cabecalhos, b''
+        return status, cabecalhos, corpo
+
+
+def _http_response(status, cabecalhos, corpo, manter_aberta, enviar_corpo=True):
+    linhas = [f'HTTP/1.1 {status} {_REASONS.get(status, "")}']
+    linhas += [f'{nome}: {valor}' for nome, valor in cabecalhos.items()]
+    linhas.append(f'Content-Length: {len(corpo)}')
+    linhas.append('Connection: keep-alive' if manter_aberta else 'Connection: close')
+    return ('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1') + (corpo if enviar_corpo else b'')
+
+
+async def _handle_connection(service, reader, writer):
+    """Atende os pedidos de uma conexão (HTTP/1.1 com keep-alive)."""
+    try:
+        while True:
+            try:
+                cabecalho = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            linhas = cabecalho.decode('latin-1').split('\r\n')
+            try:
+                metodo, alvo, versao = linhas[0].split(' ')
+            except ValueError:
+                writer.write(_http_response(400, {}, b'', False))
+                break
+            cabecalhos = {}
+            for linha in linhas[1:]:
+                if ':' in linha:
+                    nome, valor = linha.split(':', 1)
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+            conexao = cabecalhos.get('connection', '').lower()
+            manter_aberta = conexao != 'close' if versao == 'HTTP/1.1' else conexao == 'keep-alive'
+
+            if metodo not in ('GET', 'HEAD'):
+                status, extras, corpo = 405, {'Allow': 'GET, HEAD'}, b''
+            else:
+                partes = urlsplit(alvo)
+                status, extras, corpo = service.respond(partes.path, partes.query, cabecalhos.get('if-none-match'))
+            writer.write(_http_response(status, extras, corpo, manter_aberta, metodo != 'HEAD'))
+            await writer.drain()
+            if not manter_aberta:
+                break
+    finally:
+        writer.close()
+
+
+async def _refresh_periodically(service, segundos):
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(segundos)
+        # A leitura do CSV roda fora do loop para não travar os pedidos
+        await loop.run_in_executor(None, service.refresh)
+
+
+async def serve(path=DATA_FILE, host=HOST, port=PORT, refresh_seconds=REFRESH_SECONDS):
+    """Sobe o serviço e atende até ser interrompido."""
+    service = MetricsService(path)
+    servidor = await asyncio.start_server(
+        lambda reader, writer: _handle_connection(service, reader, writer), host, port)
+    print(f"Servindo métricas de {path} em http://{host}:{port} "
+          f"({service.live.summary()['total']:,} mensagens)")
+    atualizacao = asyncio.create_task(_refresh_periodically(service, refresh_seconds))
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        atualizacao.cancel()
+
+
+if __name__ == "__main__":
+    # python api.py [arquivo.csv] [porta]
+    #   GET /metrics?start=2025-09-01&end=2025-09-07&pair=BTC/USDT&channel=-1002836003329
+    #   GET /pairs, /daily, /channels (mesmos filtros), /health
+    caminho = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    porta = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+    try:
+        asyncio.run(serve(caminho, port=porta))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,192 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Tamanhos padrão (linhas da exportação bruta); qualquer tamanho pode ser pedido na linha de comando
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# O classificador mensagem a mensagem é medido em no máximo estas linhas
+SCALAR_ROWS = 200_000
+
+# Onde os resultados são gravados, um JSON por execução
+RESULTS_DIR = 'benchmark_results'
+
+# Diferença de tempo a partir da qual compare() acusa regressão; etapas mais
+# rápidas que MIN_SECONDS nas duas execuções são só ruído e não são acusadas
+REGRESSION_THRESHOLD = 0.10
+MIN_SECONDS = 0.05
+
+# Etapas, na ordem em que rodam (cada uma usa os arquivos das anteriores)
+STAGES = [
+    'generate', 'clean', 'load_csv', 'classify_message', 'classify_frame', 'calculate_metrics',
+    'metrics_accumulator', 'reconstruct_trades', 'store_convert', 'store_read',
+]
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _stage_functions(pasta, n_rows):
+    """(preparo, execução) de cada etapa; só a execução é medida.
+
+    A execução recebe o que o preparo devolveu e retorna quantas linhas
+    processou.
+    """
+    import pandas as pd
+
+    from classifier import classify_frame, classify_message
+    from cleaning import clean_csv
+    from lifecycle import reconstruct_trades
+    from metrics import MetricsAccumulator, calculate_metrics
+    from store import convert_csv_to_store, load_classified_csv, read_store
+    from synthetic import write_csv
+
+    bruto = os.path.join(pasta, 'mensagens.csv')
+    tratado = os.path.join(pasta, 'mensagens_tratadas.csv')
+    store_dir = os.path.join(pasta, 'mensagens_tratadas.parquet')
+
+    def nada():
+        return None
+
+    def classificado():
+        return load_classified_csv(tratado)
+
+    def contar(funcao):
+        def executar(df):
+            funcao(df)
+            return len(df)
+        return executar
+
+    return {
+        'generate': (nada, lambda _: write_csv(bruto, n_rows, raw=True, noise=0.05, seed=0)),
+        'clean': (nada, lambda _: clean_csv(bruto, tratado)['rows_in']),
+        'load_csv': (nada, lambda _: len(load_classified_csv(tratado))),
+        'classify_message': (
+            lambda: pd.read_csv(tratado, usecols=['mensagem'], nrows=SCALAR_ROWS)['mensagem'],
+            contar(lambda mensagens: [classify_message(texto) for texto in mensagens]),
+        ),
+        'classify_frame': (
+            lambda: pd.read_csv(tratado, usecols=['mensagem'])['mensagem'],
+            contar(classify_frame),
+        ),
+        'calculate_metrics': (classificado, contar(calculate_metrics)),
+        'metrics_accumulator': (classificado, contar(MetricsAccumulator.from_frame)),
+        'reconstruct_trades': (classificado, contar(reconstruct_trades)),
+        'store_convert': (nada, lambda _: convert_csv_to_store(tratado, store_dir)),
+        'store_read': (nada, lambda _: len(read_store(
+            store_dir, columns=['id', 'data', 'msg_type', 'par', 'direction', 'result', 'gale_level']))),
+    }
+
+
+def _run_stage(nome, pasta, n_rows):
+    """Roda em um processo novo: tempo, linhas e memória de uma etapa."""
+    preparo, execucao = _stage_functions(pasta, n_rows)[nome]
+    entrada = preparo()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    linhas = execucao(entrada)
+    segundos = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'rows': int(linhas),
+        'seconds': segundos,
+        'rows_per_sec': linhas / segundos if segundos > 0 else None,
+        'peak_rss_mb': pico / 1024,
+        'rss_growth_mb': (pico - base) / 1024,
+    }
+
+
+def _measure(nome, pasta, n_rows):
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '_stage', nome, pasta, str(n_rows)],
+        check=True, capture_output=True, text=True, cwd=_REPO_DIR,
+    ).stdout.strip().splitlines()
+    return json.loads(saida[-1])
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True, capture_output=True,
+                                text=True, cwd=_REPO_DIR).stdout.strip()
+        alterado = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], check=True,
+                                  capture_output=True, text=True, cwd=_REPO_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if alterado else '')
+
+
+def run(sizes=DEFAULT_SIZES, stages=STAGES, output=None):
+    """Mede cada etapa em cada tamanho e grava os resultados em JSON.
+
+    Para cada tamanho, gera uma exportação sintética numa pasta temporária e
+    roda as etapas em sequência, cada uma num processo novo (pico de memória
+    sem interferência das outras). Retorna o caminho do JSON.
+    """
+    resultado = {
+        'commit': _git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': [],
+    }
+    print(f"{'etapa':<22}{'linhas':>12}{'tempo (s)':>11}{'linhas/s':>13}{'pico RSS (MB)':>15}")
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory(prefix='benchmark-') as pasta:
+            for nome in stages:
+                medida = _measure(nome, pasta, n_rows)
+                resultado['results'].append({'stage': nome, 'size': n_rows, **medida})
+                por_segundo = f"{medida['rows_per_sec']:,.0f}" if medida['rows_per_sec'] else '-'
+                print(f"{nome:<22}{medida['rows']:>12,}{medida['seconds']:>11.3f}{por_segundo:>13}"
+                      f"{medida['peak_rss_mb']:>15.1f}")
+
+    if output is None:
+        os.makedirs(os.path.join(_REPO_DIR, RESULTS_DIR), exist_ok=True)
+        carimbo = resultado['created'].replace(':', '').replace('-', '')
+        output = os.path.join(_REPO_DIR, RESULTS_DIR, f"{carimbo}-{resultado['commit'] or 'local'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2)
+    return output
+
+
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Compara duas execuções etapa a etapa; retorna as (etapa, tamanho) que ficaram mais lentas."""
+    with open(old_path, encoding='utf-8') as f:
+        antigo = {(r['stage'], r['size']): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        novo = {(r['stage'], r['size']): r for r in json.load(f)['results']}
+
+    regressoes = []
+    print(f"{'etapa':<22}{'linhas':>12}{'antes (s)':>11}{'depois (s)':>12}{'razão':>8}{'pico RSS (MB)':>22}")
+    for chave in sorted(antigo.keys() & novo.keys(), key=lambda c: (c[1], STAGES.index(c[0]) if c[0] in STAGES else 0)):
+        a, b = antigo[chave], novo[chave]
+        razao = b['seconds'] / a['seconds'] if a['seconds'] > 0 else float('inf')
+        marca = ''
+        if razao > 1 + threshold and b['seconds'] >= MIN_SECONDS:
+            regressoes.append(chave)
+            marca = '  <- regressão'
+        print(f"{chave[0]:<22}{chave[1]:>12,}{a['seconds']:>11.3f}{b['seconds']:>12.3f}{razao:>8.2f}"
+              f"{a['peak_rss_mb']:>10.1f} -> {b['peak_rss_mb']:<8.1f}{marca}")
+    return regressoes
+
+
+if __name__ == "__main__":
+    # python benchmark.py run [linhas ...]  |  compare antigo.json novo.json
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    argumentos = sys.argv[2:]
+    if comando == '_stage':
+        nome, pasta, n_rows = argumentos
+        print(json.dumps(_run_stage(nome, pasta, int(n_rows))))
+    elif comando == 'run':
+        caminho = run([int(n) for n in argumentos] or DEFAULT_SIZES)
+        print(f"Resultados gravados em {caminho}")
+    elif comando == 'compare':
+        if compare(*argumentos):
+            sys.exit(1)
+    else:
+        sys.exit(f"Comando desconhecido: {comando}")
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from classifier import MSG_TYPES
+from lifecycle import ORPHAN
+from simulation import MAX_CELLS, OUTCOMES, build_grid, payoff_table, trade_outcomes
+
+# Reamostragens por tarefa: cada bloco tem a sua semente (derivada da semente
+# principal), então o resultado não depende de quantos processos são usados.
+CHUNK_SIZE = 10_000
+
+_TYPE_INDEX = {tipo: i for i, tipo in enumerate(MSG_TYPES)}
+_OUTCOME_TYPES = [_TYPE_INDEX[resultado] for resultado in OUTCOMES]
+
+
+def trade_units(trades):
+    """Contagens por tipo de mensagem de cada operação: matriz (operações, MSG_TYPES).
+
+    Cada operação conta seu sinal, os gales chamados e o resultado, então a
+    soma das linhas reproduz as contagens de mensagens do período.
+    """
+    unidades = np.zeros((len(trades), len(MSG_TYPES)), dtype=np.int64)
+    unidades[:, _TYPE_INDEX['SIGNAL']] = (trades['status'] != ORPHAN).to_numpy()
+    unidades[:, _TYPE_INDEX['GALE_CALL_1']] = trades['gale1_time'].notna().to_numpy()
+    unidades[:, _TYPE_INDEX['GALE_CALL_2']] = trades['gale2_time'].notna().to_numpy()
+    for tipo in ('GALE_CALL_1', 'GALE_CALL_2', *OUTCOMES):
+        unidades[(trades['result'] == tipo).to_numpy(), _TYPE_INDEX[tipo]] += 1
+    return unidades
+
+
+def day_units(accumulator, start_date=None, end_date=None):
+    """Contagens por tipo de cada dia do período: matriz (dias, MSG_TYPES)."""
+    dias = [contagem for _, contagem in accumulator.days_in_period(start_date, end_date)]
+    return np.array(dias, dtype=np.int64).reshape(-1, len(MSG_TYPES))
+
+
+def metric_arrays(contagens, stake=10, multiplier=2, payout=0.9):
+    """Métricas de cada linha de contagens (uma linha por reamostragem).
+
+    Mesmas definições de metrics_from_counts, mais o resultado financeiro
+    do cenário de Martingale (entrada, multiplicador do gale e payout).
+    """
+    contagens = np.asarray(contagens, dtype=float)
+    coluna = {tipo: contagens[:, i] for tipo, i in _TYPE_INDEX.items()}
+    wins = coluna['WIN'] + coluna['WIN_G1'] + coluna['WIN_G2']
+    ganhos = payoff_table(build_grid([stake], [multiplier], [payout]))[0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'assertividade': wins / (wins + coluna['STOP']) * 100,
+            'assertividade_sem_gale': coluna['WIN'] / coluna['SIGNAL'] * 100,
+            'recuperacao_g1': coluna['WIN_G1'] / coluna['GALE_CALL_1'] * 100,
+            'recuperacao_g2': coluna['WIN_G2'] / coluna['GALE_CALL_2'] * 100,
+            'taxa_recuperacao': (coluna['WIN_G1'] + coluna['WIN_G2']) / coluna['GALE_CALL_1'] * 100,
+            'pnl': contagens[:, _OUTCOME_TYPES] @ ganhos,
+        })
+
+
+def _resample_chunk(unicas, pesos, n_unidades, n, semente):
+    # Reamostrar com reposição é sortear quantas vezes cada unidade entra:
+    # uma multinomial sobre as unidades distintas, sem montar as amostras.
+    rng = np.random.default_rng(semente)
+    return rng.multinomial(n_unidades, pesos, size=n) @ unicas
+
+
+def _streak_chunk(frequencia, n_operacoes, n, semente):
+    # Sortear operações com reposição e marcar as perdas é o mesmo que sortear
+    # cada posição como perda com a frequência observada. As linhas são sorteadas
+    # em blocos de até MAX_CELLS posições, na mesma sequência do gerador.
+    rng = np.random.default_rng(semente)
+    bloco = max(1, MAX_CELLS // max(n_operacoes, 1))
+    sequencias = [
+        max_streaks(rng.random((min(bloco, n - inicio), n_operacoes), dtype=np.float32) < frequencia)
+        for inicio in range(0, n, bloco)
+    ]
+    return np.concatenate(sequencias) if sequencias else np.zeros(0, dtype=np.int64)
+
+
+def max_streaks(marcadas):
+    """Maior sequência de True seguidos em cada linha de uma matriz booleana."""
+    marcadas = np.atleast_2d(marcadas)
+    if marcadas.shape[1] == 0:
+        return np.zeros(marcadas.shape[0], dtype=np.int64)
+    acumulado = np.cumsum(marcadas, axis=1, dtype=np.int32)
+    # Em cada posição, o acumulado no último False zera a contagem da sequência
+    reinicio = np.maximum.accumulate(np.where(marcadas, 0, acumulado), axis=1)
+    return (acumulado - reinicio).max(axis=1)
+
+
+def _run_chunks(funcao, argumentos, n_resamples, seed, workers):
+    """Divide as reamostragens em blocos e roda em um pool de processos."""
+    tamanhos = [min(CHUNK_SIZE, n_resamples - inicio) for inicio in range(0, n_resamples, CHUNK_SIZE)]
+    sementes = np.random.SeedSequence(seed).spawn(len(tamanhos))
+    tarefas = [(*argumentos, n, semente) for n, semente in zip(tamanhos, sementes)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tarefas) == 1:
+        partes = [funcao(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tarefas))) as pool:
+            partes = list(pool.map(funcao, *zip(*tarefas)))
+    return np.concatenate(partes) if partes else np.empty(0)
+
+
+def resample_metrics(unidades, n_resamples=10_000, seed=None, stake=10, multiplier=2, payout=0.9,
+                     workers=None):
+    """Distribuição bootstrap das métricas reamostrando as unidades (dias ou operações).
+
+    `unidades` vem de day_units ou trade_units. Retorna um DataFrame com uma
+    linha por reamostragem e as colunas de metric_arrays.
+    """
+    unidades = np.asarray(unidades)
+    if len(unidades) == 0 or n_resamples <= 0:
+        return metric_arrays(np.zeros((0, len(MSG_TYPES))), stake, multiplier, payout)
+    unicas, frequencia = np.unique(unidades, axis=0, return_counts=True)
+    contagens = _run_chunks(
+        _resample_chunk, (unicas, frequencia / len(unidades), len(unidades)), n_resamples, seed, workers,
+    )
+    return metric_arrays(contagens.reshape(-1, len(MSG_TYPES)), stake, multiplier, payout)
+
+
+def streak_distribution(trades, n_resamples=10_000, seed=None, outcomes=('STOP',), workers=None):
+    """Maior sequência de resultados em `outcomes` em cada reamostragem das operações.
+
+    A ordem das operações é sorteada com reposição; retorna um array com o
+    maior número de resultados seguidos por reamostragem.
+    """
+    codigos, _ = trade_outcomes(trades)
+    perdas = np.isin(codigos, [OUTCOMES.index(resultado) for resultado in outcomes])
+    if len(perdas) == 0 or n_resamples <= 0:
+        return np.zeros(max(n_resamples, 0), dtype=np.int64)
+    return _run_chunks(_streak_chunk, (perdas.mean(), len(perdas)), n_resamples, seed, workers)
+
+
+def confidence_intervals(amostras, level=0.95):
+    """Intervalo de confiança por percentis de cada coluna: `low`, `median`, `high`."""
+    amostras = pd.DataFrame(amostras)
+    cauda = (1 - level) / 2 * 100
+    percentis = np.nanpercentile(amostras.to_numpy(dtype=float), [cauda, 50, 100 - cauda], axis=0)
+    return pd.DataFrame(percentis.T, index=amostras.columns, columns=['low', 'median', 'high'])
+
+
+if __name__ == "__main__":
+    # python bootstrap.py [arquivo.csv] [reamostragens]: intervalos de confiança do histórico
+    from lifecycle import reconstruct_trades
+    from metrics import MetricsAccumulator
+    from store import DATA_FILE, load_classified_csv
+
+    df = load_classified_csv(sys.argv[1] if len(sys.argv) > 1 else DATA_FILE)
+    n_resamples = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    trades = reconstruct_trades(df)
+
+    for nome, unidades in (('dias', day_units(MetricsAccumulator.from_frame(df))), ('operações', trade_units(trades))):
+        inicio = time.perf_counter()
+        intervalos = confidence_intervals(resample_metrics(unidades, n_resamples, seed=0))
+        print(f"Reamostrando {nome} ({n_resamples:,} vezes, {time.perf_counter() - inicio:.2f}s):")
+        print(intervalos.round(2))
+
+    inicio = time.perf_counter()
+    sequencias = streak_distribution(trades, n_resamples, seed=0)
+    print(f"Maior sequência de STOPs ({time.perf_counter() - inicio:.2f}s):")
+    print(pd.Series(sequencias).value_counts(normalize=True).sort_index().round(4))
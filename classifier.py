@@ -0,0 +1,264 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from instrumentation import timed
+
+# Tipos de mensagem, na mesma ordem de prioridade usada por classify_message
+MSG_TYPES = ['SIGNAL', 'WIN', 'WIN_G1', 'WIN_G2', 'STOP', 'GALE_CALL_1', 'GALE_CALL_2']
+DIRECTIONS = ['PUT', 'CALL', 'UNKNOWN']
+RESULTS = ['WIN', 'LOSS']
+
+# Resultado e nível de gale de cada tipo (índices de MSG_TYPES); -1 = sem resultado
+_RESULT_CODES = np.array([-1, 0, 0, 0, 1, -1, -1], dtype=np.int8)
+_GALE_LEVELS = np.array([0, 0, 1, 2, 2, 1, 2], dtype=np.int8)
+
+
+# Regras de classificação de cada sala, declaradas como dados (o mesmo
+# formato do arquivo RULES_FILE). Para cada tipo de MSG_TYPES: `any` lista
+# os literais procurados (basta um), `none` os que impedem o tipo e `par` o
+# padrão que extrai o par (grupo 1). Os tipos são testados na ordem de
+# MSG_TYPES e vale o primeiro; tipos ausentes nunca casam. `directions` só
+# vale para sinais: a primeira direção com algum literal presente, senão UNKNOWN.
+RULE_SETS = {
+    'padrao': {
+        'types': {
+            'SIGNAL': {'any': ['Novo Sinal Encontrado'], 'par': r'\*\*Par:\*\* `([^`]+)`'},
+            'WIN': {'any': ['WIN em'], 'none': ['G1', 'G2'], 'par': r'WIN em ([A-Z/]+)'},
+            'WIN_G1': {'any': ['WIN (G1)'], 'par': r'WIN \(G1\) em ([A-Z/]+)'},
+            'WIN_G2': {'any': ['WIN (G2)'], 'par': r'WIN \(G2\) em ([A-Z/]+)'},
+            'STOP': {'any': ['STOP em'], 'par': r'STOP em ([A-Z/]+)'},  # STOP sempre acontece após G2
+            'GALE_CALL_1': {'any': ['Faça o GALE 1'], 'par': r'para ([A-Z/]+)'},
+            'GALE_CALL_2': {'any': ['Faça o GALE 2'], 'par': r'para ([A-Z/]+)'},
+        },
+        'directions': {
+            'PUT': ['🔴⬇️', 'Vender'],
+            'CALL': ['🟢⬆️', 'Comprar'],
+        },
+    },
+}
+
+# Regra usada por canal (`autor_id` do CSV, o chat id); os demais usam a padrão
+DEFAULT_RULE_SET = 'padrao'
+CHANNEL_RULES = {-1002836003329: 'padrao'}
+
+# Arquivo opcional com mais salas: {"rule_sets": {nome: regras}, "channels": {"<chat id>": nome}}
+RULES_FILE = 'regras_salas.json'
+
+
+class RuleMatcher:
+    """Todas as regras de todas as salas compiladas em um único padrão.
+
+    O padrão é uma alternação de todos os literais das regras dentro de um
+    lookahead, então uma passada pelo texto acha todos os literais presentes
+    (inclusive sobrepostos, como 'G1' dentro de 'WIN (G1)'), não importa
+    quantas regras existam; masks() faz o mesmo para uma Series inteira,
+    com uma busca vetorizada por literal. Cada literal vira um bit; o tipo
+    e a direção de uma mensagem dependem só da sala e desses bits, e cada
+    combinação é decidida uma vez e guardada.
+    """
+
+    def __init__(self, rule_sets=RULE_SETS, channels=CHANNEL_RULES, default=DEFAULT_RULE_SET):
+        self.names = list(rule_sets)
+        if default not in rule_sets:
+            raise ValueError(f"Regra padrão desconhecida: {default}")
+        literais = set()
+        for nome, regras in rule_sets.items():
+            for tipo, regra in regras['types'].items():
+                if tipo not in MSG_TYPES:
+                    raise ValueError(f"Tipo desconhecido na regra {nome}: {tipo}")
+                literais.update(regra['any'], regra.get('none', []))
+            for direcao, lista in regras.get('directions', {}).items():
+                if direcao not in DIRECTIONS[:-1]:
+                    raise ValueError(f"Direção desconhecida na regra {nome}: {direcao}")
+                literais.update(lista)
+
+        # Mais longos primeiro: numa posição, a alternação pega o maior
+        # literal, e os que são prefixo dele estão presentes também
+        self.literals = sorted(literais, key=lambda literal: (-len(literal), literal))
+        bits = {literal: 1 << i for i, literal in enumerate(self.literals)}
+        self._bits = {
+            literal: sum(bits[outro] for outro in self.literals if literal.startswith(outro))
+            for literal in self.literals
+        }
+        self.pattern = re.compile('(?=(' + '|'.join(map(re.escape, self.literals)) + '))')
+
+        def mascara(lista):
+            return sum(bits[literal] for literal in lista)
+
+        self.rules = []
+        for nome in self.names:
+            regras = rule_sets[nome]
+            tipos = [
+                (MSG_TYPES.index(tipo), mascara(regra['any']), mascara(regra.get('none', [])),
+                 re.compile(regra['par']))
+                for tipo, regra in sorted(regras['types'].items(), key=lambda item: MSG_TYPES.index(item[0]))
+            ]
+            direcoes = [(DIRECTIONS.index(direcao), mascara(lista))
+                        for direcao, lista in sorted(regras.get('directions', {}).items(),
+                                                     key=lambda item: DIRECTIONS.index(item[0]))]
+            self.rules.append((tipos, direcoes))
+        self.channels = {int(canal): self.names.index(nome) for canal, nome in channels.items()}
+        self.default = self.names.index(default)
+        self._decisoes = {}
+
+    def rule_index(self, autor_id):
+        """Índice da regra do canal (a padrão para canais desconhecidos ou sem id)."""
+        if autor_id is None or pd.isna(autor_id):
+            return self.default
+        return self.channels.get(int(autor_id), self.default)
+
+    def rule_indices(self, autores):
+        """rule_index de cada linha de uma Series de `autor_id`, vetorizado."""
+        return pd.Series(autores).map(self.channels).fillna(self.default).to_numpy(np.int64)
+
+    def mask(self, texto):
+        """Bits dos literais presentes no texto, em uma passada."""
+        mascara = 0
+        for literal in self.pattern.findall(texto):
+            mascara |= self._bits[literal]
+        return mascara
+
+    def masks(self, textos):
+        """mask() de cada texto de uma Series de str: uma busca vetorizada (Arrow) por literal."""
+        textos = pa.array(np.asarray(textos, dtype=object), type=pa.string())
+        # Até 63 literais os bits cabem em int64; acima disso, inteiros do Python
+        mascaras = np.zeros(len(textos), dtype=np.int64 if len(self.literals) < 64 else object)
+        for i, literal in enumerate(self.literals):
+            presente = pc.match_substring(textos, literal).to_numpy(zero_copy_only=False)
+            mascaras[presente] |= 1 << i
+        return mascaras
+
+    def decide(self, regra, mascara):
+        """(código do tipo ou -1, código da direção ou -1) para a sala e os literais presentes."""
+        chave = (regra, mascara)
+        decisao = self._decisoes.get(chave)
+        if decisao is None:
+            tipos, direcoes = self.rules[regra]
+            tipo = next((codigo for codigo, algum, nenhum, _ in tipos
+                         if mascara & algum and not mascara & nenhum), -1)
+            direcao = -1
+            if tipo == 0:
+                direcao = next((codigo for codigo, algum in direcoes if mascara & algum), len(DIRECTIONS) - 1)
+            decisao = self._decisoes[chave] = (tipo, direcao)
+        return decisao
+
+    def par_pattern(self, regra, tipo):
+        """Padrão de extração do par de um tipo na sala."""
+        return next(padrao for codigo, _, _, padrao in self.rules[regra][0] if codigo == tipo)
+
+
+def load_rules(path=RULES_FILE):
+    """RuleMatcher com as regras embutidas mais as do arquivo JSON, se existir."""
+    regras, canais = dict(RULE_SETS), dict(CHANNEL_RULES)
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            extras = json.load(f)
+        regras.update(extras.get('rule_sets', {}))
+        canais.update({int(canal): nome for canal, nome in extras.get('channels', {}).items()})
+    desconhecidas = set(canais.values()) - set(regras)
+    if desconhecidas:
+        raise ValueError(f"Canais com regra desconhecida: {sorted(desconhecidas)}")
+    return RuleMatcher(regras, canais)
+
+
+MATCHER = load_rules()
+
+
+# Função para classificar mensagens
+def classify_message(message, autor_id=None, matcher=None):
+    """Classifica o tipo de mensagem com as regras da sala de `autor_id`"""
+    if pd.isna(message):
+        return None
+
+    message = str(message)
+    matcher = matcher or MATCHER
+    regra = matcher.rule_index(autor_id)
+    tipo, direcao = matcher.decide(regra, matcher.mask(message))
+    if tipo < 0:
+        return None
+
+    par_match = matcher.par_pattern(regra, tipo).search(message)
+    return {
+        'type': MSG_TYPES[tipo],
+        'par': par_match.group(1) if par_match else 'UNKNOWN',
+        'direction': DIRECTIONS[direcao] if direcao >= 0 else None,
+        'result': RESULTS[_RESULT_CODES[tipo]] if _RESULT_CODES[tipo] >= 0 else None,
+        'gale_level': int(_GALE_LEVELS[tipo]),
+    }
+
+
+@timed('classify_frame')
+def classify_frame(mensagens, autores=None, matcher=None):
+    """Classifica uma Series de mensagens de uma só vez.
+
+    Equivalente vetorizado de classify_message linha a linha: retorna um
+    DataFrame apenas com as linhas classificadas (índice preservado) e as
+    colunas `msg_type`, `par`, `direction`, `result` (categóricas) e
+    `gale_level` (int8). `autores` (o `autor_id` de cada linha) escolhe as
+    regras da sala; sem ele, todas usam a regra padrão.
+    """
+    matcher = matcher or MATCHER
+    n_regras = len(matcher.names)
+
+    # Mensagens de sala se repetem muito ("WIN em BTC/USDT", chamadas de gale):
+    # classifica cada par (texto distinto, sala) uma única vez e replica pelos códigos
+    codigos, unicos = pd.factorize(mensagens)
+    if autores is None:
+        regras = np.full(len(codigos), matcher.default, dtype=np.int64)
+    else:
+        regras = matcher.rule_indices(autores)
+    chaves = np.where(codigos >= 0, codigos.astype(np.int64) * n_regras + regras, -1)
+    combinacoes, chaves_unicas = pd.factorize(chaves)  # chave -1 (NaN) vira uma combinação à parte
+    chaves_unicas = np.asarray(chaves_unicas)
+    validas = chaves_unicas >= 0
+    texto_de = np.where(validas, chaves_unicas // n_regras, 0)
+    regra_de = np.where(validas, chaves_unicas % n_regras, matcher.default)
+
+    textos = pd.Series(unicos, dtype=object).astype(str)
+    mascaras = matcher.masks(textos)
+    textos = textos.to_numpy()
+
+    # Tipo e direção dependem só de (sala, literais presentes): poucas combinações,
+    # cada uma decidida uma vez
+    tipo = np.full(len(chaves_unicas), -1, dtype=np.int64)
+    direction = np.full(len(chaves_unicas), -1, dtype=np.int8)
+    validas = np.flatnonzero(validas)
+    decisoes, combinacoes_regra = pd.MultiIndex.from_arrays(
+        [regra_de[validas], mascaras[texto_de[validas]]]).factorize()
+    decididas = np.array([matcher.decide(regra, mascara) for regra, mascara in combinacoes_regra],
+                         dtype=np.int64).reshape(-1, 2)
+    tipo[validas] = decididas[decisoes, 0]
+    direction[validas] = decididas[decisoes, 1]
+
+    # Par: cada combinação passa só pelo padrão do seu tipo na sua sala
+    classificadas = np.flatnonzero(tipo >= 0)
+    par = pd.Series('UNKNOWN', index=classificadas, dtype=object)
+    texto = pd.Series(textos[texto_de[classificadas]], index=classificadas, dtype=object)
+    grupo = regra_de[classificadas] * len(MSG_TYPES) + tipo[classificadas]
+    for chave in np.unique(grupo):
+        mascara = grupo == chave
+        padrao = matcher.par_pattern(chave // len(MSG_TYPES), chave % len(MSG_TYPES))
+        par[mascara] = texto[mascara].str.extract(padrao, expand=False).fillna('UNKNOWN')
+
+    # Volta das combinações para as linhas originais
+    posicao = np.full(len(chaves_unicas), -1, dtype=np.int64)
+    posicao[classificadas] = np.arange(len(classificadas))
+    linha = posicao[combinacoes]
+    linhas = np.flatnonzero(linha >= 0)
+    linha = linha[linhas]
+    tipo, direction = tipo[classificadas][linha], direction[classificadas][linha]
+    par_codigos, par_categorias = pd.factorize(par, sort=True)
+
+    return pd.DataFrame({
+        'msg_type': pd.Categorical.from_codes(tipo, categories=MSG_TYPES),
+        'par': pd.Categorical.from_codes(par_codigos[linha], categories=par_categorias),
+        'direction': pd.Categorical.from_codes(direction, categories=DIRECTIONS),
+        'result': pd.Categorical.from_codes(_RESULT_CODES[tipo], categories=RESULTS),
+        'gale_level': _GALE_LEVELS[tipo],
+    }, index=mensagens.index[linhas])
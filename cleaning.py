@@ -0,0 +1,96 @@
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+# Arquivos de entrada (exportação do Telegram) e saída (mensagens tratadas)
+RAW_FILE = 'mensagens.csv'
+CLEAN_FILE = 'mensagens_tratadas.csv'
+
+# Linhas lidas por vez: a memória fica constante mesmo em exportações de GB
+CHUNK_SIZE = 100_000
+
+# Horário de Brasília (UTC-3); as datas da exportação vêm em UTC
+UTC_OFFSET = pd.Timedelta(hours=-3)
+
+# Mensagens de aviso são descartadas mesmo que citem um par
+IGNORED_MARKERS = ['AVISO IMPORTANTE']
+
+# Qualquer par no formato BASE/COTAÇÃO (BTC/USDT, ETH/USDT, SOL/USDT...)
+PAIR_PATTERN = r'[A-Z0-9]+/[A-Z0-9]+'
+
+# Mensagens mantidas: resultados, gales e sinais novos
+KEEP_PATTERN = re.compile('|'.join([
+    rf'(?:STOP|WIN(?: \(G[12]\))?) em {PAIR_PATTERN}',
+    rf'Faça o GALE [12] para {PAIR_PATTERN}',
+    re.escape('Novo Sinal Encontrado'),
+]))
+_IGNORED_PATTERN = '|'.join(re.escape(marcador) for marcador in IGNORED_MARKERS)
+
+
+def is_relevant(text):
+    """Mesmo filtro de clean_chunk para uma mensagem só."""
+    return (text is not None and KEEP_PATTERN.search(text) is not None
+            and not any(marcador in text for marcador in IGNORED_MARKERS))
+
+
+def clean_chunk(chunk):
+    """Trata um bloco da exportação: horário de Brasília e só as mensagens relevantes."""
+    mensagens = chunk['mensagem']
+    mantidas = mensagens.str.contains(KEEP_PATTERN, na=False) & ~mensagens.str.contains(
+        _IGNORED_PATTERN, na=False)
+    chunk = chunk[mantidas].copy()
+    chunk['data'] = pd.to_datetime(chunk['data']) + UTC_OFFSET
+    return chunk
+
+
+def iter_clean_chunks(input_path=RAW_FILE, chunksize=CHUNK_SIZE):
+    """Gera (linhas lidas, bloco tratado) para cada bloco da exportação."""
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        yield len(chunk), clean_chunk(chunk)
+
+
+def clean_csv(input_path=RAW_FILE, output_path=CLEAN_FILE, chunksize=CHUNK_SIZE):
+    """Trata a exportação em blocos, gravando cada bloco assim que fica pronto.
+
+    A saída é escrita num arquivo temporário e só substitui `output_path` no
+    fim, então uma execução interrompida não deixa o CSV tratado pela metade.
+    Retorna linhas lidas, linhas gravadas, segundos e linhas por segundo.
+    """
+    diretorio, nome = os.path.split(os.path.abspath(output_path))
+    temporario = os.path.join(diretorio, f'.{nome}.tmp')
+    lidas = gravadas = blocos = 0
+    inicio = time.perf_counter()
+    try:
+        with open(temporario, 'w', newline='', encoding='utf-8') as saida:
+            for n, chunk in iter_clean_chunks(input_path, chunksize):
+                chunk.to_csv(saida, header=blocos == 0, index=False)
+                lidas += n
+                gravadas += len(chunk)
+                blocos += 1
+            if blocos == 0:
+                pd.read_csv(input_path, nrows=0).to_csv(saida, index=False)
+        os.replace(temporario, output_path)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'rows_in': lidas,
+        'rows_out': gravadas,
+        'seconds': segundos,
+        'rows_per_sec': lidas / segundos if segundos > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    # python cleaning.py [entrada.csv] [saida.csv] [linhas por bloco]
+    argumentos = sys.argv[1:]
+    if len(argumentos) > 2:
+        argumentos[2] = int(argumentos[2])
+    estatisticas = clean_csv(*argumentos)
+    print(f"{estatisticas['rows_out']:,} de {estatisticas['rows_in']:,} mensagens mantidas "
+          f"em {estatisticas['seconds']:.2f}s ({estatisticas['rows_per_sec']:,.0f} linhas/s)")
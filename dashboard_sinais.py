@@ -2,10 +2,49 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import re
-from collections import Counter
+from datetime import datetime
 import numpy as np
+import os
+import threading
+import time
+import functools
+
+from store import (
+    DATA_FILE, STORE_DIR, concat_store_frames, file_fingerprint,
+    read_store, store_files, store_summary,
+)
+from metrics import MetricsAccumulator
+from database import DATABASE_FILE, MessageDatabase
+from live import LiveFrame
+from lifecycle import reconstruct_trades
+from analytics import longest_streaks, result_events, rolling_assertiveness, streak_runs, time_between_stops
+from bootstrap import confidence_intervals, day_units, resample_metrics, streak_distribution
+from simulation import build_grid, equity_curve, payoff_table, simulate_grid
+from scanner import heatmap_table, outcome_cube, scan
+from downsampling import coarsen_bars, downsample_frame, downsample_series
+import instrumentation
+from instrumentation import measure, timed
+
+# Início da execução, para medir o tempo até o dashboard ficar interativo
+inicio_execucao = time.perf_counter()
+
+# Painel de performance: a medição liga pela variável SINAIS_PROFILE (para
+# todos) ou pelo botão da barra lateral (só nesta sessão); desligada, as
+# funções medidas custam uma checagem
+instrumentation.set_enabled(st.session_state.get('painel_performance', False))
+marca_performance = instrumentation.mark()
+
+def session_profiling(func):
+    """Reaplica o botão de performance da sessão antes de um fragmento.
+
+    A reexecução só do fragmento não passa pelo topo do script e pode rodar
+    em outra thread, que começa com a medição desligada.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        instrumentation.set_enabled(st.session_state.get('painel_performance', False))
+        return func(*args, **kwargs)
+    return wrapper
 
 # Configuração da página
 st.set_page_config(
@@ -19,198 +58,775 @@ st.set_page_config(
 st.title("📊 Dashboard de Análise - Sala de Sinais de Trading")
 st.markdown("---")
 
-# Cache para carregar dados
+# CSV tratado: um LiveFrame por arquivo (live.py), mantido entre execuções.
+# A primeira leitura classifica o arquivo inteiro (em blocos, um por núcleo,
+# se for grande); depois, cada execução lê só os registros acrescentados ao
+# fim do arquivo e os soma ao frame e às métricas. O frame fica compacto: sem
+# o texto das mensagens e com categorias (store.compact_frame); ele não deve
+# ser alterado no script.
+@st.cache_resource(max_entries=1)
+def live_frame(path):
+    """Frame classificado e métricas do CSV, atualizados pelo fim do arquivo"""
+    return LiveFrame(path)
+
+def load_live_frame(path):
+    """LiveFrame do CSV com o que foi acrescentado desde a última execução"""
+    ao_vivo = live_frame(os.path.abspath(path))
+    ao_vivo.update()
+    return ao_vivo
+
+# Colunas usadas pelo dashboard (o texto das mensagens não é lido do store)
+DASHBOARD_COLUMNS = ['id', 'data', 'msg_type', 'par', 'direction', 'result', 'gale_level']
+
 @st.cache_data
-def load_data():
-    """Carrega e processa os dados do CSV"""
+def load_store_summary(path, size, mtime_ns):
+    """Total e período do store Parquet, só pelos metadados"""
+    return store_summary(path)
+
+def sync_with_store(cache, path, start_date, end_date, columns, combine):
+    """Atualiza um valor em cache com o que há de novo no store Parquet.
+
+    Lotes novos gravados pela ingestão em tempo real são lidos sozinhos e
+    passados para `combine(valor_atual, novas_linhas)`; só relê tudo (com
+    valor_atual None) se algum arquivo já lido mudou.
+    """
+    with cache['lock']:
+        arquivos = set(store_files(path))
+        if cache['value'] is None or not cache['files'] <= arquivos:
+            lidos, atual = arquivos, None
+        else:
+            lidos, atual = arquivos - cache['files'], cache['value']
+        if lidos or atual is None:
+            novos = read_store(path, start_date, end_date, columns,
+                               files=[caminho for caminho, _, _ in sorted(lidos)])
+            cache['value'] = combine(atual, novos)
+        cache['files'] = arquivos
+        return cache['value']
+
+def new_store_cache():
+    return {'lock': threading.Lock(), 'files': set(), 'value': None}
+
+@st.cache_resource(max_entries=8)
+def store_period_cache(path, start_date, end_date):
+    """Frame de um período do store e os arquivos que já foram lidos para ele"""
+    return new_store_cache()
+
+@st.cache_resource(max_entries=1)
+def store_metrics_cache(path):
+    """Acumulador de métricas de todo o store e os arquivos já somados"""
+    return new_store_cache()
+
+def load_store_period(path, start_date, end_date):
+    """Lê do store Parquet só o período e as colunas do dashboard"""
+    cache = store_period_cache(os.path.abspath(path), start_date, end_date)
+    return sync_with_store(
+        cache, path, start_date, end_date, DASHBOARD_COLUMNS,
+        lambda atual, novos: novos if atual is None else concat_store_frames([atual, novos]),
+    )
+
+def load_store_metrics(path):
+    """Acumulador de métricas do store, somando só os lotes novos"""
+    cache = store_metrics_cache(os.path.abspath(path))
+    return sync_with_store(
+        cache, path, None, None, ['data', 'msg_type', 'par'],
+        lambda atual, novos: MetricsAccumulator.from_frame(novos) if atual is None
+        else atual.merge(MetricsAccumulator.from_frame(novos)),
+    )
+
+# Banco SQLite (database.py): a chave de cache é a revisão, que muda a cada
+# lote gravado; as agregações vêm dos rollups e só o período é lido
+def database_revision(path):
+    with MessageDatabase(path) as banco:
+        return banco.revision()
+
+@st.cache_data
+def load_database_summary(path, revision):
+    """Total e período do banco, pelo rollup diário"""
+    with MessageDatabase(path) as banco:
+        return banco.summary()
+
+@st.cache_resource(max_entries=8)
+def database_period_cache(path, inode, start_date, end_date):
+    """Frame de um período do banco e o último rowid já lido para ele"""
+    return {'lock': threading.Lock(), 'rowid': 0, 'value': None}
+
+def load_database_period(path, start_date, end_date):
+    """Lê do banco só o período e as colunas do dashboard; depois, só as linhas novas.
+
+    As mensagens novas recebem rowids maiores, então cada execução lê só as
+    gravadas desde a anterior. Um banco reconvertido é outro arquivo (outro
+    inode) e começa um cache novo.
+    """
+    cache = database_period_cache(os.path.abspath(path), os.stat(path).st_ino, start_date, end_date)
+    with cache['lock'], MessageDatabase(path) as banco:
+        ultimo = banco.last_rowid()
+        if cache['value'] is None:
+            cache['value'] = banco.read_period(start_date, end_date, DASHBOARD_COLUMNS, until_rowid=ultimo)
+        elif ultimo > cache['rowid']:
+            novos = banco.read_period(start_date, end_date, DASHBOARD_COLUMNS,
+                                      after_rowid=cache['rowid'], until_rowid=ultimo)
+            if not novos.empty:
+                cache['value'] = concat_store_frames([cache['value'], novos])
+        cache['rowid'] = ultimo
+        return cache['value']
+
+@st.cache_resource(max_entries=1)
+def load_database_metrics(path, revision):
+    """Acumulador de métricas montado a partir dos rollups do banco"""
+    with MessageDatabase(path) as banco:
+        return banco.accumulator()
+
+@timed('dashboard.load_summary')
+def load_summary():
+    """Total de mensagens e primeiro/último dia disponíveis"""
     try:
-        df = pd.read_csv('mensagens_tratadas.csv')
-        df['data'] = pd.to_datetime(df['data'])
-        return df
+        if os.path.exists(DATABASE_FILE):
+            return load_database_summary(DATABASE_FILE, database_revision(DATABASE_FILE))
+        if os.path.isdir(STORE_DIR):
+            return load_store_summary(*file_fingerprint(STORE_DIR))
+        return load_live_frame(DATA_FILE).summary()
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return None
 
-# Função para classificar mensagens
-def classify_message(message):
-    """Classifica o tipo de mensagem"""
-    if pd.isna(message):
-        return None
-    
-    message = str(message)
-    
-    # Sinais
-    if "Novo Sinal Encontrado" in message:
-        # Extrair par
-        par_match = re.search(r'\*\*Par:\*\* `([^`]+)`', message)
-        # Extrair direção
-        if "🔴⬇️" in message or "Vender" in message:
-            direction = "PUT"
-        elif "🟢⬆️" in message or "Comprar" in message:
-            direction = "CALL"
-        else:
-            direction = "UNKNOWN"
-        
-        return {
-            'type': 'SIGNAL',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': direction,
-            'result': None,
-            'gale_level': 0
-        }
-    
-    # WIN direto
-    elif "WIN em" in message and "G1" not in message and "G2" not in message:
-        par_match = re.search(r'WIN em ([A-Z/]+)', message)
-        return {
-            'type': 'WIN',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': None,
-            'result': 'WIN',
-            'gale_level': 0
-        }
-    
-    # WIN G1
-    elif "WIN (G1)" in message:
-        par_match = re.search(r'WIN \(G1\) em ([A-Z/]+)', message)
-        return {
-            'type': 'WIN_G1',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': None,
-            'result': 'WIN',
-            'gale_level': 1
-        }
-    
-    # WIN G2
-    elif "WIN (G2)" in message:
-        par_match = re.search(r'WIN \(G2\) em ([A-Z/]+)', message)
-        return {
-            'type': 'WIN_G2',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': None,
-            'result': 'WIN',
-            'gale_level': 2
-        }
-    
-    # STOP (LOSS)
-    elif "STOP em" in message:
-        par_match = re.search(r'STOP em ([A-Z/]+)', message)
-        return {
-            'type': 'STOP',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': None,
-            'result': 'LOSS',
-            'gale_level': 2  # STOP sempre acontece após G2
-        }
-    
-    # Chamadas para GALE
-    elif "Faça o GALE 1" in message:
-        par_match = re.search(r'para ([A-Z/]+)', message)
-        return {
-            'type': 'GALE_CALL_1',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': None,
-            'result': None,
-            'gale_level': 1
-        }
-    
-    elif "Faça o GALE 2" in message:
-        par_match = re.search(r'para ([A-Z/]+)', message)
-        return {
-            'type': 'GALE_CALL_2',
-            'par': par_match.group(1) if par_match else 'UNKNOWN',
-            'direction': None,
-            'result': None,
-            'gale_level': 2
+@timed('dashboard.load_data')
+def load_data(start_date, end_date):
+    """Mensagens classificadas do período (banco, store Parquet ou CSV, o que existir)"""
+    if os.path.exists(DATABASE_FILE):
+        return load_database_period(DATABASE_FILE, start_date, end_date)
+    if os.path.isdir(STORE_DIR):
+        return load_store_period(STORE_DIR, start_date, end_date)
+    return load_live_frame(DATA_FILE).period(start_date, end_date)
+
+@timed('dashboard.load_metrics')
+def load_metrics():
+    """Métricas pré-agregadas por dia/par/hora de todo o histórico"""
+    if os.path.exists(DATABASE_FILE):
+        return load_database_metrics(DATABASE_FILE, database_revision(DATABASE_FILE))
+    if os.path.isdir(STORE_DIR):
+        return load_store_metrics(STORE_DIR)
+    return load_live_frame(DATA_FILE).accumulator
+
+def source_version():
+    """Identifica a versão dos dados (revisão do banco, arquivos do store ou impressão digital do CSV)"""
+    if os.path.exists(DATABASE_FILE):
+        return DATABASE_FILE, database_revision(DATABASE_FILE)
+    if os.path.isdir(STORE_DIR):
+        return tuple(store_files(STORE_DIR))
+    return file_fingerprint(DATA_FILE)
+
+@timed('dashboard.load_trades')
+@st.cache_data(max_entries=8)
+def load_trades(version, start_date, end_date):
+    """Operações reconstruídas do período (recalcula só quando os dados mudam)"""
+    return reconstruct_trades(load_data(start_date, end_date))
+
+@timed('dashboard.load_sweep')
+@st.cache_data(max_entries=16)
+def load_sweep(version, start_date, end_date, stakes, multipliers, payouts, bankroll, n_paths):
+    """Varredura de cenários de Martingale do período (em cache por parâmetros)"""
+    return simulate_grid(load_trades(version, start_date, end_date), stakes, multipliers, payouts,
+                         bankroll=bankroll, n_paths=n_paths, seed=0)
+
+@timed('dashboard.load_scanner')
+@st.cache_data(max_entries=8)
+def load_scanner(version, start_date, end_date):
+    """Ranking de filtros de horário/par/direção e mapas de calor hora x par do período"""
+    cubo = outcome_cube(load_trades(version, start_date, end_date))
+    return {
+        'ranking': scan(cubo, min_trades=1),
+        'pnl': heatmap_table(cubo, value='pnl'),
+        'assertividade': heatmap_table(cubo, value='assertividade'),
+    }
+
+# Reamostragens do bootstrap no dashboard (um bloco só, sem pool de processos)
+BOOTSTRAP_RESAMPLES = 10_000
+
+@timed('dashboard.load_confidence')
+@st.cache_data(max_entries=8)
+def load_confidence(version, start_date, end_date):
+    """Intervalos de confiança de 95% das métricas, reamostrando os dias do período"""
+    unidades = day_units(load_metrics(), start_date, end_date)
+    amostras = resample_metrics(unidades, BOOTSTRAP_RESAMPLES, seed=0, workers=1)
+    return confidence_intervals(amostras)
+
+@timed('dashboard.load_streaks')
+@st.cache_data(max_entries=8)
+def load_streaks(version, start_date, end_date):
+    """Distribuição da maior sequência de STOPs, reamostrando as operações do período"""
+    sequencias = streak_distribution(load_trades(version, start_date, end_date), BOOTSTRAP_RESAMPLES,
+                                     seed=0, workers=1)
+    return pd.Series(sequencias).value_counts(normalize=True).sort_index()
+
+@timed('dashboard.load_rolling_analysis')
+@st.cache_data(max_entries=8)
+def load_rolling_analysis(version, start_date, end_date, window):
+    """Assertividade móvel, maiores sequências e intervalos entre STOPs por par (e de todos)"""
+    df_classified = load_data(start_date, end_date)
+    por_par = result_events(df_classified)
+    todos = result_events(df_classified, by_pair=False)
+    moveis = pd.concat([rolling_assertiveness(todos, window), rolling_assertiveness(por_par, window)],
+                       ignore_index=True)
+    sequencias = pd.concat([longest_streaks(streak_runs(todos)), longest_streaks(streak_runs(por_par))])
+    moveis = moveis.dropna(subset=['assertividade'])
+
+    # Histograma já contado aqui: o navegador recebe 50 barras por par, não um ponto por STOP
+    intervalos = time_between_stops(por_par)
+    horas = intervalos['intervalo'].dt.total_seconds().to_numpy() / 3600
+    bordas = np.histogram_bin_edges(horas, bins=50)
+    histograma = pd.DataFrame([
+        (par, (inicio + fim) / 2, n)
+        for par, grupo in pd.Series(horas).groupby(intervalos['par'].to_numpy())
+        for inicio, fim, n in zip(bordas[:-1], bordas[1:], np.histogram(grupo, bordas)[0])
+    ], columns=['par', 'horas', 'stops'])
+    return {
+        # Até MAX_POINTS pontos por par: o período inteiro cabe na largura do gráfico
+        'moveis': downsample_frame(moveis, 'data', 'assertividade', by='par'),
+        'sequencias': sequencias,
+        'intervalos': histograma,
+        'largura': bordas[1] - bordas[0] if len(bordas) > 1 else 1,
+    }
+
+@timed('dashboard.load_period_aggregates')
+@st.cache_data(max_entries=8)
+def load_period_aggregates(version, start_date, end_date):
+    """Métricas e agregações do período, somadas dos baldes pré-agregados"""
+    accumulator = load_metrics()
+    trades = load_trades(version, start_date, end_date)
+
+    par_analysis = accumulator.by_pair(start_date, end_date)
+    par_analysis['assertividade'] = (par_analysis['wins'] / par_analysis['total'] * 100).round(1)
+
+    daily_analysis = accumulator.by_day(start_date, end_date)
+    daily_analysis['losses'] = daily_analysis['total_ops'] - daily_analysis['wins']
+    daily_analysis['assertividade'] = (daily_analysis['wins'] / daily_analysis['total_ops'] * 100).round(1)
+
+    direction_counts = load_data(start_date, end_date)['direction'].value_counts()
+
+    return {
+        'metrics': accumulator.metrics(start_date, end_date),
+        'par': par_analysis,
+        'daily': daily_analysis,
+        'hourly': accumulator.signals_by_hour(start_date, end_date),
+        'direction': direction_counts[direction_counts > 0],
+        # Cenário padrão: entrada de $10, gales de 2x e 4x, payout de 90%
+        'simulacao': simulate_grid(trades, [10], [2], [0.9]).iloc[0],
+        # ROI Estimado (entrada = 1, G1 = 2.31, G2 = 5.38, payout de 80%)
+        'roi': simulate_grid(trades, [1], [(2.31, 5.38)], [0.8])['final_pnl'].iloc[0],
+        # Curva reduzida pelo LTTB: quanto menor o período, mais detalhe por dia
+        'curva': downsample_series(equity_curve(trades, 10, 2, 0.9)),
+    }
+
+# Título do gráfico temporal para cada resolução de coarsen_bars
+RESOLUCOES = {'D': 'Diária', 'W-SUN': 'Semanal', 'M': 'Mensal', 'Q': 'Trimestral'}
+
+# Figuras Plotly do período: criadas uma vez por versão dos dados e período,
+# em vez de a cada rerun. cache_resource devolve as mesmas figuras; elas não
+# devem ser alteradas no script.
+@timed('dashboard.build_charts')
+@st.cache_resource(max_entries=8)
+def build_charts(version, start_date, end_date):
+    """Figuras do período, por nome (só as que têm dados)"""
+    agregados = load_period_aggregates(version, start_date, end_date)
+    metrics = agregados['metrics']
+    graficos = {}
+
+    curva = agregados['curva']
+    if not curva.empty:
+        graficos['curva'] = px.line(
+            x=curva.index, y=curva.values,
+            title="Curva de Capital (entrada $10, payout 90%)",
+            labels={'x': 'Horário', 'y': 'Resultado acumulado ($)'}
+        )
+
+    # Dados para o gráfico de pizza
+    results_data = {
+        'WIN Direto': metrics['win_direto'],
+        'WIN G1': metrics['win_g1'],
+        'WIN G2': metrics['win_g2'],
+        'STOP': metrics['stop_loss']
+    }
+    graficos['resultados'] = px.pie(
+        values=list(results_data.values()),
+        names=list(results_data.keys()),
+        title="Distribuição de Resultados por Tipo",
+        color_discrete_map={
+            'WIN Direto': '#00CC96',
+            'WIN G1': '#19D3F3',
+            'WIN G2': '#FF9F43',
+            'STOP': '#FF6B6B'
         }
-    
-    return None
-
-# Função para calcular métricas de assertividade
-def calculate_metrics(df):
-    """Calcula métricas de assertividade"""
-    
-    # Classificar todas as mensagens
-    df['classification'] = df['mensagem'].apply(classify_message)
-    df_classified = df[df['classification'].notna()].copy()
-    
-    # Extrair informações
-    df_classified['msg_type'] = df_classified['classification'].apply(lambda x: x['type'] if x else None)
-    df_classified['par'] = df_classified['classification'].apply(lambda x: x['par'] if x else None)
-    df_classified['result'] = df_classified['classification'].apply(lambda x: x['result'] if x else None)
-    df_classified['gale_level'] = df_classified['classification'].apply(lambda x: x['gale_level'] if x else None)
-    df_classified['direction'] = df_classified['classification'].apply(lambda x: x['direction'] if x else None)
-    
-    # Contar resultados
-    win_direto = len(df_classified[df_classified['msg_type'] == 'WIN'])
-    win_g1 = len(df_classified[df_classified['msg_type'] == 'WIN_G1'])
-    win_g2 = len(df_classified[df_classified['msg_type'] == 'WIN_G2'])
-    stop_loss = len(df_classified[df_classified['msg_type'] == 'STOP'])
-    total_signals = len(df_classified[df_classified['msg_type'] == 'SIGNAL'])
-    gale1_calls = len(df_classified[df_classified['msg_type'] == 'GALE_CALL_1'])
-    gale2_calls = len(df_classified[df_classified['msg_type'] == 'GALE_CALL_2'])
-    
-    # Calcular métricas
-    total_wins = win_direto + win_g1 + win_g2
-    total_operations = total_wins + stop_loss
-    assertividade = (total_wins / total_operations * 100) if total_operations > 0 else 0
-    
-    # Assertividade sem Gale (apenas wins diretos vs total de sinais)
-    assertividade_sem_gale = (win_direto / total_signals * 100) if total_signals > 0 else 0
-    
-    metrics = {
-        'total_signals': total_signals,
-        'win_direto': win_direto,
-        'win_g1': win_g1,
-        'win_g2': win_g2,
-        'stop_loss': stop_loss,
-        'total_wins': total_wins,
-        'total_operations': total_operations,
-        'assertividade': assertividade,
-        'assertividade_sem_gale': assertividade_sem_gale,
-        'gale1_calls': gale1_calls,
-        'gale2_calls': gale2_calls,
-        'uso_gale_1': (gale1_calls / total_signals * 100) if total_signals > 0 else 0,
-        'uso_gale_2': (gale2_calls / total_signals * 100) if total_signals > 0 else 0
+    )
+
+    par_analysis = agregados['par']
+    if not par_analysis.empty:
+        fig_bar_par = px.bar(
+            par_analysis,
+            x='par',
+            y='assertividade',
+            title="Assertividade por Par de Moedas",
+            labels={'par': 'Par', 'assertividade': 'Assertividade (%)'},
+            color='assertividade',
+            color_continuous_scale='RdYlGn'
+        )
+        fig_bar_par.update_layout(showlegend=False)
+        graficos['pares'] = fig_bar_par
+
+    # Períodos longos viram barras semanais, mensais ou trimestrais
+    daily_analysis, frequencia = coarsen_bars(agregados['daily'], 'date', ['total_ops', 'wins', 'losses'])
+    if frequencia != 'D':
+        daily_analysis['assertividade'] = (daily_analysis['wins'] / daily_analysis['total_ops'] * 100).round(1)
+    if not daily_analysis.empty:
+        # Gráfico temporal combinado
+        fig_temporal = go.Figure()
+
+        # Barras para wins e losses
+        fig_temporal.add_trace(go.Bar(
+            x=daily_analysis['date'],
+            y=daily_analysis['wins'],
+            name='WINs',
+            marker_color='#00CC96'
+        ))
+
+        fig_temporal.add_trace(go.Bar(
+            x=daily_analysis['date'],
+            y=daily_analysis['losses'],
+            name='STOPs',
+            marker_color='#FF6B6B'
+        ))
+
+        # Linha para assertividade
+        fig_temporal.add_trace(go.Scatter(
+            x=daily_analysis['date'],
+            y=daily_analysis['assertividade'],
+            mode='lines+markers',
+            name='Assertividade (%)',
+            yaxis='y2',
+            line=dict(color='#FFA500', width=3)
+        ))
+
+        fig_temporal.update_layout(
+            title=f'Performance {RESOLUCOES[frequencia]}: WINs vs STOPs e Assertividade',
+            xaxis_title='Data',
+            yaxis=dict(title='Número de Operações'),
+            yaxis2=dict(title='Assertividade (%)', overlaying='y', side='right'),
+            barmode='stack',
+            hovermode='x unified'
+        )
+        graficos['temporal'] = fig_temporal
+
+    hourly_dist = agregados['hourly']
+    if not hourly_dist.empty:
+        fig_hourly = px.bar(
+            x=hourly_dist.index,
+            y=hourly_dist.values,
+            title="Distribuição de Sinais por Hora",
+            labels={'x': 'Hora do Dia', 'y': 'Quantidade de Sinais'},
+            color=hourly_dist.values,
+            color_continuous_scale='viridis'
+        )
+        fig_hourly.update_layout(showlegend=False)
+        graficos['horas'] = fig_hourly
+
+    direction_counts = agregados['direction']
+    if not direction_counts.empty:
+        graficos['direcao'] = px.pie(
+            values=direction_counts.values,
+            names=direction_counts.index,
+            title="Distribuição PUT vs CALL",
+            color_discrete_map={'PUT': '#FF6B6B', 'CALL': '#00CC96'}
+        )
+
+    gale_data = {
+        'Nível': ['Entrada', 'Gale 1', 'Gale 2'],
+        'WINs': [metrics['win_direto'], metrics['win_g1'], metrics['win_g2']],
+        'Tentativas': [metrics['total_signals'], metrics['gale1_calls'], metrics['gale2_calls']]
     }
-    
-    return metrics, df_classified
+    gale_df = pd.DataFrame(gale_data)
+    gale_df['Eficácia (%)'] = (gale_df['WINs'] / gale_df['Tentativas'] * 100).round(1)
+
+    fig_gale_efic = px.bar(
+        gale_df,
+        x='Nível',
+        y='Eficácia (%)',
+        title="Eficácia por Nível de Gale",
+        color='Eficácia (%)',
+        color_continuous_scale='RdYlGn',
+        text='Eficácia (%)'
+    )
+    fig_gale_efic.update_traces(texttemplate='%{text}%', textposition='outside')
+    fig_gale_efic.update_layout(showlegend=False)
+    graficos['gale'] = fig_gale_efic
+
+    return graficos
+
+def show_chart(graficos, nome):
+    if nome in graficos:
+        # Inclui a serialização da figura para o navegador
+        with measure(f'chart.{nome}'):
+            st.plotly_chart(graficos[nome], use_container_width=True)
+
+def reais(valor):
+    """Formata um valor em dólares com vírgula decimal ($9,00)"""
+    return f"${valor:.2f}".replace('.', ',')
+
+# Seções pesadas ficam em fragments: os controles de dentro delas reexecutam
+# só a própria seção, não o dashboard inteiro.
+@st.fragment
+@session_profiling
+@timed('section.sweep')
+def render_sweep(version, start_date, end_date):
+    """Simulador de banca: varre cenários de Martingale sob demanda"""
+    if not st.toggle("Executar varredura de cenários", key='mostrar_varredura'):
+        return
+
+    col_s1, col_s2, col_s3, col_s4 = st.columns(4)
+    with col_s1:
+        entradas = st.slider("Entrada ($)", 1, 100, (5, 50))
+        passo_entrada = st.number_input("Passo da entrada", 1, 50, 5)
+    with col_s2:
+        multiplicadores = st.slider("Multiplicador do gale", 1.0, 4.0, (1.5, 3.0), step=0.1)
+        n_multiplicadores = st.number_input("Quantidade de multiplicadores", 1, 100, 16)
+    with col_s3:
+        payouts = st.slider("Payout (%)", 50, 100, (70, 95))
+    with col_s4:
+        banca = st.number_input("Banca ($)", 0.0, 1_000_000.0, 1000.0, step=100.0)
+        n_caminhos = st.number_input("Reamostragens (probabilidade de ruína)", 0, 1000, 100, step=50)
+
+    varredura = load_sweep(
+        version, start_date, end_date,
+        stakes=tuple(range(entradas[0], entradas[1] + 1, passo_entrada)),
+        multipliers=tuple(np.linspace(multiplicadores[0], multiplicadores[1], int(n_multiplicadores))),
+        payouts=tuple(np.arange(payouts[0], payouts[1] + 1) / 100),
+        bankroll=banca if banca > 0 else None,
+        n_paths=int(n_caminhos),
+    )
+    st.write(f"**{len(varredura):,} cenários simulados**")
+    fig_varredura = px.scatter(
+        varredura, x='max_drawdown', y='final_pnl', color='payout',
+        hover_data=['stake', 'gale1', 'gale2'],
+        title="Resultado Final x Maior Drawdown por cenário",
+        labels={'max_drawdown': 'Maior drawdown ($)', 'final_pnl': 'Resultado final ($)'}
+    )
+    st.plotly_chart(fig_varredura, use_container_width=True)
+    st.dataframe(varredura.sort_values('final_pnl', ascending=False).head(20), use_container_width=True)
+
+@st.fragment
+@session_profiling
+@timed('section.streaks')
+def render_streaks(version, start_date, end_date):
+    """Distribuição da maior sequência de STOPs, calculada sob demanda"""
+    if not st.toggle("Calcular sequências de STOP", key='mostrar_sequencias'):
+        return
+    sequencias = load_streaks(version, start_date, end_date)
+    fig_sequencias = px.bar(
+        x=sequencias.index, y=sequencias.values * 100,
+        title="Maior sequência de STOPs seguidos",
+        labels={'x': 'STOPs seguidos', 'y': 'Probabilidade (%)'}
+    )
+    st.plotly_chart(fig_sequencias, use_container_width=True)
+
+@timed('section.gale_analysis')
+def render_gale_analysis(agregados, graficos):
+    """Análise de eficácia do Gale"""
+    metrics = agregados['metrics']
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.subheader("Eficácia por Nível de Gale")
+        show_chart(graficos, 'gale')
+
+    with col2:
+        st.subheader("Fluxo de Operações")
+
+        # Calcular o fluxo
+        entrada_to_win = metrics['win_direto']
+        entrada_to_gale1 = metrics['gale1_calls']
+        gale1_to_win = metrics['win_g1']
+        gale1_to_gale2 = metrics['gale2_calls']
+        gale2_to_win = metrics['win_g2']
+        gale2_to_stop = metrics['stop_loss']
+
+        st.write("**Fluxo das Operações:**")
+        st.write(f"🟢 **{metrics['total_signals']} Sinais** iniciais")
+        st.write(f"├─ ✅ {entrada_to_win} WINs diretos ({entrada_to_win/metrics['total_signals']*100:.1f}%)")
+        st.write(f"└─ ⚠️ {entrada_to_gale1} foram para Gale 1 ({entrada_to_gale1/metrics['total_signals']*100:.1f}%)")
+        st.write(f"   ├─ ✅ {gale1_to_win} WINs no G1 ({gale1_to_win/entrada_to_gale1*100:.1f}%)")
+        st.write(f"   └─ ⚠️ {gale1_to_gale2} foram para Gale 2 ({gale1_to_gale2/entrada_to_gale1*100:.1f}%)")
+        st.write(f"      ├─ ✅ {gale2_to_win} WINs no G2 ({gale2_to_win/gale1_to_gale2*100:.1f}%)")
+        st.write(f"      └─ ❌ {gale2_to_stop} STOPs ({gale2_to_stop/gale1_to_gale2*100:.1f}%)")
+
+    with col3:
+        st.subheader("Métricas de Gale")
+
+        # Métricas calculadas
+        taxa_entrada_direta = (metrics['win_direto'] / metrics['total_signals'] * 100) if metrics['total_signals'] > 0 else 0
+        taxa_uso_gale = ((metrics['gale1_calls']) / metrics['total_signals'] * 100) if metrics['total_signals'] > 0 else 0
+        taxa_recuperacao_g1 = (metrics['win_g1'] / metrics['gale1_calls'] * 100) if metrics['gale1_calls'] > 0 else 0
+        taxa_recuperacao_g2 = (metrics['win_g2'] / metrics['gale2_calls'] * 100) if metrics['gale2_calls'] > 0 else 0
+
+        st.metric("Taxa Win Entrada", f"{taxa_entrada_direta:.1f}%")
+        st.metric("Taxa Uso Gale", f"{taxa_uso_gale:.1f}%")
+        st.metric("Recuperação G1", f"{taxa_recuperacao_g1:.1f}%")
+        st.metric("Recuperação G2", f"{taxa_recuperacao_g2:.1f}%")
+        st.metric("ROI Estimado", f"{agregados['roi']:.2f} unidades")
+
+@timed('section.history')
+def render_history(start_date, end_date):
+    """Últimas 50 operações do período"""
+    df_classified = load_data(start_date, end_date)
+    recent_ops = df_classified[df_classified['msg_type'].isin(['SIGNAL', 'WIN', 'WIN_G1', 'WIN_G2', 'STOP'])]
+    recent_ops = recent_ops.sort_values('data', ascending=False).head(50)
+
+    # Preparar dados para exibição
+    display_ops = recent_ops[['data', 'msg_type', 'par', 'direction', 'result']].copy()
+    display_ops['data'] = display_ops['data'].dt.strftime('%d/%m/%Y %H:%M')
+    display_ops.columns = ['Data/Hora', 'Tipo', 'Par', 'Direção', 'Resultado']
+
+    st.dataframe(display_ops, use_container_width=True)
+
+@timed('section.rolling_analysis')
+def render_rolling_analysis(version, start_date, end_date):
+    """Assertividade móvel, sequências e intervalos entre STOPs, por par"""
+    col_j1, col_j2 = st.columns(2)
+    with col_j1:
+        unidade = st.radio("Janela em", ["Operações", "Horas"], horizontal=True, key='janela_unidade')
+    with col_j2:
+        if unidade == "Operações":
+            tamanho = st.slider("Últimas N operações", 5, 500, 50, step=5, key='janela_operacoes')
+            janela, descricao = tamanho, f"últimas {tamanho} operações"
+        else:
+            tamanho = st.slider("Últimas N horas", 1, 168, 24, key='janela_horas')
+            janela, descricao = f'{tamanho}h', f"últimas {tamanho}h"
+    analise = load_rolling_analysis(version, start_date, end_date, janela)
+
+    moveis = analise['moveis']
+    if moveis.empty:
+        st.info("Sem operações suficientes para a janela escolhida.")
+    else:
+        fig_moveis = px.line(
+            moveis, x='data', y='assertividade', color='par',
+            title=f"Assertividade Móvel ({descricao})",
+            labels={'data': 'Horário', 'assertividade': 'Assertividade (%)', 'par': 'Par'}
+        )
+        st.plotly_chart(fig_moveis, use_container_width=True)
+
+    col_s1, col_s2 = st.columns(2)
+    with col_s1:
+        sequencias = analise['sequencias']
+        if not sequencias.empty:
+            fig_seq = px.bar(
+                sequencias.reset_index().melt(id_vars='par', var_name='Resultado', value_name='Sequência'),
+                x='par', y='Sequência', color='Resultado', barmode='group',
+                title="Maior Sequência de WINs e STOPs por Par",
+                labels={'par': 'Par', 'Sequência': 'Operações seguidas'},
+                color_discrete_map={'WIN': '#00CC96', 'STOP': '#FF6B6B'}
+            )
+            st.plotly_chart(fig_seq, use_container_width=True)
+    with col_s2:
+        intervalos = analise['intervalos']
+        if not intervalos.empty:
+            fig_intervalos = px.bar(
+                intervalos, x='horas', y='stops', color='par', barmode='overlay',
+                title="Tempo entre STOPs do Mesmo Par",
+                labels={'horas': 'Horas entre STOPs', 'stops': 'STOPs', 'par': 'Par'}
+            )
+            fig_intervalos.update_traces(width=analise['largura'])
+            st.plotly_chart(fig_intervalos, use_container_width=True)
+
+@timed('section.scanner')
+def render_scanner(version, start_date, end_date):
+    """Mapa de calor hora x par/direção e os melhores filtros de horário, par e direção"""
+    varredura = load_scanner(version, start_date, end_date)
+    if varredura['ranking'].empty:
+        st.info("Sem operações completas no período.")
+        return
+
+    col_h1, col_h2 = st.columns(2)
+    with col_h1:
+        metrica = st.radio("Mapa de calor", ["Resultado ($10)", "Assertividade"], horizontal=True,
+                           key='scanner_metrica')
+    with col_h2:
+        minimo = st.slider("Mínimo de operações por filtro", 1, 200, 30, key='scanner_minimo')
+
+    tabela = varredura['pnl' if metrica == "Resultado ($10)" else 'assertividade']
+    tabela = tabela.set_axis([f'{par} {direcao}' for par, direcao in tabela.columns], axis=1)
+    fig_calor = px.imshow(
+        tabela.T, aspect='auto', text_auto='.0f',
+        color_continuous_scale='RdYlGn', color_continuous_midpoint=0 if metrica == "Resultado ($10)" else None,
+        title=f"{metrica} por Hora do Sinal e Par/Direção",
+        labels={'x': 'Hora do sinal', 'y': 'Par e direção', 'color': metrica}
+    )
+    st.plotly_chart(fig_calor, use_container_width=True)
+
+    ranking = varredura['ranking']
+    ranking = ranking[ranking['trades'] >= minimo].head(20)
+    exibicao = ranking[['hours', 'pairs', 'direction', 'trades', 'wins', 'stops', 'assertividade', 'pnl']].copy()
+    exibicao.columns = ['Horário', 'Pares', 'Direção', 'Operações', 'WINs', 'STOPs', 'Assertividade (%)',
+                        'Resultado ($)']
+    st.write(f"**Melhores filtros** (com pelo menos {minimo} operações, entrada de $10, gales 2x, payout 90%)")
+    st.dataframe(exibicao.round(1), use_container_width=True, hide_index=True)
+
+# Seções abaixo da dobra: só a escolhida é calculada e desenhada
+SECOES = {
+    "🎯 Análise da Estratégia Martingale (Gale)": 'gale',
+    "📉 Janelas Móveis e Sequências": 'janelas',
+    "🗺️ Horários e Pares Lucrativos": 'horarios',
+    "📋 Histórico de Operações": 'historico',
+}
+
+@st.fragment
+@session_profiling
+@timed('section.details')
+def render_details(version, start_date, end_date):
+    """Seções abaixo da dobra, renderizadas sob demanda"""
+    secao = st.radio("Mostrar seção", list(SECOES), index=None, horizontal=True, key='secao_detalhes')
+    if secao is None:
+        return
+    st.header(secao)
+    if SECOES[secao] == 'gale':
+        render_gale_analysis(load_period_aggregates(version, start_date, end_date),
+                             build_charts(version, start_date, end_date))
+    elif SECOES[secao] == 'janelas':
+        render_rolling_analysis(version, start_date, end_date)
+    elif SECOES[secao] == 'horarios':
+        render_scanner(version, start_date, end_date)
+    else:
+        render_history(start_date, end_date)
+
+# Modo ao vivo: intervalos de atualização oferecidos, em segundos
+LIVE_INTERVALS = [5, 10, 30, 60]
+
+@session_profiling
+@timed('section.live')
+def render_live(version):
+    """Painel do último dia com dados, reexecutado sozinho pelo timer do modo ao vivo.
+
+    Cada execução lê só o que chegou desde a anterior (fim do CSV, lotes
+    novos do store ou rowids novos do banco) e redesenha só este painel; o
+    restante do dashboard fica com o período calculado na última interação.
+    """
+    accumulator = load_metrics()
+    if not accumulator.days:
+        st.info("Nenhuma mensagem classificada ainda.")
+        return
+    dia = max(accumulator.days)
+    metricas = accumulator.metrics(dia, dia)
+    anterior = st.session_state.get('ao_vivo_anterior')
+    st.session_state['ao_vivo_anterior'] = (dia, metricas)
+
+    def variacao(chave):
+        if anterior is None or anterior[0] != dia:
+            return None
+        return metricas[chave] - anterior[1][chave] or None
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Sinais", metricas['total_signals'], variacao('total_signals'))
+    with col2:
+        st.metric("WINs", metricas['total_wins'], variacao('total_wins'))
+    with col3:
+        st.metric("STOPs", metricas['stop_loss'], variacao('stop_loss'), delta_color='inverse')
+    with col4:
+        st.metric("Assertividade", f"{metricas['assertividade']:.1f}%")
+
+    col_h, col_u = st.columns(2)
+    with col_h:
+        por_hora = accumulator.signals_by_hour(dia, dia)
+        if not por_hora.empty:
+            st.plotly_chart(px.bar(
+                x=por_hora.index, y=por_hora.values,
+                title=f"Sinais por Hora em {dia.strftime('%d/%m/%Y')}",
+                labels={'x': 'Hora do Dia', 'y': 'Quantidade de Sinais'}
+            ), use_container_width=True)
+    with col_u:
+        do_dia = load_data(dia, dia)
+        ultimas = do_dia[do_dia['msg_type'].isin(['SIGNAL', 'WIN', 'WIN_G1', 'WIN_G2', 'STOP'])].iloc[::-1].head(10)
+        ultimas = ultimas[['data', 'msg_type', 'par', 'direction', 'result']].copy()
+        ultimas['data'] = ultimas['data'].dt.strftime('%H:%M:%S')
+        ultimas.columns = ['Hora', 'Tipo', 'Par', 'Direção', 'Resultado']
+        st.dataframe(ultimas, hide_index=True, use_container_width=True)
+
+    legenda = f"Atualizado às {datetime.now().strftime('%H:%M:%S')}"
+    if source_version() != version:
+        legenda += (" · chegaram mensagens depois do cálculo do período abaixo; "
+                    "ele é recalculado na próxima interação com o dashboard")
+    st.caption(legenda)
+
+def render_performance_panel(marca):
+    """Medições desta execução (em ordem, aninhadas) e totais das últimas execuções"""
+    registros = instrumentation.records(marca, threading.get_ident())
+    with st.sidebar.expander("⚙️ Performance desta execução", expanded=True):
+        if not registros:
+            st.caption("Nenhuma medição nesta execução.")
+            return
+        # Em ordem de início, com as medições internas recuadas sob a que as chamou
+        tabela = pd.DataFrame(registros).sort_values('order')
+        tabela = pd.DataFrame({
+            'Etapa': ['· ' * profundidade + nome for profundidade, nome in zip(tabela['depth'], tabela['name'])],
+            'ms': (tabela['seconds'] * 1000).round(1),
+            'Linhas': tabela['rows'],
+            'Δ RSS (MB)': tabela['rss_delta_mb'].round(1),
+        })
+        st.dataframe(tabela, hide_index=True, use_container_width=True)
+        st.caption(f"Log estruturado em {instrumentation.LOG_FILE}")
+
+        st.write("**Acumulado (últimas medições)**")
+        totais = pd.DataFrame(instrumentation.summary(instrumentation.records()))
+        totais['seconds'] = (totais['seconds'] * 1000).round(1)
+        totais['max_seconds'] = (totais['max_seconds'] * 1000).round(1)
+        st.dataframe(totais.rename(columns={
+            'name': 'Etapa', 'calls': 'Chamadas', 'seconds': 'Total (ms)', 'max_seconds': 'Máx (ms)',
+            'rows': 'Linhas', 'rss_delta_mb': 'Δ RSS (MB)',
+        }).round(1), hide_index=True, use_container_width=True)
 
 # Carregar dados
-df = load_data()
+summary = load_summary()
+
+if summary is not None:
 
-if df is not None:
-    
     # Sidebar com informações
     st.sidebar.header("ℹ️ Informações dos Dados")
-    st.sidebar.write(f"**Total de mensagens:** {len(df):,}")
-    st.sidebar.write(f"**Período:** {df['data'].min().strftime('%d/%m/%Y')} até {df['data'].max().strftime('%d/%m/%Y')}")
-    
+    st.sidebar.write(f"**Total de mensagens:** {summary['total']:,}")
+    st.sidebar.write(f"**Período:** {summary['first_day'].strftime('%d/%m/%Y')} até {summary['last_day'].strftime('%d/%m/%Y')}")
+
     # Filtros
     st.sidebar.header("🔧 Filtros")
-    
+
     # Filtro de data
-    min_date = df['data'].min().date()
-    max_date = df['data'].max().date()
-    
+    min_date = summary['first_day']
+    max_date = summary['last_day']
+
     date_range = st.sidebar.date_input(
         "Período de análise",
         value=(min_date, max_date),
         min_value=min_date,
         max_value=max_date
     )
-    
+
     if len(date_range) == 2:
         start_date, end_date = date_range
-        df_filtered = df[
-            (df['data'].dt.date >= start_date) & 
-            (df['data'].dt.date <= end_date)
-        ]
     else:
-        df_filtered = df
-    
-    # Calcular métricas
-    metrics, df_classified = calculate_metrics(df_filtered)
+        start_date, end_date = min_date, max_date
+
+    # Modo ao vivo: só o painel do último dia é reexecutado pelo timer
+    st.sidebar.header("🔴 Ao Vivo")
+    ao_vivo = st.sidebar.toggle("Atualizar automaticamente", key='modo_ao_vivo')
+    intervalo = st.sidebar.select_slider("Intervalo (segundos)", LIVE_INTERVALS, value=10,
+                                         key='intervalo_ao_vivo', disabled=not ao_vivo)
+
+    # Métricas, agregações e figuras do período (em cache por versão dos dados e período)
+    version = source_version()
+
+    if ao_vivo:
+        st.header("🔴 Ao Vivo")
+        st.fragment(run_every=intervalo)(render_live)(version)
+        st.markdown("---")
+    agregados = load_period_aggregates(version, start_date, end_date)
+    graficos = build_charts(version, start_date, end_date)
+    metrics = agregados['metrics']
+    simulacao = agregados['simulacao']
+    ganho_win, ganho_g1, ganho_g2, perda_stop_op = payoff_table(build_grid([10], [2], [0.9]))[0]
 
     col1a, col2a = st.columns(2, gap="large")
 
@@ -218,18 +834,19 @@ if df is not None:
         st.header("Simulação de entrada com $10 e payout fixo de 90%")
         st.markdown("**Premissas:**")
         st.markdown("- Entrada inicial: $10")
-        st.markdown("- Payout fixo: 90% (ou seja, um WIN retorna $9,00 de lucro)")
-        st.markdown("- Win no Gale 1: $8,00 de lucro")
-        st.markdown("- Win no Gale 2: $6,00 de lucro")
-        st.markdown("- STOP total: perda de $70,00")
+        st.markdown(f"- Payout fixo: 90% (ou seja, um WIN retorna {reais(ganho_win)} de lucro)")
+        st.markdown(f"- Win no Gale 1: {reais(ganho_g1)} de lucro")
+        st.markdown(f"- Win no Gale 2: {reais(ganho_g2)} de lucro")
+        st.markdown(f"- STOP total: perda de {reais(-perda_stop_op)}")
 
         # Cálculo do resultado financeiro
-        lucro_entrada = metrics['win_direto'] * 9
-        lucro_gale1 = metrics['win_g1'] * 8
-        lucro_gale2 = metrics['win_g2'] * 6
-        perda_stop = metrics['stop_loss'] * (-70)
-        resultado_final = lucro_entrada + lucro_gale1 + lucro_gale2 + perda_stop
-        st.markdown(f"**Resultado Final:** <span style='color: red'>${resultado_final:.2f}</span>", unsafe_allow_html=True)
+        lucro_entrada = metrics['win_direto'] * ganho_win
+        lucro_gale1 = metrics['win_g1'] * ganho_g1
+        lucro_gale2 = metrics['win_g2'] * ganho_g2
+        perda_stop = metrics['stop_loss'] * perda_stop_op
+        resultado_final = simulacao['final_pnl']
+        cor = 'red' if resultado_final < 0 else 'green'
+        st.markdown(f"**Resultado Final:** <span style='color: {cor}'>${resultado_final:.2f}</span>", unsafe_allow_html=True)
 
     with col2a:
         st.header("Detalhamento do Resultado")
@@ -239,298 +856,138 @@ if df is not None:
         st.markdown(f"- **Perda com STOPs:** ${perda_stop:.2f} ({metrics['stop_loss']} STOPs)")
         st.markdown(f"- **Total de Operações Analisadas:** {metrics['total_operations']}")
         st.markdown(f"- **Total de Sinais Iniciais:** {metrics['total_signals']}")
+        st.markdown(f"- **Maior Drawdown:** ${simulacao['max_drawdown']:.2f}")
+
+    # Curva de capital do cenário padrão
+    show_chart(graficos, 'curva')
+
+    # Varredura de parâmetros: todas as combinações são simuladas de uma vez
+    with st.expander("🎲 Simulador de Banca (Martingale)"):
+        render_sweep(version, start_date, end_date)
 
     st.markdown("---")
-    
+
     # Métricas principais
     st.header("📈 Métricas Principais")
-    
+
     col1, col2, col3, col4, col5 = st.columns(5)
-    
+
     with col1:
         st.metric("Total de Sinais", metrics['total_signals'])
-    
+
     with col2:
         st.metric("Assertividade Geral", f"{metrics['assertividade']:.1f}%")
-    
+        intervalos = load_confidence(version, start_date, end_date)
+        st.caption(f"IC 95%: {intervalos.loc['assertividade', 'low']:.1f}% a "
+                   f"{intervalos.loc['assertividade', 'high']:.1f}%")
+
     with col3:
         st.metric("Caso entrasse com $10,00", f"{metrics['assertividade_sem_gale']:.1f}%")
-    
+
     with col4:
         st.metric("Total de WINs", metrics['total_wins'])
-    
+
     with col5:
         st.metric("Total de STOPs", metrics['stop_loss'])
-    
+
     # Métricas secundárias
     st.subheader("📊 Detalhamento das Operações")
-    
+
     col1, col2, col3, col4, col5, col6 = st.columns(6)
-    
+
     with col1:
         st.metric("WIN Direto", metrics['win_direto'])
-    
+
     with col2:
         st.metric("WIN G1", metrics['win_g1'])
-    
+
     with col3:
         st.metric("WIN G2", metrics['win_g2'])
-    
+
     with col4:
         st.metric("Uso de Gale 1", f"{metrics['uso_gale_1']:.1f}%")
-    
+
     with col5:
         st.metric("Uso de Gale 2", f"{metrics['uso_gale_2']:.1f}%")
-    
+
     with col6:
         recovery_rate = ((metrics['win_g1'] + metrics['win_g2']) / (metrics['gale1_calls']) * 100) if metrics['gale1_calls'] > 0 else 0
         st.metric("Taxa de Recuperação", f"{recovery_rate:.1f}%")
-    
+
+    # Intervalos de confiança (bootstrap por dia) e sequências de STOP
+    with st.expander("📏 Intervalos de Confiança (bootstrap)"):
+        col_ic1, col_ic2 = st.columns(2)
+        with col_ic1:
+            st.write(f"**IC 95% reamostrando os dias do período ({BOOTSTRAP_RESAMPLES:,} reamostragens)**")
+            st.dataframe(intervalos.rename(index={
+                'assertividade': 'Assertividade (%)',
+                'assertividade_sem_gale': 'Assertividade sem gale (%)',
+                'recuperacao_g1': 'Recuperação G1 (%)',
+                'recuperacao_g2': 'Recuperação G2 (%)',
+                'taxa_recuperacao': 'Taxa de recuperação (%)',
+                'pnl': 'Resultado com $10 ($)',
+            }).round(2), use_container_width=True)
+        with col_ic2:
+            render_streaks(version, start_date, end_date)
+
     # Gráficos principais
     st.header("📊 Visualizações e Análises")
-    
+
     # Row 1: Distribuição de resultados e performance por par
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.subheader("Distribuição de Resultados")
-        
-        # Dados para o gráfico de pizza
-        results_data = {
-            'WIN Direto': metrics['win_direto'],
-            'WIN G1': metrics['win_g1'],
-            'WIN G2': metrics['win_g2'],
-            'STOP': metrics['stop_loss']
-        }
-        
-        fig_pie = px.pie(
-            values=list(results_data.values()),
-            names=list(results_data.keys()),
-            title="Distribuição de Resultados por Tipo",
-            color_discrete_map={
-                'WIN Direto': '#00CC96',
-                'WIN G1': '#19D3F3',
-                'WIN G2': '#FF9F43',
-                'STOP': '#FF6B6B'
-            }
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
-    
+        show_chart(graficos, 'resultados')
+
     with col2:
         st.subheader("Performance por Par")
-        
-        # Análise por par
-        par_analysis = df_classified[df_classified['result'].notna()].groupby('par').agg({
-            'result': ['count', lambda x: (x == 'WIN').sum()]
-        }).reset_index()
-        
-        if not par_analysis.empty:
-            par_analysis.columns = ['par', 'total', 'wins']
-            par_analysis['assertividade'] = (par_analysis['wins'] / par_analysis['total'] * 100).round(1)
-            
-            fig_bar_par = px.bar(
-                par_analysis,
-                x='par',
-                y='assertividade',
-                title="Assertividade por Par de Moedas",
-                labels={'par': 'Par', 'assertividade': 'Assertividade (%)'},
-                color='assertividade',
-                color_continuous_scale='RdYlGn'
-            )
-            fig_bar_par.update_layout(showlegend=False)
-            st.plotly_chart(fig_bar_par, use_container_width=True)
-    
+        show_chart(graficos, 'pares')
+
     # Row 2: Análise temporal
     st.subheader("📅 Análise Temporal")
-    
-    # Preparar dados temporais
-    df_results = df_classified[df_classified['result'].notna()].copy()
-    df_results['date'] = df_results['data'].dt.date
-    
-    daily_analysis = df_results.groupby('date').agg({
-        'result': ['count', lambda x: (x == 'WIN').sum()]
-    }).reset_index()
-    
-    if not daily_analysis.empty:
-        daily_analysis.columns = ['date', 'total_ops', 'wins']
-        daily_analysis['losses'] = daily_analysis['total_ops'] - daily_analysis['wins']
-        daily_analysis['assertividade'] = (daily_analysis['wins'] / daily_analysis['total_ops'] * 100).round(1)
-        
-        # Gráfico temporal combinado
-        fig_temporal = go.Figure()
-        
-        # Barras para wins e losses
-        fig_temporal.add_trace(go.Bar(
-            x=daily_analysis['date'],
-            y=daily_analysis['wins'],
-            name='WINs',
-            marker_color='#00CC96'
-        ))
-        
-        fig_temporal.add_trace(go.Bar(
-            x=daily_analysis['date'],
-            y=daily_analysis['losses'],
-            name='STOPs',
-            marker_color='#FF6B6B'
-        ))
-        
-        # Linha para assertividade
-        fig_temporal.add_trace(go.Scatter(
-            x=daily_analysis['date'],
-            y=daily_analysis['assertividade'],
-            mode='lines+markers',
-            name='Assertividade (%)',
-            yaxis='y2',
-            line=dict(color='#FFA500', width=3)
-        ))
-        
-        fig_temporal.update_layout(
-            title='Performance Diária: WINs vs STOPs e Assertividade',
-            xaxis_title='Data',
-            yaxis=dict(title='Número de Operações'),
-            yaxis2=dict(title='Assertividade (%)', overlaying='y', side='right'),
-            barmode='stack',
-            hovermode='x unified'
-        )
-        
-        st.plotly_chart(fig_temporal, use_container_width=True)
-    
+    show_chart(graficos, 'temporal')
+
     # Row 3: Análise de horários e padrões
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.subheader("Distribuição por Hora do Dia")
-        
-        df_signals = df_classified[df_classified['msg_type'] == 'SIGNAL'].copy()
-        if not df_signals.empty:
-            df_signals['hora'] = df_signals['data'].dt.hour
-            hourly_dist = df_signals['hora'].value_counts().sort_index()
-            
-            fig_hourly = px.bar(
-                x=hourly_dist.index,
-                y=hourly_dist.values,
-                title="Distribuição de Sinais por Hora",
-                labels={'x': 'Hora do Dia', 'y': 'Quantidade de Sinais'},
-                color=hourly_dist.values,
-                color_continuous_scale='viridis'
-            )
-            fig_hourly.update_layout(showlegend=False)
-            st.plotly_chart(fig_hourly, use_container_width=True)
-    
+        show_chart(graficos, 'horas')
+
     with col2:
         st.subheader("Análise de Direção (PUT vs CALL)")
-        
-        direction_analysis = df_classified[df_classified['direction'].notna()]
-        if not direction_analysis.empty:
-            direction_counts = direction_analysis['direction'].value_counts()
-            
-            fig_direction = px.pie(
-                values=direction_counts.values,
-                names=direction_counts.index,
-                title="Distribuição PUT vs CALL",
-                color_discrete_map={'PUT': '#FF6B6B', 'CALL': '#00CC96'}
-            )
-            st.plotly_chart(fig_direction, use_container_width=True)
-    
-    # Row 4: Análise de eficácia do Gale
-    st.subheader("🎯 Análise da Estratégia Martingale (Gale)")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.subheader("Eficácia por Nível de Gale")
-        
-        gale_data = {
-            'Nível': ['Entrada', 'Gale 1', 'Gale 2'],
-            'WINs': [metrics['win_direto'], metrics['win_g1'], metrics['win_g2']],
-            'Tentativas': [metrics['total_signals'], metrics['gale1_calls'], metrics['gale2_calls']]
-        }
-        
-        gale_df = pd.DataFrame(gale_data)
-        gale_df['Eficácia (%)'] = (gale_df['WINs'] / gale_df['Tentativas'] * 100).round(1)
-        
-        fig_gale_efic = px.bar(
-            gale_df,
-            x='Nível',
-            y='Eficácia (%)',
-            title="Eficácia por Nível de Gale",
-            color='Eficácia (%)',
-            color_continuous_scale='RdYlGn',
-            text='Eficácia (%)'
-        )
-        fig_gale_efic.update_traces(texttemplate='%{text}%', textposition='outside')
-        fig_gale_efic.update_layout(showlegend=False)
-        st.plotly_chart(fig_gale_efic, use_container_width=True)
-    
-    with col2:
-        st.subheader("Fluxo de Operações")
-        
-        # Calcular o fluxo
-        entrada_to_win = metrics['win_direto']
-        entrada_to_gale1 = metrics['gale1_calls']
-        gale1_to_win = metrics['win_g1']
-        gale1_to_gale2 = metrics['gale2_calls']
-        gale2_to_win = metrics['win_g2']
-        gale2_to_stop = metrics['stop_loss']
-        
-        st.write("**Fluxo das Operações:**")
-        st.write(f"🟢 **{metrics['total_signals']} Sinais** iniciais")
-        st.write(f"├─ ✅ {entrada_to_win} WINs diretos ({entrada_to_win/metrics['total_signals']*100:.1f}%)")
-        st.write(f"└─ ⚠️ {entrada_to_gale1} foram para Gale 1 ({entrada_to_gale1/metrics['total_signals']*100:.1f}%)")
-        st.write(f"   ├─ ✅ {gale1_to_win} WINs no G1 ({gale1_to_win/entrada_to_gale1*100:.1f}%)")
-        st.write(f"   └─ ⚠️ {gale1_to_gale2} foram para Gale 2 ({gale1_to_gale2/entrada_to_gale1*100:.1f}%)")
-        st.write(f"      ├─ ✅ {gale2_to_win} WINs no G2 ({gale2_to_win/gale1_to_gale2*100:.1f}%)")
-        st.write(f"      └─ ❌ {gale2_to_stop} STOPs ({gale2_to_stop/gale1_to_gale2*100:.1f}%)")
-    
-    with col3:
-        st.subheader("Métricas de Gale")
-        
-        # Métricas calculadas
-        taxa_entrada_direta = (metrics['win_direto'] / metrics['total_signals'] * 100) if metrics['total_signals'] > 0 else 0
-        taxa_uso_gale = ((metrics['gale1_calls']) / metrics['total_signals'] * 100) if metrics['total_signals'] > 0 else 0
-        taxa_recuperacao_g1 = (metrics['win_g1'] / metrics['gale1_calls'] * 100) if metrics['gale1_calls'] > 0 else 0
-        taxa_recuperacao_g2 = (metrics['win_g2'] / metrics['gale2_calls'] * 100) if metrics['gale2_calls'] > 0 else 0
-        
-        st.metric("Taxa Win Entrada", f"{taxa_entrada_direta:.1f}%")
-        st.metric("Taxa Uso Gale", f"{taxa_uso_gale:.1f}%")
-        st.metric("Recuperação G1", f"{taxa_recuperacao_g1:.1f}%")
-        st.metric("Recuperação G2", f"{taxa_recuperacao_g2:.1f}%")
-        
-        # ROI Estimado (assumindo entrada = 1, G1 = 2.31, G2 = 5.38)
-        roi_entrada = entrada_to_win * 0.8  # WIN = 80% de lucro
-        roi_gale1 = gale1_to_win * 0.8 - (entrada_to_gale1 * 1)  # WIN G1 = 80% - perda entrada
-        roi_gale2 = gale2_to_win * 0.8 - (gale1_to_gale2 * 3.31)  # WIN G2 = 80% - perdas G1+entrada
-        roi_stop = -(gale2_to_stop * 6.69)  # STOP = perda total
-        
-        roi_total = roi_entrada + roi_gale1 + roi_gale2 + roi_stop
-        st.metric("ROI Estimado", f"{roi_total:.2f} unidades")
-    
-    # Tabela de operações recentes
-    st.header("📋 Histórico de Operações")
-    
-    # Mostrar últimas operações
-    recent_ops = df_classified[df_classified['msg_type'].isin(['SIGNAL', 'WIN', 'WIN_G1', 'WIN_G2', 'STOP'])].copy()
-    recent_ops = recent_ops.sort_values('data', ascending=False).head(50)
-    
-    # Preparar dados para exibição
-    display_ops = recent_ops[['data', 'msg_type', 'par', 'direction', 'result']].copy()
-    display_ops['data'] = display_ops['data'].dt.strftime('%d/%m/%Y %H:%M')
-    display_ops.columns = ['Data/Hora', 'Tipo', 'Par', 'Direção', 'Resultado']
-    
-    st.dataframe(display_ops, use_container_width=True)
-    
+        show_chart(graficos, 'direcao')
+
+    # Row 4: Análise de eficácia do Gale e histórico de operações, sob demanda
+    st.markdown("---")
+    render_details(version, start_date, end_date)
+
     # Informações adicionais na sidebar
     st.sidebar.header("📈 Resumo Executivo")
     st.sidebar.write(f"**Assertividade Geral:** {metrics['assertividade']:.1f}%")
     st.sidebar.write(f"**Operações Analisadas:** {metrics['total_operations']:,}")
     st.sidebar.write(f"**Taxa de Uso de Gale:** {((metrics['gale1_calls']/metrics['total_signals'])*100):.1f}%")
-    
+
     # Performance por par na sidebar
+    par_analysis = agregados['par']
     if not par_analysis.empty:
         st.sidebar.header("🎯 Performance por Par")
         for _, row in par_analysis.iterrows():
             st.sidebar.write(f"**{row['par']}:** {row['assertividade']:.1f}% ({row['wins']}/{row['total']})")
 
+    # Tempo até interativo: do início do script até o fim desta execução
+    tempos = st.session_state.setdefault('tempos_execucao', [])
+    tempos.append(time.perf_counter() - inicio_execucao)
+    del tempos[:-20]
+    st.sidebar.caption(f"⏱️ Tempo até interativo: {tempos[-1] * 1000:.0f} ms "
+                       f"(mediana das últimas {len(tempos)}: {np.median(tempos) * 1000:.0f} ms)")
+
+    # Painel de performance: o que foi medido nesta execução e o acumulado
+    st.sidebar.toggle("⚙️ Painel de performance", value=instrumentation.ENABLED_FROM_ENV, key='painel_performance')
+    if instrumentation.is_enabled():
+        render_performance_panel(marca_performance)
+
 else:
-    st.error("❌ Não foi possível carregar os dados. Verifique se o arquivo 'mensagens_tratadas.csv' está no diretório correto.")
+    st.error("❌ Não foi possível carregar os dados. Verifique se o arquivo 'mensagens_tratadas.csv' (ou o store 'mensagens_tratadas.parquet') está no diretório correto.")
     st.info("📁 O arquivo deve estar na mesma pasta que este dashboard.")
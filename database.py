@@ -0,0 +1,250 @@
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+
+import pandas as pd
+
+from classifier import MSG_TYPES
+from instrumentation import timed
+from metrics import MetricsAccumulator
+from parallel_csv import load_classified_csv_parallel
+from store import DATA_FILE, STORE_DTYPES
+
+# Banco SQLite opcional com as mensagens classificadas e os totais pré-agregados
+DATABASE_FILE = 'mensagens_tratadas.sqlite'
+
+# Linhas inseridas por transação na conversão do CSV
+INSERT_BATCH = 100_000
+
+MESSAGE_COLUMNS = ['id', 'data', 'autor_id', 'mensagem', 'msg_type', 'par', 'direction', 'result', 'gale_level']
+
+# `data` é guardada em segundos desde 1970 (horário de Brasília, sem fuso).
+# Os rollups guardam uma contagem por (balde, msg_type), como os baldes de
+# MetricsAccumulator: por dia, por dia e par e por dia e hora.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER NOT NULL,
+    data INTEGER NOT NULL,
+    autor_id INTEGER NOT NULL,
+    mensagem TEXT,
+    msg_type TEXT NOT NULL,
+    par TEXT,
+    direction TEXT,
+    result TEXT,
+    gale_level INTEGER,
+    UNIQUE (autor_id, id)
+);
+CREATE INDEX IF NOT EXISTS messages_data_par_type ON messages (data, par, msg_type);
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    day TEXT NOT NULL, msg_type TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (day, msg_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_pair (
+    day TEXT NOT NULL, par TEXT NOT NULL, msg_type TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (day, par, msg_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    day TEXT NOT NULL, hour INTEGER NOT NULL, msg_type TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (day, hour, msg_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('revision', 0);
+PRAGMA user_version = 1;
+"""
+
+# Cada rollup soma as mensagens novas do lote (tabela temporária `novas`)
+_ROLLUP_UPDATES = [
+    """INSERT INTO rollup_daily (day, msg_type, n)
+       SELECT date(data, 'unixepoch'), msg_type, count(*) FROM novas WHERE true GROUP BY 1, 2
+       ON CONFLICT (day, msg_type) DO UPDATE SET n = n + excluded.n""",
+    """INSERT INTO rollup_pair (day, par, msg_type, n)
+       SELECT date(data, 'unixepoch'), par, msg_type, count(*) FROM novas WHERE par IS NOT NULL GROUP BY 1, 2, 3
+       ON CONFLICT (day, par, msg_type) DO UPDATE SET n = n + excluded.n""",
+    """INSERT INTO rollup_hourly (day, hour, msg_type, n)
+       SELECT date(data, 'unixepoch'), CAST(strftime('%H', data, 'unixepoch') AS INTEGER), msg_type, count(*)
+       FROM novas WHERE true GROUP BY 1, 2, 3
+       ON CONFLICT (day, hour, msg_type) DO UPDATE SET n = n + excluded.n""",
+]
+
+
+def _to_seconds(datas):
+    return (pd.to_datetime(datas).to_numpy().astype('datetime64[s]').astype('int64'))
+
+
+def _none_if_missing(valores):
+    return pd.Series(valores, dtype=object).where(pd.notna(valores), None)
+
+
+class MessageDatabase:
+    """Mensagens classificadas em SQLite, com rollups por dia, par e hora.
+
+    add_frame() grava as mensagens novas e soma as mesmas mensagens aos
+    rollups na mesma transação, então as consultas agregadas (accumulator(),
+    summary()) leem só os rollups, cujo tamanho cresce com dias x pares e não
+    com a quantidade de mensagens. As mensagens de um período são lidas pelo
+    índice em (data, par, msg_type).
+    """
+
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # Só cria as tabelas num banco novo: abrir para leitura não escreve nada
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] == 0:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.close()
+
+    def revision(self):
+        """Contador que muda a cada lote gravado (serve de chave de cache)."""
+        return self.connection.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    @timed('MessageDatabase.add_frame')
+    def add_frame(self, df):
+        """Grava um frame classificado; retorna quantas mensagens eram novas.
+
+        Mensagens já gravadas (mesmo `autor_id` e `id`) são ignoradas, então
+        reenviar um lote não conta nada duas vezes nos rollups.
+        """
+        if df.empty:
+            return 0
+        linhas = pd.DataFrame({
+            'id': df['id'].astype('int64'),
+            'data': _to_seconds(df['data']),
+            'autor_id': df['autor_id'].astype('int64'),
+            'mensagem': _none_if_missing(df['mensagem']) if 'mensagem' in df else None,
+            'msg_type': df['msg_type'].astype(str),
+            'par': _none_if_missing(df['par']),
+            'direction': _none_if_missing(df['direction']),
+            'result': _none_if_missing(df['result']),
+            'gale_level': df['gale_level'].astype('int64'),
+        }).sort_values('data', kind='stable')
+
+        conexao = self.connection
+        with conexao:
+            conexao.execute('DROP TABLE IF EXISTS temp.novas')
+            conexao.execute('CREATE TEMP TABLE novas AS SELECT * FROM messages WHERE 0')
+            conexao.execute('CREATE UNIQUE INDEX temp.novas_chave ON novas (autor_id, id)')
+            conexao.executemany(
+                f"INSERT OR IGNORE INTO novas VALUES ({', '.join('?' * len(MESSAGE_COLUMNS))})",
+                linhas[MESSAGE_COLUMNS].itertuples(index=False, name=None),
+            )
+            conexao.execute("""DELETE FROM novas WHERE EXISTS (
+                SELECT 1 FROM messages m WHERE m.autor_id = novas.autor_id AND m.id = novas.id)""")
+            for comando in _ROLLUP_UPDATES:
+                conexao.execute(comando)
+            novas = conexao.execute(
+                f"INSERT INTO messages ({', '.join(MESSAGE_COLUMNS)}) "
+                f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM novas ORDER BY rowid").rowcount
+            conexao.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            conexao.execute('DROP TABLE temp.novas')
+        return novas
+
+    def last_rowid(self):
+        """Maior rowid gravado: as mensagens novas sempre recebem rowids maiores."""
+        return self.connection.execute('SELECT coalesce(max(rowid), 0) FROM messages').fetchone()[0]
+
+    @timed('MessageDatabase.read_period')
+    def read_period(self, start_date=None, end_date=None, columns=None, after_rowid=None, until_rowid=None):
+        """Mensagens do período (dias inclusive), ordenadas por data, com os tipos do store.
+
+        `after_rowid`/`until_rowid` restringem às mensagens gravadas entre duas
+        leituras de last_rowid() (as novas desde a última vez).
+        """
+        colunas = list(columns) if columns is not None else list(MESSAGE_COLUMNS)
+        if 'data' not in colunas:
+            colunas = ['data'] + colunas
+        condicoes, parametros = [], []
+        if start_date is not None:
+            condicoes.append('data >= ?')
+            parametros.append(int(_to_seconds([pd.Timestamp(start_date)])[0]))
+        if end_date is not None:
+            condicoes.append('data < ?')
+            parametros.append(int(_to_seconds([pd.Timestamp(end_date) + pd.Timedelta(days=1)])[0]))
+        if after_rowid is not None:
+            condicoes.append('rowid > ?')
+            parametros.append(after_rowid)
+        if until_rowid is not None:
+            condicoes.append('rowid <= ?')
+            parametros.append(until_rowid)
+        consulta = f"SELECT {', '.join(colunas)} FROM messages"
+        if condicoes:
+            consulta += ' WHERE ' + ' AND '.join(condicoes)
+        df = pd.read_sql_query(consulta + ' ORDER BY data, rowid', self.connection, params=parametros)
+        df['data'] = pd.to_datetime(df['data'], unit='s')
+        return df.astype({coluna: tipo for coluna, tipo in STORE_DTYPES.items() if coluna in df})
+
+    @timed('MessageDatabase.accumulator')
+    def accumulator(self):
+        """MetricsAccumulator montado só a partir dos rollups."""
+        acumulador = MetricsAccumulator()
+        indice = {tipo: i for i, tipo in enumerate(MSG_TYPES)}
+        dias = {}
+        consultas = (
+            (acumulador.days, 'SELECT day, msg_type, n FROM rollup_daily'),
+            (acumulador.pairs, 'SELECT day, par, msg_type, n FROM rollup_pair'),
+            (acumulador.hours, 'SELECT day, hour, msg_type, n FROM rollup_hourly'),
+        )
+        for baldes, consulta in consultas:
+            for *chave, msg_type, n in self.connection.execute(consulta):
+                dia = dias.get(chave[0])
+                if dia is None:
+                    dia = dias[chave[0]] = date.fromisoformat(chave[0])
+                chave = dia if len(chave) == 1 else (dia, chave[1])
+                contagem = baldes.get(chave)
+                if contagem is None:
+                    contagem = baldes[chave] = [0] * len(MSG_TYPES)
+                contagem[indice[msg_type]] += n
+        return acumulador
+
+    def summary(self):
+        """Total de mensagens e primeiro/último dia, pelo rollup diário."""
+        total, primeiro, ultimo = self.connection.execute(
+            'SELECT sum(n), min(day), max(day) FROM rollup_daily').fetchone()
+        if not total:
+            return {'total': 0, 'first_day': None, 'last_day': None}
+        return {'total': total, 'first_day': date.fromisoformat(primeiro), 'last_day': date.fromisoformat(ultimo)}
+
+
+def convert_csv_to_database(csv_path=DATA_FILE, database_path=DATABASE_FILE):
+    """Converte o CSV tratado em um banco novo (substitui o anterior)."""
+    df = load_classified_csv_parallel(csv_path)
+    temporario = database_path + '.tmp'
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(temporario + sufixo):
+            os.remove(temporario + sufixo)
+    with MessageDatabase(temporario) as banco:
+        for inicio in range(0, len(df), INSERT_BATCH):
+            banco.add_frame(df.iloc[inicio:inicio + INSERT_BATCH])
+    # Ao fechar, o SQLite devolve o WAL ao arquivo principal e o apaga
+    for sufixo in ('-wal', '-shm'):
+        if os.path.exists(database_path + sufixo):
+            os.remove(database_path + sufixo)
+    os.replace(temporario, database_path)
+    return len(df)
+
+
+if __name__ == "__main__":
+    # python database.py convert [csv] [banco]  |  summary [banco]
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'convert'
+    argumentos = sys.argv[2:]
+    if comando == 'convert':
+        inicio = time.perf_counter()
+        total = convert_csv_to_database(*argumentos)
+        print(f"{total} mensagens gravadas em {time.perf_counter() - inicio:.2f}s")
+    elif comando == 'summary':
+        with MessageDatabase(*argumentos) as banco:
+            resumo = banco.summary()
+        print(f"{resumo['total']} mensagens de {resumo['first_day']} a {resumo['last_day']}")
+    else:
+        sys.exit(f"Comando desconhecido: {comando}")
@@ -0,0 +1,115 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Pontos por linha enviados ao navegador: cerca de 2 por pixel de um gráfico largo
+MAX_POINTS = 2000
+
+# Barras por gráfico; acima disso os dias são somados em semanas ou meses
+MAX_BARS = 180
+
+# Resoluções tentadas, da mais fina para a mais grossa (semanas de segunda a domingo)
+BAR_FREQUENCIES = [('D', 1), ('W-SUN', 7), ('M', 31), ('Q', 92)]
+
+
+def _as_float(valores):
+    valores = np.asarray(valores)
+    if np.issubdtype(valores.dtype, np.datetime64):
+        valores = valores.astype('datetime64[ns]').astype(np.int64)
+    return valores.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out=MAX_POINTS):
+    """Índices dos pontos mantidos pelo Largest-Triangle-Three-Buckets.
+
+    O primeiro e o último ponto ficam; os do meio são divididos em
+    `n_out - 2` baldes e de cada balde fica o ponto que forma o maior
+    triângulo com o ponto escolhido no balde anterior e a média do
+    próximo, então picos e vales costumam sobreviver (pegar 1 a cada k
+    pontos os perde).
+    `x` deve estar em ordem crescente (números ou datas).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_float(x), _as_float(y)
+
+    bordas = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    tamanhos = np.diff(bordas)
+    medias_x = np.append(np.add.reduceat(x[:-1], bordas[:-1]) / tamanhos, x[-1])
+    medias_y = np.append(np.add.reduceat(y[:-1], bordas[:-1]) / tamanhos, y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for balde in range(n_out - 2):
+        inicio, fim = bordas[balde], bordas[balde + 1]
+        ax, ay = x[anterior], y[anterior]
+        areas = np.abs((ax - medias_x[balde + 1]) * (y[inicio:fim] - ay)
+                       - (ax - x[inicio:fim]) * (medias_y[balde + 1] - ay))
+        anterior = inicio + int(np.argmax(areas))
+        indices[balde + 1] = anterior
+    return indices
+
+
+def downsample_series(serie, n_out=MAX_POINTS):
+    """Série (índice = eixo x) reduzida a no máximo `n_out` pontos pelo LTTB."""
+    return serie.iloc[lttb_indices(serie.index, serie.to_numpy(), n_out)]
+
+
+def downsample_frame(df, x, y, n_out=MAX_POINTS, by=None):
+    """Linhas de `df` mantidas pelo LTTB em `y` x `x`, separadamente por grupo `by`.
+
+    Cada grupo (ex: cada par) fica com até `n_out` pontos; a ordem das
+    linhas é preservada.
+    """
+    if by is None:
+        return df.iloc[lttb_indices(df[x].to_numpy(), df[y].to_numpy(), n_out)]
+    posicoes = []
+    for linhas in df.groupby(by, observed=True, sort=False).indices.values():
+        grupo = df.iloc[linhas]
+        posicoes.append(linhas[lttb_indices(grupo[x].to_numpy(), grupo[y].to_numpy(), n_out)])
+    if not posicoes:
+        return df
+    return df.iloc[np.sort(np.concatenate(posicoes))]
+
+
+def bar_frequency(n_days, max_bars=MAX_BARS):
+    """Frequência de agrupamento para que `n_days` dias caibam em `max_bars` barras."""
+    for frequencia, dias in BAR_FREQUENCIES:
+        if n_days / dias <= max_bars:
+            return frequencia
+    return BAR_FREQUENCIES[-1][0]
+
+
+def coarsen_bars(df, x, columns, max_bars=MAX_BARS):
+    """Soma `columns` de um frame diário em semanas, meses ou trimestres se preciso.
+
+    A resolução é a mais fina em que o intervalo de `x` cabe em `max_bars`
+    barras; períodos sem linhas ficam de fora. Retorna (frame, frequência),
+    com `x` no primeiro dia de cada período.
+    """
+    if df.empty:
+        return df, 'D'
+    datas = pd.to_datetime(df[x])
+    frequencia = bar_frequency((datas.max() - datas.min()).days + 1, max_bars)
+    if frequencia == 'D':
+        return df, frequencia
+    somas = df[columns].groupby(datas.dt.to_period(frequencia).dt.start_time.rename(x)).sum()
+    return somas.reset_index(), frequencia
+
+
+if __name__ == "__main__":
+    # python downsampling.py [pontos]: reduz uma curva aleatória e mostra tempo e tamanho
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    curva = pd.Series(rng.normal(size=n).cumsum(),
+                      index=pd.date_range('2020-01-01', periods=n, freq='min'))
+    inicio = time.perf_counter()
+    reduzida = downsample_series(curva)
+    segundos = time.perf_counter() - inicio
+    amplitude = (reduzida.max() - reduzida.min()) / (curva.max() - curva.min())
+    print(f"{n:,} -> {len(reduzida):,} pontos em {segundos * 1000:.1f} ms "
+          f"({amplitude:.1%} da amplitude original)")
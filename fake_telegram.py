@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from telethon.errors import FloodWaitError
+
+from synthetic import DEFAULT_PAIRS, SignalRoomGenerator
+
+
+@dataclass
+class FakeMessage:
+    """Os campos de uma mensagem do Telethon usados pela exportação."""
+    id: int
+    date: datetime
+    sender_id: int
+    text: str
+
+    @property
+    def message(self):
+        return self.text
+
+
+def synthetic_messages(n_signals, pairs=DEFAULT_PAIRS, start=datetime(2025, 9, 1), sender_id=-1000,
+                       first_id=1, seed=None):
+    """Mensagens de uma sala de sinais: cada sinal seguido dos seus gales e do resultado.
+
+    Geradas por synthetic.SignalRoomGenerator, com ids crescentes e datas em
+    UTC, como na exportação do Telegram.
+    """
+    gerador = SignalRoomGenerator(pairs=pairs, start=start, raw=True, author_id=sender_id, first_id=first_id,
+                                  seed=seed)
+    df = gerador.signals(n_signals)
+    return [FakeMessage(int(i), data.to_pydatetime(), sender_id, texto)
+            for i, data, texto in zip(df['id'], df['data'], df['mensagem'])]
+
+
+class FakeTelegramClient:
+    """Cliente local com o mesmo iter_messages do TelegramClient.
+
+    `messages` mapeia cada canal para a sua lista de mensagens (ids
+    crescentes). `flood_waits` mapeia um canal para uma lista de (n, segundos):
+    a n-ésima mensagem entregue naquele canal dispara um FloodWaitError, uma
+    vez cada. `delay` é a espera por mensagem, para simular a rede.
+    """
+
+    def __init__(self, messages, flood_waits=None, delay=0.0):
+        self.messages = messages
+        self.flood_waits = {canal: sorted(esperas) for canal, esperas in (flood_waits or {}).items()}
+        self.delay = delay
+        self.delivered = dict.fromkeys(messages, 0)
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def iter_messages(self, entity, limit=None, min_id=0, reverse=False):
+        self.calls.append((entity, limit, min_id))
+        mensagens = [m for m in self.messages[entity] if m.id > min_id]
+        if not reverse:
+            mensagens.reverse()
+        for i, mensagem in enumerate(mensagens):
+            if limit is not None and i >= limit:
+                return
+            esperas = self.flood_waits.get(entity)
+            if esperas and self.delivered[entity] >= esperas[0][0]:
+                raise FloodWaitError(request=None, capture=esperas.pop(0)[1])
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self.delivered[entity] += 1
+            yield mensagem
+
+
+async def _export_demo(canais, mensagens, pasta, max_concurrency):
+    from get_messages import export_group_messages
+
+    cliente = FakeTelegramClient(mensagens, flood_waits={canais[0]: [(100, 0.2)]}, delay=0.0005)
+    inicio = time.perf_counter()
+    exportadas = await export_group_messages(canais, os.path.join(pasta, 'mensagens.csv'), batch_size=200,
+                                             client=cliente, max_concurrency=max_concurrency)
+    return exportadas, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    # python fake_telegram.py [canais] [sinais por canal]: exporta vários canais sem rede,
+    # um de cada vez e em paralelo, e confere os arquivos gerados
+    import pandas as pd
+
+    from get_messages import partition_path
+
+    n_canais = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    n_sinais = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    canais = [f"https://t.me/+sala{i}" for i in range(n_canais)]
+    mensagens = {canal: synthetic_messages(n_sinais, seed=i) for i, canal in enumerate(canais)}
+
+    for concorrencia in (1, n_canais):
+        with tempfile.TemporaryDirectory() as pasta:
+            exportadas, segundos = asyncio.run(_export_demo(canais, mensagens, pasta, concorrencia))
+            for canal in canais:
+                ids = pd.read_csv(partition_path(os.path.join(pasta, 'mensagens.csv'), canal))['id']
+                assert ids.tolist() == [m.id for m in mensagens[canal]], canal
+        print(f"{concorrencia} canal(is) por vez: {sum(exportadas.values()):,} mensagens em {segundos:.2f}s")
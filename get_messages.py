@@ -1,44 +1,258 @@
+import asyncio
 import csv
+import json
 import os
+import re
+import sys
 from dotenv import load_dotenv
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
 
-# Carrega variáveis do .env
-load_dotenv()
-api_id = int(os.getenv("API_ID"))
-api_hash = os.getenv("API_HASH")
-session_name = os.getenv("SESSION_NAME", "session")
+CSV_HEADER = ["id", "data", "autor_id", "mensagem"]
 
-# Cria cliente
-client = TelegramClient(session_name, api_id, api_hash)
+# Checkpoint gravado ao lado do arquivo de saída (ex: mensagens.csv.checkpoint.json)
+CHECKPOINT_SUFFIX = ".checkpoint.json"
 
-async def export_group_messages(group_username, output_file="mensagens_backup.csv", limit=500):
+# Canais exportados ao mesmo tempo e lotes em espera para o escritor
+MAX_CONCURRENCY = 4
+QUEUE_SIZE = 16
+
+# FloodWait: espera o tempo pedido pelo Telegram mais um recuo que dobra a cada
+# nova espera seguida no mesmo canal; desiste após MAX_RETRIES
+FLOOD_BACKOFF = 1.0
+MAX_RETRIES = 5
+
+def create_client():
+    """Cria o cliente do Telegram com as credenciais do .env"""
+    load_dotenv()
+    api_id = int(os.getenv("API_ID"))
+    api_hash = os.getenv("API_HASH")
+    session_name = os.getenv("SESSION_NAME", "session")
+    return TelegramClient(session_name, api_id, api_hash)
+
+def load_checkpoint(output_file):
     """
-    Exporta mensagens de um grupo para um arquivo CSV.
-    
-    :param group_username: @username do grupo ou link (ex: 'https://t.me/nome_do_grupo')
-    :param output_file: nome do arquivo de saída
-    :param limit: limite de mensagens (None para todas)
+    Lê o checkpoint de uma exportação.
+
+    O checkpoint guarda o canal, o maior id já exportado e o tamanho do arquivo
+    de saída no momento em que esse id foi gravado. Se o arquivo existe mas não
+    tem checkpoint (exportação antiga), o maior id é lido do próprio CSV.
     """
-    # Abre arquivo CSV
-    with open(output_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["id", "data", "autor_id", "mensagem"])
-
-        async for message in client.iter_messages(group_username, limit=limit):
-            writer.writerow([
-                message.id,
-                message.date.strftime("%Y-%m-%d %H:%M:%S") if message.date else "",
-                message.sender_id,
-                message.text if message.text else ""
-            ])
-
-    print(f"Exportação concluída! Mensagens salvas em {output_file}")
-
-async def main():
-    # Substitua pelo @username ou link do grupo
-    grupo = "https://t.me/+bhVaGzRkhuozZDIx"  # ex: "https://t.me/grupoTeste"
-    await export_group_messages(grupo, output_file="mensagens.csv", limit=100)
+    caminho = output_file + CHECKPOINT_SUFFIX
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+
+    if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+        return None
+
+    with open(output_file, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        # Linhas sem id numérico (corrompidas ou em branco) não contam
+        max_id = max((int(linha[0]) for linha in reader if linha and linha[0].isdigit()), default=0)
+    return {"channel": None, "max_id": max_id, "offset": os.path.getsize(output_file)}
+
+def save_checkpoint(output_file, checkpoint):
+    """Grava o checkpoint de forma atômica (arquivo temporário + rename)."""
+    caminho = output_file + CHECKPOINT_SUFFIX
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(caminho + ".tmp", caminho)
+
+def partition_path(output_file, channel):
+    """Arquivo de um canal numa exportação de vários canais.
+
+    Ex: ('mensagens.csv', 'https://t.me/+abc') -> 'mensagens-+abc.csv'
+    """
+    base, extensao = os.path.splitext(output_file)
+    nome = re.sub(r"[^A-Za-z0-9_+-]+", "_", channel.rstrip("/").rsplit("/", 1)[-1]).strip("_")
+    return f"{base}-{nome}{extensao}"
+
+class _Partition:
+    """Arquivo de saída de um canal, com o seu checkpoint."""
+
+    def __init__(self, channel, output_file):
+        self.channel = channel
+        self.output_file = output_file
+        checkpoint = load_checkpoint(output_file) or {"channel": channel, "max_id": 0, "offset": 0}
+        if checkpoint["channel"] not in (None, channel):
+            raise ValueError(f"{output_file} pertence a outro grupo: {checkpoint['channel']}")
+        checkpoint["channel"] = channel
+
+        # Checkpoint sem o arquivo (apagado): exporta de novo desde o início; arquivo
+        # menor que o checkpoint: foi substituído ou cortado e não dá para saber o que falta
+        tamanho = os.path.getsize(output_file) if os.path.exists(output_file) else None
+        if tamanho is None and checkpoint["offset"] > 0:
+            print(f"{output_file} não existe mais: exportando {channel} desde o início")
+            checkpoint.update(max_id=0, offset=0)
+        elif tamanho is not None and tamanho < checkpoint["offset"]:
+            raise ValueError(f"{output_file} tem {tamanho} bytes, menos que os {checkpoint['offset']} do checkpoint; "
+                             f"apague {output_file + CHECKPOINT_SUFFIX} para exportar de novo")
+        self.checkpoint = checkpoint
+
+        # Descarta um lote gravado pela metade depois do último checkpoint
+        if os.path.exists(output_file) and os.path.getsize(output_file) > checkpoint["offset"]:
+            with open(output_file, "r+b") as f:
+                f.truncate(checkpoint["offset"])
+
+        self.file = open(output_file, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if checkpoint["offset"] == 0:
+            self.writer.writerow(CSV_HEADER)
+
+    def write(self, rows):
+        """Acrescenta um lote ao arquivo e só então avança o checkpoint."""
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.checkpoint["max_id"] = rows[-1][0]
+        self.checkpoint["offset"] = os.fstat(self.file.fileno()).st_size
+        save_checkpoint(self.output_file, self.checkpoint)
+
+    def close(self):
+        self.file.close()
+
+def _message_row(message):
+    return [
+        message.id,
+        message.date.strftime("%Y-%m-%d %H:%M:%S") if message.date else "",
+        message.sender_id,
+        message.text if message.text else ""
+    ]
 
-with client:
-    client.loop.run_until_complete(main())
\ No newline at end of file
+async def _fetch_channel(client, partition, fila, limit, batch_size):
+    """Busca as mensagens novas de um canal e manda os lotes para o escritor.
+
+    Num FloodWait, os lotes já buscados seguem para o escritor e só este canal
+    espera; depois a busca continua a partir do último id recebido.
+    """
+    ultimo_id = partition.checkpoint["max_id"]
+    restantes = limit
+    tentativas = 0
+    while restantes is None or restantes > 0:
+        rows = []
+        try:
+            async for message in client.iter_messages(partition.channel, limit=restantes, min_id=ultimo_id, reverse=True):
+                rows.append(_message_row(message))
+                ultimo_id = message.id
+                if restantes is not None:
+                    restantes -= 1
+                if len(rows) >= batch_size:
+                    await fila.put((partition, rows))
+                    rows = []
+                    tentativas = 0
+            if rows:
+                await fila.put((partition, rows))
+            return
+        except FloodWaitError as e:
+            if rows:
+                await fila.put((partition, rows))
+                tentativas = 0
+            tentativas += 1
+            if tentativas > MAX_RETRIES:
+                raise
+            espera = e.seconds + FLOOD_BACKOFF * 2 ** (tentativas - 1)
+            print(f"FloodWait em {partition.channel}: aguardando {espera:.0f}s")
+            await asyncio.sleep(espera)
+
+async def _write_batches(fila, exportadas):
+    """Escritor único: grava os lotes de todos os canais, na ordem em que chegam."""
+    while True:
+        item = await fila.get()
+        if item is None:
+            return
+        partition, rows = item
+        await asyncio.to_thread(partition.write, rows)
+        exportadas[partition.channel] += len(rows)
+        print(f"{exportadas[partition.channel]} mensagens exportadas de {partition.channel} "
+              f"(último id: {partition.checkpoint['max_id']})")
+
+async def export_group_messages(group_username, output_file="mensagens_backup.csv", limit=None, batch_size=500,
+                                client=None, max_concurrency=MAX_CONCURRENCY):
+    """
+    Exporta de forma incremental as mensagens de um ou mais grupos para CSV.
+
+    Busca só as mensagens com id maior que o último exportado (min_id), da mais
+    antiga para a mais nova, e acrescenta ao CSV em lotes. A cada lote gravado o
+    checkpoint é atualizado, então uma exportação interrompida continua de onde
+    parou na próxima execução, sem duplicar linhas.
+
+    Com uma lista de grupos, até `max_concurrency` são buscados ao mesmo tempo
+    pelo mesmo cliente, cada um no seu arquivo (partition_path). Os lotes passam
+    por uma fila única até o escritor, que grava um lote por vez.
+
+    :param group_username: @username ou link do grupo, ou uma lista deles
+    :param output_file: arquivo de saída (com vários grupos, a base dos nomes)
+    :param limit: limite de mensagens novas por grupo nesta execução (None para todas)
+    :param batch_size: quantidade de mensagens por lote gravado em disco
+    :param client: TelegramClient já conectado (ou qualquer objeto com o mesmo
+        iter_messages); sem ele, um cliente é criado a partir do .env
+    :param max_concurrency: quantos grupos são buscados ao mesmo tempo
+    :return: dicionário grupo -> mensagens novas exportadas
+    """
+    if client is None:
+        async with create_client() as client:
+            return await export_group_messages(group_username, output_file, limit, batch_size, client,
+                                               max_concurrency)
+
+    if isinstance(group_username, str):
+        saidas = {group_username: output_file}
+    else:
+        saidas = {canal: partition_path(output_file, canal) for canal in group_username}
+
+    partitions = []
+    try:
+        for canal, arquivo in saidas.items():
+            partitions.append(_Partition(canal, arquivo))
+
+        exportadas = {canal: 0 for canal in saidas}
+        falhas = {}
+        fila = asyncio.Queue(maxsize=QUEUE_SIZE)
+        pendentes = asyncio.Queue()
+        for partition in partitions:
+            pendentes.put_nowait(partition)
+
+        async def worker():
+            while not pendentes.empty():
+                partition = pendentes.get_nowait()
+                try:
+                    await _fetch_channel(client, partition, fila, limit, batch_size)
+                except Exception as e:
+                    # Um canal com erro não interrompe os outros; o que já foi
+                    # gravado dele fica no checkpoint para a próxima execução
+                    falhas[partition.channel] = e
+                    print(f"Erro ao exportar {partition.channel}: {e}")
+
+        escritor = asyncio.create_task(_write_batches(fila, exportadas))
+        buscas = asyncio.gather(*(worker() for _ in range(min(max_concurrency, len(partitions)))))
+        try:
+            await asyncio.wait([buscas, escritor], return_when=asyncio.FIRST_COMPLETED)
+            if escritor.done():
+                # O escritor só termina antes das buscas se falhou
+                buscas.cancel()
+                escritor.result()
+            await fila.put(None)
+            await escritor
+        finally:
+            buscas.cancel()
+            escritor.cancel()
+    finally:
+        for partition in partitions:
+            partition.close()
+
+    for canal, total in exportadas.items():
+        if canal not in falhas:
+            print(f"Exportação concluída! {total} mensagens novas salvas em {saidas[canal]}")
+    if falhas:
+        raise RuntimeError(f"Falha ao exportar {len(falhas)} grupo(s): {', '.join(falhas)}") from next(iter(falhas.values()))
+    return exportadas
+
+async def main(grupos):
+    await export_group_messages(grupos[0] if len(grupos) == 1 else grupos, output_file="mensagens.csv")
+
+if __name__ == "__main__":
+    # python get_messages.py [grupo ...]: com mais de um grupo, um arquivo por grupo
+    # Substitua pelo @username ou link do grupo
+    grupos = sys.argv[1:] or ["https://t.me/+bhVaGzRkhuozZDIx"]  # ex: "https://t.me/grupoTeste"
+    asyncio.run(main(grupos))
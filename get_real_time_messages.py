@@ -1,7 +1,14 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 from telethon import TelegramClient, events
 
+from database import DATABASE_FILE
+from ingest import StreamIngestor
+from instrumentation import measure
+from lifecycle import TradeReconstructor
+from store import DATA_FILE, STORE_DIR
+
 # Carrega variáveis do .env
 load_dotenv()
 api_id = int(os.getenv("API_ID"))
@@ -11,21 +18,49 @@ session_name = os.getenv("SESSION_NAME", "session")
 # Cria cliente
 client = TelegramClient(session_name, api_id, api_hash)
 
+# Mensagens classificadas vão em lote para o fim do CSV tratado (acompanhado
+# pelo modo ao vivo) e, se já foram criados com `python store.py convert` e
+# `python database.py convert`, para o store Parquet e o banco SQLite. Criar o
+# store aqui faria o dashboard trocar o histórico do CSV só pelos lotes novos
+ingestor = StreamIngestor(max_rows=200, max_seconds=30, csv_path=DATA_FILE,
+                          store_dir=STORE_DIR if os.path.isdir(STORE_DIR) else None,
+                          database_path=DATABASE_FILE if os.path.exists(DATABASE_FILE) else None)
+
+# Liga cada sinal ao seu gale/resultado conforme as mensagens chegam
+trades = TradeReconstructor()
+
 # Handler: dispara sempre que uma mensagem nova aparecer no grupo
 @client.on(events.NewMessage(chats=["https://t.me/+fP8CwJ_w3ONhOThh", "https://t.me/+bhVaGzRkhuozZDIx"]))
 async def handler(event):
-    mensagem = event.message.message
-    autor_id = event.sender_id
-    data = event.message.date
+    # Com SINAIS_PROFILE=1, o tempo de cada mensagem vai para o log de performance
+    with measure('ingest.handler', rows=1):
+        mensagem = event.message.message
+        autor_id = event.sender_id or event.chat_id
+        data = event.message.date
+
+        # Classifica e coloca no lote
+        linha = ingestor.add_message(event.message.id, data, autor_id, mensagem)
+
+        # Exemplo: imprime na tela
+        tipo = linha['msg_type'] if linha else "ignorada"
+        print(f"[{data}] {autor_id} ({tipo}): {mensagem}")
 
-    # Exemplo: imprime na tela
-    print(f"[{data}] {autor_id}: {mensagem}")
+        if linha is not None:
+            for trade in trades.feed(linha['data'], linha['msg_type'], linha['par'], linha['direction'], linha['id']):
+                print(f"Operação {trade['status']}: {trade['par']} {trade['direction']} -> {trade['result']} "
+                      f"(gale {trade['gale_level']})")
 
-    # Exemplo: salvar em arquivo de texto
-    with open("mensagens_realtime.txt", "a", encoding="utf-8") as f:
-        f.write(f"[{data}] {autor_id}: {mensagem}\n")
+async def flush_periodically():
+    """Grava o lote pendente mesmo quando as mensagens param de chegar."""
+    while True:
+        await asyncio.sleep(1)
+        ingestor.flush_if_due()
 
 # Inicia o cliente (fica escutando em loop)
 print("Escutando mensagens em tempo real...")
 client.start()
-client.run_until_disconnected()
\ No newline at end of file
+client.loop.create_task(flush_periodically())
+try:
+    client.run_until_disconnected()
+finally:
+    ingestor.flush()
@@ -0,0 +1,106 @@
+import os
+import time
+
+import pandas as pd
+
+from classifier import classify_message
+from cleaning import UTC_OFFSET, is_relevant
+from database import MessageDatabase
+from instrumentation import measure, timed
+from store import STORE_DIR, append_to_store
+
+
+# Colunas do CSV tratado (cleaning.py), na ordem do arquivo
+CSV_COLUMNS = ['id', 'data', 'autor_id', 'mensagem']
+
+
+def append_to_csv(lote, path):
+    """Acrescenta um lote ao fim do CSV tratado (com cabeçalho se o arquivo é novo).
+
+    O lote é montado em memória e gravado com uma escrita só; quem lê o
+    arquivo enquanto isso só considera registros completos.
+    """
+    novo = not os.path.exists(path) or os.path.getsize(path) == 0
+    texto = lote[CSV_COLUMNS].to_csv(header=novo, index=False)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        f.write(texto)
+
+
+class StreamIngestor:
+    """Classifica mensagens ao chegar e grava em lote no store Parquet.
+
+    As mensagens classificadas ficam em memória até juntar `max_rows` linhas
+    ou passar `max_seconds` desde a primeira do lote; aí o lote inteiro vira
+    um arquivo novo no store (append_to_store), que o dashboard lê sem
+    reprocessar o histórico. Com `database_path`, o lote também vai para o
+    banco SQLite (database.py), atualizando os rollups na mesma gravação.
+    Com `csv_path`, as colunas do CSV tratado (id, data, autor_id, mensagem)
+    são acrescentadas ao fim do arquivo, que o modo ao vivo do dashboard
+    acompanha (live.LiveFrame). `store_dir=None` não grava no store.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, max_rows=200, max_seconds=30.0, database_path=None, csv_path=None):
+        self.store_dir = store_dir
+        self.database_path = database_path
+        self.csv_path = csv_path
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.rows = []
+        self.first_at = None
+
+    @timed('ingest.add_message')
+    def add_message(self, message_id, date, autor_id, text):
+        """Classifica uma mensagem e a coloca no lote; retorna a linha gravada.
+
+        `date` é o horário UTC do Telegram. Mensagens que o tratamento em lote
+        (cleaning.py) descartaria ou que não são classificadas são ignoradas
+        (retorna None).
+        """
+        if not is_relevant(text):
+            return None
+        classificacao = classify_message(text, autor_id)
+        if classificacao is None:
+            return None
+
+        data = pd.Timestamp(date)
+        if data.tzinfo is not None:
+            data = data.tz_convert('UTC').tz_localize(None)
+        linha = {
+            'id': message_id,
+            'data': data + UTC_OFFSET,
+            'autor_id': autor_id,
+            'mensagem': text,
+            'msg_type': classificacao['type'],
+            'par': classificacao['par'],
+            'direction': classificacao['direction'],
+            'result': classificacao['result'],
+            'gale_level': classificacao['gale_level'],
+        }
+        self.rows.append(linha)
+        if self.first_at is None:
+            self.first_at = time.monotonic()
+        if len(self.rows) >= self.max_rows:
+            self.flush()
+        return linha
+
+    def flush_if_due(self):
+        """Grava o lote se a mensagem mais antiga já esperou `max_seconds`."""
+        if self.first_at is not None and time.monotonic() - self.first_at >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        """Grava o lote atual no store; retorna quantas mensagens foram gravadas."""
+        if not self.rows:
+            return 0
+        with measure('ingest.flush', rows=len(self.rows)):
+            lote = pd.DataFrame(self.rows)
+            if self.store_dir is not None:
+                append_to_store(lote, self.store_dir)
+            if self.csv_path is not None:
+                append_to_csv(lote, self.csv_path)
+            if self.database_path is not None:
+                with MessageDatabase(self.database_path) as banco:
+                    banco.add_frame(lote)
+        self.rows = []
+        self.first_at = None
+        return len(lote)
@@ -0,0 +1,207 @@
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Liga a medição desde o início (ex: SINAIS_PROFILE=1 streamlit run dashboard_sinais.py)
+ENV_VAR = 'SINAIS_PROFILE'
+
+# Log estruturado: uma linha JSON por medição
+LOG_FILE = os.getenv('SINAIS_PROFILE_LOG', 'performance.jsonl')
+
+# Medições mantidas em memória para o painel
+MAX_RECORDS = 2000
+
+logger = logging.getLogger('sinais.performance')
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# Ligada por contexto (cada thread/tarefa tem o seu): uma sessão do dashboard
+# que liga o painel não liga a medição das outras. SINAIS_PROFILE liga para todas.
+_enabled = contextvars.ContextVar('sinais_profile', default=False)
+ENABLED_FROM_ENV = os.getenv(ENV_VAR, '') not in ('', '0')
+_records = deque(maxlen=MAX_RECORDS)
+_contador = 0
+_inicios = itertools.count(1)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def rss_bytes():
+    """Memória residente atual do processo (pico, fora do Linux)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if sys.platform == 'darwin' else maximo * 1024
+
+
+def is_enabled():
+    return ENABLED_FROM_ENV or _enabled.get()
+
+
+def set_enabled(enabled, log_file=LOG_FILE):
+    """Liga ou desliga a medição no contexto atual; ligada, também grava em `log_file` (None para não gravar).
+
+    Com SINAIS_PROFILE, a medição fica ligada em todos os contextos.
+    """
+    _enabled.set(bool(enabled))
+    if is_enabled() and log_file and not logger.handlers:
+        handler = logging.FileHandler(log_file, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class Span:
+    """Uma medição em andamento: `rows` pode ser preenchido dentro do bloco."""
+
+    __slots__ = ('name', 'rows', 'inicio', 'rss_inicio', 'depth', 'order')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        pilha = getattr(_local, 'pilha', None)
+        if pilha is None:
+            pilha = _local.pilha = []
+        self.depth = len(pilha)
+        self.order = next(_inicios)
+        pilha.append(self)
+        self.rss_inicio = rss_bytes()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        rss = rss_bytes()
+        _local.pilha.pop()
+        _record({
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'name': self.name,
+            'seconds': segundos,
+            'rows': self.rows,
+            'rss_delta_mb': (rss - self.rss_inicio) / 2**20,
+            'rss_mb': rss / 2**20,
+            'depth': self.depth,
+            'order': self.order,
+            'thread': threading.current_thread().name,
+            'thread_id': threading.get_ident(),
+            'error': exc[0].__name__ if exc[0] is not None else None,
+        })
+        return False
+
+
+def _record(registro):
+    global _contador
+    with _lock:
+        _contador += 1
+        registro['seq'] = _contador
+        _records.append(registro)
+    if logger.handlers:
+        logger.info(json.dumps(registro, default=str))
+
+
+class _NullSpan:
+    """Medição desligada: aceita `rows` e não faz nada."""
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def measure(name, rows=None):
+    """Context manager que mede o bloco; desligado, não faz nada.
+
+        with measure('read_csv') as span:
+            df = pd.read_csv(...)
+            span.rows = len(df)
+
+    Desligado, devolve sempre o mesmo objeto vazio, sem medir nem alocar.
+    """
+    if not is_enabled():
+        return _NULL_SPAN
+    return Span(name, rows)
+
+
+def timed(name=None):
+    """Decorator que mede cada chamada; as linhas vêm do `shape` do resultado (frames e arrays)."""
+    def decorator(func):
+        nome = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            with Span(nome) as span:
+                resultado = func(*args, **kwargs)
+                forma = getattr(resultado, 'shape', None)
+                if forma:
+                    span.rows = forma[0]
+                return resultado
+        return wrapper
+    return decorator
+
+
+def mark():
+    """Posição atual na sequência de medições (para pegar só as de depois)."""
+    return _contador
+
+
+def records(since=0, thread_id=None):
+    """Medições com seq maior que `since`, na ordem em que terminaram.
+
+    `order` dá a ordem em que começaram e `depth` o aninhamento (uma
+    medição dentro de outra), para mostrar como uma árvore. Com
+    `thread_id`, só as medidas nessa thread (ex: threading.get_ident()).
+    """
+    with _lock:
+        return [registro for registro in _records
+                if registro['seq'] > since and (thread_id is None or registro['thread_id'] == thread_id)]
+
+
+def summary(registros):
+    """Totais por nome: chamadas, segundos (total e máximo), linhas e memória."""
+    totais = {}
+    for registro in registros:
+        total = totais.setdefault(registro['name'], {
+            'name': registro['name'], 'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+            'rows': 0, 'rss_delta_mb': 0.0,
+        })
+        total['calls'] += 1
+        total['seconds'] += registro['seconds']
+        total['max_seconds'] = max(total['max_seconds'], registro['seconds'])
+        total['rows'] += registro['rows'] or 0
+        total['rss_delta_mb'] += registro['rss_delta_mb']
+    return sorted(totais.values(), key=lambda total: -total['seconds'])
+
+
+set_enabled(ENABLED_FROM_ENV)
+
+
+if __name__ == "__main__":
+    # python instrumentation.py [performance.jsonl]: resumo de um log gravado
+    caminho = sys.argv[1] if len(sys.argv) > 1 else LOG_FILE
+    with open(caminho, encoding='utf-8') as f:
+        registros = [json.loads(linha) for linha in f if linha.strip()]
+    print(f"{'medição':<40}{'chamadas':>9}{'total (s)':>11}{'máx (s)':>10}{'linhas':>12}{'Δ RSS (MB)':>12}")
+    for total in summary(registros):
+        print(f"{total['name']:<40}{total['calls']:>9}{total['seconds']:>11.3f}{total['max_seconds']:>10.3f}"
+              f"{total['rows']:>12,}{total['rss_delta_mb']:>12.1f}")
@@ -0,0 +1,142 @@
+import sys
+
+import pandas as pd
+
+from instrumentation import timed
+
+# Colunas de cada operação reconstruída
+TRADE_COLUMNS = [
+    'par', 'direction', 'status', 'result', 'outcome', 'gale_level',
+    'entry_time', 'gale1_time', 'gale2_time', 'result_time', 'signal_id', 'result_id',
+]
+
+# Situação de cada linha
+COMPLETE = 'COMPLETE'       # sinal com resultado
+INCOMPLETE = 'INCOMPLETE'   # sinal sem resultado (substituído por outro sinal ou ainda aberto)
+ORPHAN = 'ORPHAN'           # gale/resultado sem sinal aberto para o par
+
+# Resultado final de cada tipo: (outcome, nível de gale alcançado)
+_RESULTS = {
+    'WIN': ('WIN', 0),
+    'WIN_G1': ('WIN', 1),
+    'WIN_G2': ('WIN', 2),
+    'STOP': ('LOSS', 2),
+}
+_GALE_CALLS = {'GALE_CALL_1': 1, 'GALE_CALL_2': 2}
+
+
+def _new_trade(par, status, **campos):
+    trade = dict.fromkeys(TRADE_COLUMNS)
+    trade.update(par=par, status=status, gale_level=0)
+    trade.update(campos)
+    return trade
+
+
+class TradeReconstructor:
+    """Liga SIGNAL → GALE_CALL_1 → GALE_CALL_2 → WIN/STOP de cada par.
+
+    Recebe as mensagens classificadas em ordem de tempo (feed) e mantém uma
+    operação aberta por par, então operações de pares diferentes podem se
+    intercalar. Cada mensagem custa O(1); feed devolve as linhas que ficaram
+    prontas (operações fechadas, sinais sem resultado e órfãos) e finish()
+    devolve as operações que ainda estão abertas.
+    """
+
+    def __init__(self):
+        self.open = {}
+
+    def feed(self, data, msg_type, par, direction=None, message_id=None):
+        """Processa uma mensagem classificada; retorna as linhas concluídas."""
+        prontas = []
+        if msg_type == 'SIGNAL':
+            anterior = self.open.pop(par, None)
+            if anterior is not None:
+                prontas.append(anterior)
+            self.open[par] = _new_trade(
+                par, INCOMPLETE, direction=direction, entry_time=data, signal_id=message_id,
+            )
+
+        elif msg_type in _GALE_CALLS:
+            nivel = _GALE_CALLS[msg_type]
+            trade = self.open.get(par)
+            if trade is None:
+                prontas.append(_new_trade(par, ORPHAN, result=msg_type, gale_level=nivel, result_time=data,
+                                          result_id=message_id))
+            else:
+                trade[f'gale{nivel}_time'] = data
+                trade['gale_level'] = max(trade['gale_level'], nivel)
+
+        elif msg_type in _RESULTS:
+            outcome, nivel = _RESULTS[msg_type]
+            trade = self.open.pop(par, None)
+            if trade is None:
+                trade = _new_trade(par, ORPHAN)
+            else:
+                trade['status'] = COMPLETE
+            trade.update(result=msg_type, outcome=outcome, result_time=data, result_id=message_id,
+                         gale_level=nivel)
+            prontas.append(trade)
+
+        return prontas
+
+    def finish(self):
+        """Fecha a reconstrução: devolve as operações ainda sem resultado."""
+        abertas = sorted(self.open.values(), key=lambda trade: trade['entry_time'])
+        self.open = {}
+        return abertas
+
+
+def trades_frame(linhas):
+    """Monta o DataFrame de operações (uma linha por operação)."""
+    df = pd.DataFrame(linhas, columns=TRADE_COLUMNS)
+    for coluna in ('entry_time', 'gale1_time', 'gale2_time', 'result_time'):
+        df[coluna] = pd.to_datetime(df[coluna])
+    df['gale_level'] = df['gale_level'].astype('int8')
+    df[['signal_id', 'result_id']] = df[['signal_id', 'result_id']].astype('Int64')
+    return df
+
+
+@timed('reconstruct_trades')
+def reconstruct_trades(df_classified):
+    """Reconstrói todas as operações de um frame classificado em uma passada.
+
+    As mensagens são ordenadas por data (e id, nos empates) antes de passar
+    pelo TradeReconstructor. Retorna um DataFrame com TRADE_COLUMNS ordenado
+    pelo horário do sinal (órfãos pelo horário da mensagem).
+    """
+    ordem = ['data', 'id'] if 'id' in df_classified else ['data']
+    df = df_classified.sort_values(ordem, kind='stable')
+    ids = df['id'] if 'id' in df else pd.Series(None, index=df.index, dtype=object)
+
+    reconstrutor = TradeReconstructor()
+    linhas = []
+    for data, msg_type, par, direction, message_id in zip(
+            df['data'], df['msg_type'], df['par'], df['direction'], ids):
+        linhas.extend(reconstrutor.feed(data, msg_type, par, None if pd.isna(direction) else direction,
+                                        message_id))
+    linhas.extend(reconstrutor.finish())
+
+    trades = trades_frame(linhas)
+    momento = trades['entry_time'].fillna(trades['result_time'])
+    return trades.iloc[momento.argsort(kind='stable')].reset_index(drop=True)
+
+
+def lifecycle_report(trades):
+    """Resumo das sequências: quantas completas, incompletas e órfãs."""
+    contagem = trades['status'].value_counts()
+    completas = trades[trades['status'] == COMPLETE]
+    return {
+        'complete': int(contagem.get(COMPLETE, 0)),
+        'incomplete': int(contagem.get(INCOMPLETE, 0)),
+        'orphan': int(contagem.get(ORPHAN, 0)),
+        'median_duration': (completas['result_time'] - completas['entry_time']).median(),
+    }
+
+
+if __name__ == "__main__":
+    # python lifecycle.py [arquivo.csv]: reconstrói as operações e mostra o resumo
+    from store import DATA_FILE, load_classified_csv
+
+    trades = reconstruct_trades(load_classified_csv(sys.argv[1] if len(sys.argv) > 1 else DATA_FILE))
+    print(lifecycle_report(trades))
+    print(pd.crosstab(trades['direction'], trades['result']))
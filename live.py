@@ -0,0 +1,187 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import MetricsAccumulator
+from parallel_csv import classify_range, complete_records_end, concat_frames, load_classified_csv_parallel
+from store import DATA_FILE, compact_frame
+
+# Pedaços acrescentados mantidos separados antes de juntar tudo em um frame só
+MAX_PARTS = 32
+
+# Bytes antes da posição lida conferidos a cada update() (detectam reescrita no lugar)
+CHECK_BYTES = 4096
+
+
+def tail_checksum(path, offset, start=0):
+    """Hash dos até CHECK_BYTES bytes de `path` que terminam em `offset` (a partir de `start`)."""
+    inicio = max(start, offset - CHECK_BYTES)
+    with open(path, 'rb') as f:
+        f.seek(inicio)
+        return hashlib.blake2b(f.read(offset - inicio), digest_size=16).digest()
+
+
+def channel_accumulators(df):
+    """Um MetricsAccumulator por canal (`autor_id`)."""
+    return {
+        int(canal): MetricsAccumulator.from_frame(grupo)
+        for canal, grupo in df.groupby('autor_id', observed=True, sort=True)
+    }
+
+
+class LiveFrame:
+    """Frame classificado (compacto) e métricas de um CSV que só cresce.
+
+    A primeira leitura classifica o arquivo inteiro; as seguintes (update())
+    leem só os registros completos acrescentados depois da última posição
+    lida, classificam esses e os somam às métricas, então o custo de cada
+    atualização depende das mensagens novas e não do histórico. Se o
+    arquivo foi substituído (outro inode), encolheu, mudou de cabeçalho ou
+    foi reescrito no lugar (o hash dos bytes antes da posição lida mudou,
+    como num `df.to_csv` sobre o mesmo arquivo), relê tudo.
+
+    Os acréscimos ficam em pedaços ordenados por data; period() recorta
+    cada pedaço e frame() junta todos. O resultado é o mesmo de
+    load_classified_csv(path, keep_text=False) sobre o arquivo atual.
+    `channels` tem as métricas de cada canal e `revision` muda a cada
+    atualização que trouxe mensagens.
+    """
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.parts = []
+        self.accumulator = None
+        self.channels = {}
+        self.revision = 0
+        self.offset = 0
+        self.header = None
+        self.identity = None
+        self.checksum = None
+
+    def update(self):
+        """Lê o que foi acrescentado; retorna quantas mensagens classificadas entraram.
+
+        Retorna None quando o arquivo precisou ser relido do início.
+        """
+        with self.lock:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                cabecalho = f.readline()
+            identidade = (stat.st_dev, stat.st_ino)
+            if (self.accumulator is None or identidade != self.identity
+                    or stat.st_size < self.offset or cabecalho != self.header
+                    or tail_checksum(self.path, self.offset, len(cabecalho)) != self.checksum):
+                fim = complete_records_end(self.path, len(cabecalho), stat.st_size)
+                # Um processo só: o dashboard e a API chamam daqui, de dentro de
+                # um servidor com várias threads, onde abrir um pool é arriscado
+                df = load_classified_csv_parallel(self.path, keep_text=False, workers=1, end=fim)
+                self.parts = [df]
+                self.accumulator = MetricsAccumulator.from_frame(df)
+                self.channels = channel_accumulators(df)
+                self.offset, self.header, self.identity = fim, cabecalho, identidade
+                self.checksum = tail_checksum(self.path, fim, len(cabecalho))
+                self.revision += 1
+                return None
+
+            fim = complete_records_end(self.path, self.offset, stat.st_size)
+            if fim == self.offset:
+                return 0
+            novos = classify_range(self.path, cabecalho, self.offset, fim)
+            novos = compact_frame(novos.sort_values('data', kind='stable').reset_index(drop=True))
+            self.offset = fim
+            self.checksum = tail_checksum(self.path, fim, len(cabecalho))
+            if novos.empty:
+                return 0
+
+            # Métricas: soma só os baldes das mensagens novas (merge devolve um
+            # acumulador novo, então quem já leu o anterior não o vê mudar)
+            self.accumulator = self.accumulator.merge(MetricsAccumulator.from_frame(novos))
+            canais = dict(self.channels)
+            for canal, acumulador in channel_accumulators(novos).items():
+                canais[canal] = canais[canal].merge(acumulador) if canal in canais else acumulador
+            self.channels = canais
+            self.revision += 1
+            ultimo = self.parts[-1]['data'].iloc[-1] if len(self.parts[-1]) else None
+            if ultimo is not None and novos['data'].iloc[0] < ultimo:
+                # Mensagem mais antiga que as já lidas: reordena tudo, como a leitura completa
+                self.parts = [self._joined(self.parts + [novos])]
+            else:
+                self.parts = self.parts + [novos]
+                if len(self.parts) > MAX_PARTS:
+                    self.parts = [self._joined(self.parts)]
+            return len(novos)
+
+    @staticmethod
+    def _joined(partes):
+        df = concat_frames(partes).sort_values('data', kind='stable').reset_index(drop=True)
+        return compact_frame(df)
+
+    def frame(self):
+        """Todas as mensagens classificadas lidas até agora, ordenadas por data."""
+        partes = self.parts
+        return partes[0] if len(partes) == 1 else self._joined(partes)
+
+    def summary(self):
+        """Total de mensagens e primeiro/último dia, sem juntar os pedaços."""
+        total = sum(len(parte) for parte in self.parts)
+        if not total:
+            return {'total': 0, 'first_day': None, 'last_day': None}
+        partes = [parte for parte in self.parts if len(parte)]
+        return {
+            'total': total,
+            'first_day': partes[0]['data'].iloc[0].date(),
+            'last_day': partes[-1]['data'].iloc[-1].date(),
+        }
+
+    def period(self, start_date, end_date):
+        """Mensagens entre dois dias (inclusive), recortando só os pedaços do período."""
+        inicio = np.datetime64(pd.Timestamp(start_date))
+        fim = np.datetime64(pd.Timestamp(end_date) + pd.Timedelta(days=1))
+        recortes = []
+        for parte in self.parts:
+            datas = parte['data'].to_numpy()
+            recorte = parte.iloc[datas.searchsorted(inicio, 'left'):datas.searchsorted(fim, 'left')]
+            if len(recorte):
+                recortes.append(recorte)
+        if len(recortes) <= 1:
+            df = recortes[0] if recortes else self.parts[0].iloc[:0]
+        else:
+            df = concat_frames(recortes).reset_index(drop=True)
+        # Mesmas categorias do frame inteiro, mesmo nos pedaços fora do período
+        return df.astype(self._category_dtypes())
+
+    def _category_dtypes(self):
+        tipos = {}
+        for coluna in self.parts[0].columns:
+            dtypes = [parte[coluna].dtype for parte in self.parts]
+            if isinstance(dtypes[0], pd.CategoricalDtype) and any(tipo != dtypes[0] for tipo in dtypes):
+                categorias = set().union(*(tipo.categories for tipo in dtypes))
+                tipos[coluna] = pd.CategoricalDtype(sorted(categorias))
+        return tipos
+
+
+if __name__ == "__main__":
+    # python live.py [arquivo.csv] [segundos]: acompanha o CSV e mostra as mensagens novas
+    caminho = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    intervalo = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    ao_vivo = LiveFrame(caminho)
+    inicio = time.perf_counter()
+    ao_vivo.update()
+    print(f"{len(ao_vivo.frame()):,} mensagens classificadas em {time.perf_counter() - inicio:.2f}s; "
+          f"acompanhando {caminho}")
+    while True:
+        time.sleep(intervalo)
+        inicio = time.perf_counter()
+        novas = ao_vivo.update()
+        if novas is None:
+            print(f"Arquivo substituído: {len(ao_vivo.frame()):,} mensagens relidas")
+        elif novas:
+            ultimas = ao_vivo.frame().tail(novas)
+            print(f"{novas} novas em {(time.perf_counter() - inicio) * 1000:.1f} ms:")
+            print(ultimas[['data', 'msg_type', 'par', 'direction']].to_string(index=False, header=False))
@@ -0,0 +1,96 @@
+import asyncio
+import random
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+from api import HOST, PORT
+
+# Conexões abertas ao mesmo tempo e duração de cada teste
+CONNECTIONS = 32
+SECONDS = 10.0
+
+# Fração dos pedidos que repetem o ETag recebido (clientes com cache)
+REVALIDATE_SHARE = 0.5
+
+
+def default_paths(dias=('2025-09-01', '2025-09-05', '2025-09-08'), pares=('BTC/USDT', 'ETH/USDT')):
+    """Mistura de consultas com períodos e pares variados."""
+    caminhos = ['/health', '/channels', '/pairs', '/daily', '/metrics']
+    for inicio in dias:
+        for fim in dias:
+            if fim < inicio:
+                continue
+            periodo = f'start={inicio}&end={fim}'
+            caminhos += [f'/metrics?{periodo}', f'/pairs?{periodo}', f'/daily?{periodo}']
+            caminhos += [f'/metrics?{periodo}&pair={quote(par, safe="")}' for par in pares]
+    return caminhos
+
+
+async def _read_response(reader):
+    cabecalho = await reader.readuntil(b'\r\n\r\n')
+    linhas = cabecalho.decode('latin-1').split('\r\n')
+    status = int(linhas[0].split(' ')[1])
+    cabecalhos = {}
+    for linha in linhas[1:]:
+        if ':' in linha:
+            nome, valor = linha.split(':', 1)
+            cabecalhos[nome.strip().lower()] = valor.strip()
+    corpo = await reader.readexactly(int(cabecalhos.get('content-length', 0)))
+    return status, cabecalhos, corpo
+
+
+async def _client(host, port, caminhos, fim, latencias, status, etags, rng):
+    """Uma conexão keep-alive pedindo caminhos aleatórios até o fim do teste."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < fim:
+            caminho = rng.choice(caminhos)
+            pedido = f'GET {caminho} HTTP/1.1\r\nHost: {host}\r\n'
+            if caminho in etags and rng.random() < REVALIDATE_SHARE:
+                pedido += f'If-None-Match: {etags[caminho]}\r\n'
+            inicio = time.perf_counter()
+            writer.write((pedido + '\r\n').encode('latin-1'))
+            codigo, cabecalhos, _ = await _read_response(reader)
+            latencias.append(time.perf_counter() - inicio)
+            status[codigo] = status.get(codigo, 0) + 1
+            if 'etag' in cabecalhos:
+                etags[caminho] = cabecalhos['etag']
+    finally:
+        writer.close()
+
+
+async def run(host=HOST, port=PORT, connections=CONNECTIONS, seconds=SECONDS, caminhos=None, seed=0):
+    """Dispara `connections` clientes por `seconds` segundos; retorna as estatísticas."""
+    caminhos = caminhos or default_paths()
+    latencias, status, etags = [], {}, {}
+    rng = random.Random(seed)
+    inicio = time.perf_counter()
+    fim = inicio + seconds
+    await asyncio.gather(*[
+        _client(host, port, caminhos, fim, latencias, status, etags, random.Random(rng.random()))
+        for _ in range(connections)
+    ])
+    duracao = time.perf_counter() - inicio
+    latencias = np.array(latencias) * 1000
+    return {
+        'requests': len(latencias),
+        'seconds': duracao,
+        'requests_per_sec': len(latencias) / duracao,
+        'p50_ms': float(np.percentile(latencias, 50)) if len(latencias) else 0.0,
+        'p99_ms': float(np.percentile(latencias, 99)) if len(latencias) else 0.0,
+        'status': dict(sorted(status.items())),
+    }
+
+
+if __name__ == "__main__":
+    # python loadtest.py [http://127.0.0.1:8600] [conexões] [segundos]  (com `python api.py` rodando)
+    url = urlsplit(sys.argv[1] if len(sys.argv) > 1 else f'http://{HOST}:{PORT}')
+    conexoes = int(sys.argv[2]) if len(sys.argv) > 2 else CONNECTIONS
+    segundos = float(sys.argv[3]) if len(sys.argv) > 3 else SECONDS
+    resultado = asyncio.run(run(url.hostname, url.port or 80, conexoes, segundos))
+    print(f"{resultado['requests']:,} pedidos em {resultado['seconds']:.1f}s: "
+          f"{resultado['requests_per_sec']:,.0f} pedidos/s, p50 {resultado['p50_ms']:.1f} ms, "
+          f"p99 {resultado['p99_ms']:.1f} ms, status {resultado['status']}")
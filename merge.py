@@ -0,0 +1,256 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cleaning import CHUNK_SIZE, RAW_FILE
+
+# Chave de uma mensagem: o id do Telegram só é único dentro do canal
+KEY_COLUMNS = ['autor_id', 'id']
+
+# Duplicatas e lacunas guardadas no relatório em memória (o arquivo de relatório tem todas)
+REPORT_SAMPLES = 1000
+REPORT_COLUMNS = ['kind', 'autor_id', 'first_id', 'last_id', 'copies', 'edited']
+
+# Menor lote lido de cada arquivo temporário no merge
+MIN_BATCH = 1024
+
+_SORT_KEY = ['_canal', '_id', '_ordem']
+
+
+def _columns(paths):
+    """Colunas da primeira exportação; as outras precisam ter as mesmas (em qualquer ordem)."""
+    colunas = None
+    for path in paths:
+        cabecalho = list(pd.read_csv(path, nrows=0).columns)
+        if colunas is None:
+            faltando = [coluna for coluna in KEY_COLUMNS if coluna not in cabecalho]
+            if faltando:
+                raise ValueError(f"{path} não tem as colunas {faltando}")
+            colunas = cabecalho
+        elif sorted(cabecalho) != sorted(colunas):
+            raise ValueError(f"{path} tem colunas {cabecalho}, esperado {colunas}")
+    return colunas
+
+
+def _write_runs(paths, colunas, diretorio, chunksize):
+    """Grava cada bloco lido, ordenado por (canal, id, ordem de leitura), num Parquet temporário.
+
+    Os textos são lidos como texto puro, então cada linha sai exatamente como
+    entrou. Retorna os arquivos e as linhas lidas.
+    """
+    runs, ordem = [], 0
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False):
+            if chunk.empty:
+                continue
+            bloco = chunk[colunas].copy()
+            bloco['_canal'] = chunk['autor_id'].to_numpy().astype(np.int64)
+            bloco['_id'] = chunk['id'].to_numpy().astype(np.int64)
+            bloco['_ordem'] = np.arange(ordem, ordem + len(bloco))
+            ordem += len(bloco)
+            run = os.path.join(diretorio, f'run-{len(runs):05d}.parquet')
+            pq.write_table(pa.Table.from_pandas(bloco.sort_values(_SORT_KEY), preserve_index=False), run)
+            runs.append(run)
+    return runs, ordem
+
+
+class _Run:
+    """Um arquivo temporário ordenado, lido em lotes de `batch_size` linhas."""
+
+    def __init__(self, path, batch_size):
+        self.batches = pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+        self.buffer = None
+        self.exhausted = False
+        self.load()
+
+    def load(self):
+        lote = next(self.batches, None)
+        if lote is None:
+            self.exhausted = True
+        elif self.buffer is None or self.buffer.empty:
+            self.buffer = lote.to_pandas()
+        else:
+            self.buffer = pd.concat([self.buffer, lote.to_pandas()], ignore_index=True)
+
+    def last_key(self):
+        return self.buffer['_canal'].iat[-1], self.buffer['_id'].iat[-1]
+
+    def take_below(self, chave):
+        """Tira do buffer as linhas com chave menor que `chave` (todas, se None)."""
+        if self.buffer is None:
+            return None
+        if chave is None:
+            n = len(self.buffer)
+        else:
+            canais, ids = self.buffer['_canal'].to_numpy(), self.buffer['_id'].to_numpy()
+            n = int(np.count_nonzero((canais < chave[0]) | ((canais == chave[0]) & (ids < chave[1]))))
+        parte, self.buffer = self.buffer.iloc[:n], self.buffer.iloc[n:]
+        return parte
+
+
+def _merged_blocks(runs):
+    """Intercala os arquivos ordenados em blocos ordenados por (canal, id, ordem de leitura).
+
+    Cada passo libera tudo o que está abaixo da menor "última chave" dos
+    arquivos que ainda têm lotes: nenhum lote futuro traz chave menor, então
+    todas as cópias de uma mensagem saem no mesmo bloco.
+    """
+    while True:
+        abertos = [run for run in runs if not run.exhausted]
+        limite = min((run.last_key() for run in abertos), default=None)
+        partes = [parte for parte in (run.take_below(limite) for run in runs) if parte is not None and len(parte)]
+        if partes:
+            yield pd.concat(partes, ignore_index=True).sort_values(_SORT_KEY, ignore_index=True)
+        if limite is None:
+            return
+        for run in abertos:
+            if run.last_key() == limite:
+                run.load()
+
+
+def merge_exports(paths, output_path=RAW_FILE, chunksize=CHUNK_SIZE, report_path=None):
+    """Junta exportações (que podem se sobrepor) num CSV sem mensagens repetidas.
+
+    A chave é (autor_id, id). Se a mesma mensagem aparece mais de uma vez
+    (exportações sobrepostas ou mensagem editada), vale a última lida: as
+    exportações em `paths` vão da mais antiga para a mais nova e, dentro de
+    cada uma, a linha mais abaixo ganha. A saída fica ordenada por canal e id.
+
+    É um merge externo: cada bloco de `chunksize` linhas é ordenado e
+    gravado num Parquet temporário, e os arquivos são intercalados em lotes
+    que somam cerca de `chunksize` linhas, então a memória não depende do
+    tamanho das exportações. Como em clean_csv, a saída só substitui
+    `output_path` no fim.
+
+    Retorna o relatório: linhas lidas e gravadas, mensagens repetidas (e
+    quantas tinham conteúdo diferente), lacunas na sequência de ids de cada
+    canal e as primeiras REPORT_SAMPLES de cada. Com `report_path`, todas as
+    duplicatas e lacunas também vão para um CSV.
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    inicio = time.perf_counter()
+    colunas = _columns(paths)
+    diretorio, nome = os.path.split(os.path.abspath(output_path))
+    temporario = os.path.join(diretorio, f'.{nome}.tmp')
+    relatorio = {
+        'files': len(paths),
+        'rows_in': 0,
+        'rows_out': 0,
+        'duplicate_messages': 0,
+        'duplicate_rows': 0,
+        'edited_messages': 0,
+        'gaps': 0,
+        'missing_ids': 0,
+        'channels': {},
+        'duplicates': [],
+        'gap_ranges': [],
+    }
+
+    try:
+        with tempfile.TemporaryDirectory(dir=diretorio) as pasta, \
+                open(temporario, 'w', newline='', encoding='utf-8') as saida:
+            arquivos, relatorio['rows_in'] = _write_runs(paths, colunas, pasta, chunksize)
+            runs = [_Run(arquivo, max(MIN_BATCH, chunksize // max(len(arquivos), 1))) for arquivo in arquivos]
+            pd.DataFrame(columns=colunas).to_csv(saida, index=False)
+            if report_path is not None:
+                pd.DataFrame(columns=REPORT_COLUMNS).to_csv(report_path, index=False)
+
+            anterior = None
+            for bloco in _merged_blocks(runs):
+                canais, ids = bloco['_canal'].to_numpy(), bloco['_id'].to_numpy()
+                novo = np.ones(len(bloco), dtype=bool)
+                novo[1:] = (canais[1:] != canais[:-1]) | (ids[1:] != ids[:-1])
+                inicios = np.flatnonzero(novo)
+                copias = np.diff(np.append(inicios, len(bloco)))
+                ultimas = np.append(inicios[1:], len(bloco)) - 1
+
+                # Editada: alguma cópia difere da anterior da mesma mensagem
+                difere = np.zeros(len(bloco), dtype=bool)
+                for coluna in colunas:
+                    valores = bloco[coluna].to_numpy()
+                    difere[1:] |= valores[1:] != valores[:-1]
+                editadas = np.bincount(np.cumsum(novo)[difere & ~novo] - 1, minlength=len(inicios)) > 0
+
+                vencedoras = bloco.iloc[ultimas]
+                vencedoras[colunas].to_csv(saida, header=False, index=False)
+                canal_v, id_v = canais[ultimas], ids[ultimas]
+
+                # Lacunas: ids que faltam entre mensagens seguidas do mesmo canal
+                canal_antes = np.append(canal_v[0] if anterior is None else anterior[0], canal_v[:-1])
+                id_antes = np.append(id_v[0] - 1 if anterior is None else anterior[1], id_v[:-1])
+                faltam = np.where(canal_antes == canal_v, id_v - id_antes - 1, 0)
+                anterior = (canal_v[-1], id_v[-1])
+
+                repetidas = copias > 1
+                lacunas = faltam > 0
+                duplicatas = pd.DataFrame({
+                    'kind': 'duplicate', 'autor_id': canal_v[repetidas], 'first_id': id_v[repetidas],
+                    'last_id': id_v[repetidas], 'copies': copias[repetidas], 'edited': editadas[repetidas],
+                })
+                intervalos = pd.DataFrame({
+                    'kind': 'gap', 'autor_id': canal_v[lacunas], 'first_id': id_antes[lacunas] + 1,
+                    'last_id': id_v[lacunas] - 1, 'copies': 0, 'edited': False,
+                })
+                if report_path is not None:
+                    detalhes = pd.concat([duplicatas, intervalos]).sort_values(['autor_id', 'first_id'], kind='stable')
+                    detalhes.astype({'edited': int}).to_csv(report_path, mode='a', header=False, index=False)
+
+                relatorio['rows_out'] += len(vencedoras)
+                relatorio['duplicate_messages'] += int(repetidas.sum())
+                relatorio['duplicate_rows'] += int((copias - 1).sum())
+                relatorio['edited_messages'] += int(editadas.sum())
+                relatorio['gaps'] += int(lacunas.sum())
+                relatorio['missing_ids'] += int(faltam.sum())
+                espaco = REPORT_SAMPLES - len(relatorio['duplicates'])
+                relatorio['duplicates'] += [
+                    {'autor_id': int(canal), 'id': int(id_), 'copies': int(n), 'edited': bool(editada)}
+                    for canal, id_, n, editada in duplicatas.iloc[:max(espaco, 0), [1, 2, 4, 5]].itertuples(index=False)
+                ]
+                espaco = REPORT_SAMPLES - len(relatorio['gap_ranges'])
+                relatorio['gap_ranges'] += [
+                    {'autor_id': int(canal), 'first_id': int(primeiro), 'last_id': int(ultimo)}
+                    for canal, primeiro, ultimo in intervalos.iloc[:max(espaco, 0), 1:4].itertuples(index=False)
+                ]
+                por_canal = pd.DataFrame({'canal': canal_v, 'id': id_v, 'faltam': faltam}).groupby('canal').agg(
+                    first_id=('id', 'first'), last_id=('id', 'last'), messages=('id', 'size'), missing_ids=('faltam', 'sum'))
+                for canal, primeiro, ultimo, mensagens, faltando in por_canal.itertuples():
+                    info = relatorio['channels'].setdefault(
+                        int(canal), {'first_id': int(primeiro), 'last_id': 0, 'messages': 0, 'missing_ids': 0})
+                    info['last_id'] = int(ultimo)
+                    info['messages'] += int(mensagens)
+                    info['missing_ids'] += int(faltando)
+        os.replace(temporario, output_path)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    relatorio['seconds'] = time.perf_counter() - inicio
+    return relatorio
+
+
+if __name__ == "__main__":
+    # python merge.py saida.csv exportacao1.csv [exportacao2.csv ...] [--report relatorio.csv]
+    #   (as exportações da mais antiga para a mais nova: em mensagens repetidas vale a última)
+    argumentos = sys.argv[1:]
+    relatorio_csv = None
+    if '--report' in argumentos:
+        posicao = argumentos.index('--report')
+        relatorio_csv = argumentos[posicao + 1]
+        del argumentos[posicao:posicao + 2]
+    if len(argumentos) < 2:
+        sys.exit("uso: python merge.py saida.csv exportacao1.csv [exportacao2.csv ...] [--report relatorio.csv]")
+    relatorio = merge_exports(argumentos[1:], argumentos[0], report_path=relatorio_csv)
+    print(f"{relatorio['rows_out']:,} mensagens de {relatorio['rows_in']:,} linhas em "
+          f"{relatorio['files']} arquivo(s) ({relatorio['seconds']:.2f}s): "
+          f"{relatorio['duplicate_rows']:,} cópias repetidas de {relatorio['duplicate_messages']:,} mensagens "
+          f"({relatorio['edited_messages']:,} editadas), {relatorio['gaps']:,} lacunas "
+          f"com {relatorio['missing_ids']:,} ids faltando")
+    for canal, info in relatorio['channels'].items():
+        print(f"  canal {canal}: ids {info['first_id']}..{info['last_id']}, "
+              f"{info['messages']:,} mensagens, {info['missing_ids']:,} ids faltando")
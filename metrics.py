@@ -0,0 +1,191 @@
+import pandas as pd
+
+from classifier import MSG_TYPES
+from instrumentation import timed
+
+# Índices de cada tipo nos vetores de contagem
+_TYPE_INDEX = {tipo: i for i, tipo in enumerate(MSG_TYPES)}
+_SIGNAL = _TYPE_INDEX['SIGNAL']
+_WIN_TYPES = [_TYPE_INDEX['WIN'], _TYPE_INDEX['WIN_G1'], _TYPE_INDEX['WIN_G2']]
+_STOP = _TYPE_INDEX['STOP']
+
+
+def metrics_from_counts(counts):
+    """Calcula as métricas de assertividade a partir das contagens por tipo.
+
+    `counts` tem uma contagem por tipo, na ordem de MSG_TYPES.
+    """
+    win_direto, win_g1, win_g2 = (counts[i] for i in _WIN_TYPES)
+    stop_loss = counts[_STOP]
+    total_signals = counts[_SIGNAL]
+    gale1_calls = counts[_TYPE_INDEX['GALE_CALL_1']]
+    gale2_calls = counts[_TYPE_INDEX['GALE_CALL_2']]
+
+    # Calcular métricas
+    total_wins = win_direto + win_g1 + win_g2
+    total_operations = total_wins + stop_loss
+    assertividade = (total_wins / total_operations * 100) if total_operations > 0 else 0
+
+    # Assertividade sem Gale (apenas wins diretos vs total de sinais)
+    assertividade_sem_gale = (win_direto / total_signals * 100) if total_signals > 0 else 0
+
+    return {
+        'total_signals': total_signals,
+        'win_direto': win_direto,
+        'win_g1': win_g1,
+        'win_g2': win_g2,
+        'stop_loss': stop_loss,
+        'total_wins': total_wins,
+        'total_operations': total_operations,
+        'assertividade': assertividade,
+        'assertividade_sem_gale': assertividade_sem_gale,
+        'gale1_calls': gale1_calls,
+        'gale2_calls': gale2_calls,
+        'uso_gale_1': (gale1_calls / total_signals * 100) if total_signals > 0 else 0,
+        'uso_gale_2': (gale2_calls / total_signals * 100) if total_signals > 0 else 0
+    }
+
+
+# Função para calcular métricas de assertividade
+@timed('calculate_metrics')
+def calculate_metrics(df_classified):
+    """Calcula métricas de assertividade a partir do frame já classificado"""
+    contagem = df_classified['msg_type'].value_counts()
+    return metrics_from_counts([int(contagem.get(tipo, 0)) for tipo in MSG_TYPES])
+
+
+def _add_counts(destino, origem):
+    for chave, contagem in origem.items():
+        atual = destino.get(chave)
+        if atual is None:
+            destino[chave] = list(contagem)
+        else:
+            for i, n in enumerate(contagem):
+                atual[i] += n
+
+
+class MetricsAccumulator:
+    """Contagens por tipo de mensagem pré-agregadas por dia, par e hora.
+
+    Cada balde guarda um vetor de contagens na ordem de MSG_TYPES:
+    `days[dia]`, `pairs[(dia, par)]` e `hours[(dia, hora)]`. Adicionar uma
+    mensagem custa O(1); consultas de período somam os baldes dos dias
+    pedidos, sem voltar às mensagens. Acumuladores de arquivos ou processos
+    diferentes podem ser combinados com merge().
+    """
+
+    def __init__(self):
+        self.days = {}
+        self.pairs = {}
+        self.hours = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Cria um acumulador a partir de um frame classificado."""
+        acumulador = cls()
+        acumulador.update_frame(df)
+        return acumulador
+
+    def update(self, data, msg_type, par):
+        """Adiciona uma mensagem classificada."""
+        data = pd.Timestamp(data)
+        dia, i = data.date(), _TYPE_INDEX[msg_type]
+        for baldes, chave in ((self.days, dia), (self.pairs, (dia, par)), (self.hours, (dia, data.hour))):
+            contagem = baldes.get(chave)
+            if contagem is None:
+                contagem = baldes[chave] = [0] * len(MSG_TYPES)
+            contagem[i] += 1
+
+    @timed('MetricsAccumulator.update_frame')
+    def update_frame(self, df):
+        """Adiciona todas as mensagens de um frame classificado de uma vez."""
+        if df.empty:
+            return self
+        datas = df['data']
+        dia = datas.dt.floor('D').rename('dia')
+        msg_type = df['msg_type'].astype(pd.CategoricalDtype(MSG_TYPES))
+        agrupamentos = (
+            (self.days, [dia]),
+            (self.pairs, [dia, df['par'].astype(str).rename('par')]),
+            (self.hours, [dia, datas.dt.hour.rename('hora')]),
+        )
+        for baldes, chaves in agrupamentos:
+            tabela = msg_type.groupby(chaves + [msg_type], observed=True).size().unstack(fill_value=0)
+            tabela = tabela.reindex(columns=MSG_TYPES, fill_value=0)
+            novos = {}
+            for chave, contagem in zip(tabela.index, tabela.to_numpy().tolist()):
+                if isinstance(chave, tuple):
+                    chave = (chave[0].date(),) + chave[1:]
+                else:
+                    chave = chave.date()
+                novos[chave] = contagem
+            _add_counts(baldes, novos)
+        return self
+
+    def merge(self, other):
+        """Retorna um novo acumulador com a soma deste e de `other`."""
+        combinado = MetricsAccumulator()
+        for acumulador in (self, other):
+            _add_counts(combinado.days, acumulador.days)
+            _add_counts(combinado.pairs, acumulador.pairs)
+            _add_counts(combinado.hours, acumulador.hours)
+        return combinado
+
+    @staticmethod
+    def _in_period(dia, start_date, end_date):
+        return (start_date is None or dia >= start_date) and (end_date is None or dia <= end_date)
+
+    def _days(self, pair=None):
+        """(dia, contagem) de todos os pares ou só de `pair`."""
+        if pair is None:
+            return self.days.items()
+        return ((dia, contagem) for (dia, par), contagem in self.pairs.items() if par == pair)
+
+    def days_in_period(self, start_date=None, end_date=None):
+        """(dia, contagem por tipo) de cada dia do período (inclusive), em ordem de dia."""
+        return [(dia, contagem) for dia, contagem in sorted(self.days.items())
+                if self._in_period(dia, start_date, end_date)]
+
+    def counts(self, start_date=None, end_date=None, pair=None):
+        """Contagens por tipo no período (dias inclusive), opcionalmente de um par."""
+        total = [0] * len(MSG_TYPES)
+        for dia, contagem in self._days(pair):
+            if self._in_period(dia, start_date, end_date):
+                for i, n in enumerate(contagem):
+                    total[i] += n
+        return total
+
+    def metrics(self, start_date=None, end_date=None, pair=None):
+        """Mesmo resultado de calculate_metrics para as mensagens do período (e do par)."""
+        return metrics_from_counts(self.counts(start_date, end_date, pair))
+
+    def by_pair(self, start_date=None, end_date=None):
+        """Operações finalizadas e WINs por par: colunas `par`, `total`, `wins`."""
+        totais = {}
+        for (dia, par), contagem in self.pairs.items():
+            if self._in_period(dia, start_date, end_date):
+                wins = sum(contagem[i] for i in _WIN_TYPES)
+                total, ganhos = totais.get(par, (0, 0))
+                totais[par] = (total + wins + contagem[_STOP], ganhos + wins)
+        linhas = [(par, total, wins) for par, (total, wins) in sorted(totais.items()) if total > 0]
+        return pd.DataFrame(linhas, columns=['par', 'total', 'wins'])
+
+    def by_day(self, start_date=None, end_date=None, pair=None):
+        """Operações finalizadas e WINs por dia: colunas `date`, `total_ops`, `wins`."""
+        dias = self.days if pair is None else dict(self._days(pair))
+        linhas = []
+        for dia in sorted(dias):
+            contagem = dias[dia]
+            if self._in_period(dia, start_date, end_date):
+                wins = sum(contagem[i] for i in _WIN_TYPES)
+                if wins + contagem[_STOP] > 0:
+                    linhas.append((dia, wins + contagem[_STOP], wins))
+        return pd.DataFrame(linhas, columns=['date', 'total_ops', 'wins'])
+
+    def signals_by_hour(self, start_date=None, end_date=None):
+        """Quantidade de sinais por hora do dia (índice = hora, só horas com sinais)."""
+        por_hora = {}
+        for (dia, hora), contagem in self.hours.items():
+            if self._in_period(dia, start_date, end_date) and contagem[_SIGNAL]:
+                por_hora[hora] = por_hora.get(hora, 0) + contagem[_SIGNAL]
+        return pd.Series(por_hora, dtype='int64').sort_index()
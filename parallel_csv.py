@@ -0,0 +1,236 @@
+import io
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from classifier import classify_frame
+from cleaning import CLEAN_FILE, RAW_FILE, clean_chunk
+from instrumentation import timed
+from store import DATA_FILE, compact_frame, load_classified_csv
+
+# Bytes por bloco entregue a um processo: grande o bastante para o custo de
+# mandar o resultado de volta ser pequeno, pequeno o bastante para dividir bem
+CHUNK_BYTES = 64 * 2**20
+
+# Leitura das aspas em pedaços, sem copiar o arquivo inteiro
+_SCAN_BYTES = 16 * 2**20
+
+
+def _count_quotes(arquivo, inicio, fim):
+    total = 0
+    for posicao in range(inicio, fim, _SCAN_BYTES):
+        total += arquivo[posicao:min(posicao + _SCAN_BYTES, fim)].count(b'"')
+    return total
+
+
+def record_ranges(path, chunk_bytes=CHUNK_BYTES, end=None):
+    """Divide um CSV em faixas de bytes que começam e terminam entre registros.
+
+    Um campo entre aspas pode ter quebras de linha, então nem todo '\\n' fecha
+    um registro: só os que estão fora de aspas, isto é, com um número par de
+    aspas desde o início dos dados (aspas escapadas, "", contam duas vezes e
+    não mudam a paridade). O arquivo é percorrido uma vez contando aspas,
+    bem mais rápido que o parse. `end` limita a leitura aos primeiros bytes
+    (ver complete_records_end). Retorna (cabeçalho em bytes, [(início, fim)]).
+    """
+    tamanho = os.path.getsize(path) if end is None else end
+    with open(path, 'rb') as f:
+        cabecalho = f.readline()
+        if tamanho <= len(cabecalho):
+            return cabecalho, []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as arquivo:
+            faixas = []
+            inicio = len(cabecalho)
+            while inicio < tamanho:
+                fim = inicio + chunk_bytes
+                if fim >= tamanho:
+                    faixas.append((inicio, tamanho))
+                    break
+                paridade = _count_quotes(arquivo, inicio, fim) % 2
+                while True:
+                    quebra = arquivo.find(b'\n', fim)
+                    proximo = tamanho if quebra < 0 else quebra + 1
+                    paridade = (paridade + _count_quotes(arquivo, fim, proximo)) % 2
+                    fim = proximo
+                    if paridade == 0 or fim == tamanho:
+                        break
+                faixas.append((inicio, fim))
+                inicio = fim
+    return cabecalho, faixas
+
+
+def complete_records_end(path, start=0, end=None):
+    """Posição logo depois do último registro completo entre `start` e `end`.
+
+    Um arquivo que ainda está sendo escrito pode terminar no meio de um
+    registro; lendo só até aqui, o resto fica para a próxima leitura. Volta
+    de quebra em quebra a partir do fim até achar uma com aspas pares.
+    """
+    with open(path, 'rb') as f:
+        end = os.fstat(f.fileno()).st_size if end is None else end
+        if end <= start:
+            return start
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as arquivo:
+            aspas = _count_quotes(arquivo, start, end)
+            fim = end
+            while True:
+                quebra = arquivo.rfind(b'\n', start, fim)
+                if quebra < 0:
+                    return start
+                aspas -= _count_quotes(arquivo, quebra + 1, fim)
+                if aspas % 2 == 0:
+                    return quebra + 1
+                fim = quebra
+
+
+def read_range(path, cabecalho, inicio, fim):
+    """Lê uma faixa de registros como um CSV com o cabeçalho do arquivo."""
+    with open(path, 'rb') as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    return pd.read_csv(io.BytesIO(cabecalho + dados))
+
+
+def map_ranges(funcao, path, workers=None, chunk_bytes=CHUNK_BYTES, end=None):
+    """Aplica `funcao(path, cabecalho, início, fim)` a cada faixa, devolvendo na ordem do arquivo.
+
+    Com mais de um processo, no máximo 2 faixas por processo ficam em
+    andamento ou prontas esperando a vez, então a memória não depende do
+    tamanho do arquivo quando o resultado é consumido aos poucos.
+    """
+    cabecalho, faixas = record_ranges(path, chunk_bytes, end)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(faixas) <= 1:
+        for inicio, fim in faixas:
+            yield funcao(path, cabecalho, inicio, fim)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(faixas))) as pool:
+        pendentes = deque()
+        for inicio, fim in faixas:
+            pendentes.append(pool.submit(funcao, path, cabecalho, inicio, fim))
+            if len(pendentes) >= 2 * workers:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+def concat_frames(frames):
+    """Concatena frames em ordem juntando as categorias diferentes de cada bloco.
+
+    Colunas categóricas com as mesmas categorias em todos os blocos (tipo,
+    direção, resultado) ficam como estão; as de categorias observadas (par)
+    viram a união ordenada, igual à de um frame lido de uma vez.
+    """
+    df = pd.concat(frames, ignore_index=True)
+    for coluna in frames[0].columns:
+        tipos = [frame[coluna].dtype for frame in frames]
+        if isinstance(tipos[0], pd.CategoricalDtype) and any(tipo != tipos[0] for tipo in tipos):
+            colunas = [frame[coluna] for frame in frames]
+            if len({tipo.categories.dtype for tipo in tipos}) > 1:
+                # Bloco sem nenhum valor pode vir com categorias de outro tipo (ex: float64 vazio)
+                colunas = [serie.cat.set_categories(serie.cat.categories.astype(object)) for serie in colunas]
+            df[coluna] = union_categoricals(colunas, sort_categories=True)
+    return df
+
+
+def classify_range(path, cabecalho, inicio, fim):
+    df = read_range(path, cabecalho, inicio, fim)
+    df['data'] = pd.to_datetime(df['data'])
+    classificacao = classify_frame(df['mensagem'], df['autor_id'])
+    return pd.concat([df.loc[classificacao.index], classificacao], axis=1)
+
+
+@timed('load_classified_csv_parallel')
+def load_classified_csv_parallel(path=DATA_FILE, keep_text=True, workers=None, chunk_bytes=CHUNK_BYTES, end=None):
+    """Mesmo resultado de store.load_classified_csv, classificando blocos em vários processos.
+
+    Os blocos voltam na ordem do arquivo e a ordenação estável por data é
+    feita no fim, sobre o frame inteiro, como no caminho de um processo só.
+    `end` limita a leitura aos primeiros bytes do arquivo.
+    """
+    blocos = list(map_ranges(classify_range, path, workers, chunk_bytes, end))
+    if not blocos:
+        # Só o cabeçalho: frame vazio com as mesmas colunas e tipos
+        blocos = [classify_range(path, record_ranges(path, chunk_bytes, end)[0], 0, 0)]
+    df = concat_frames(blocos).sort_values('data', kind='stable').reset_index(drop=True)
+    return df if keep_text else compact_frame(df)
+
+
+def _clean_range(path, cabecalho, inicio, fim):
+    chunk = read_range(path, cabecalho, inicio, fim)
+    return len(chunk), clean_chunk(chunk)
+
+
+def clean_csv_parallel(input_path=RAW_FILE, output_path=CLEAN_FILE, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Mesmo arquivo de cleaning.clean_csv, tratando blocos em vários processos.
+
+    Cada bloco é gravado assim que chega a sua vez, num temporário que só
+    substitui `output_path` no fim. Retorna as mesmas estatísticas.
+    """
+    diretorio, nome = os.path.split(os.path.abspath(output_path))
+    temporario = os.path.join(diretorio, f'.{nome}.tmp')
+    lidas = gravadas = blocos = 0
+    inicio = time.perf_counter()
+    try:
+        with open(temporario, 'w', newline='', encoding='utf-8') as saida:
+            for n, chunk in map_ranges(_clean_range, input_path, workers, chunk_bytes):
+                chunk.to_csv(saida, header=blocos == 0, index=False)
+                lidas += n
+                gravadas += len(chunk)
+                blocos += 1
+            if blocos == 0:
+                pd.read_csv(input_path, nrows=0).to_csv(saida, index=False)
+        os.replace(temporario, output_path)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'rows_in': lidas,
+        'rows_out': gravadas,
+        'seconds': segundos,
+        'rows_per_sec': lidas / segundos if segundos > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    # python parallel_csv.py load|clean [entrada.csv] [processos] [MB por bloco]
+    # Roda também o caminho de um processo só e confere que o resultado é idêntico
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'load'
+    processos = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    bloco = int(float(sys.argv[4]) * 2**20) if len(sys.argv) > 4 else CHUNK_BYTES
+    if comando == 'load':
+        caminho = sys.argv[2] if len(sys.argv) > 2 else DATA_FILE
+        inicio = time.perf_counter()
+        paralelo = load_classified_csv_parallel(caminho, workers=processos, chunk_bytes=bloco)
+        segundos_paralelo = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        sequencial = load_classified_csv(caminho)
+        segundos_sequencial = time.perf_counter() - inicio
+        pd.testing.assert_frame_equal(paralelo, sequencial)
+    elif comando == 'clean':
+        caminho = sys.argv[2] if len(sys.argv) > 2 else RAW_FILE
+        from cleaning import clean_csv
+        saidas = [caminho + '.paralelo.csv', caminho + '.sequencial.csv']
+        try:
+            segundos_paralelo = clean_csv_parallel(caminho, saidas[0], processos, bloco)['seconds']
+            segundos_sequencial = clean_csv(caminho, saidas[1])['seconds']
+            with open(saidas[0], 'rb') as a, open(saidas[1], 'rb') as b:
+                assert a.read() == b.read(), 'saídas diferentes'
+        finally:
+            for saida in saidas:
+                if os.path.exists(saida):
+                    os.remove(saida)
+    else:
+        sys.exit(f"Comando desconhecido: {comando}")
+    faixas = len(record_ranges(caminho, bloco)[1])
+    print(f"{faixas} blocos em {processos or os.cpu_count()} processos: {segundos_paralelo:.2f}s "
+          f"(um processo: {segundos_sequencial:.2f}s), resultado idêntico")
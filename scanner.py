@@ -0,0 +1,180 @@
+import itertools
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from lifecycle import COMPLETE
+from simulation import OUTCOMES, build_grid, payoff_table
+
+# Direções avaliadas (sinais UNKNOWN ficam de fora do cubo)
+SCAN_DIRECTIONS = ['PUT', 'CALL']
+
+# Com até este número de pares, todas as combinações de pares são testadas;
+# acima disso, só cada par sozinho e todos juntos
+MAX_PAIRS_FOR_SUBSETS = 6
+
+# Filtros com menos operações que isto ficam fora do ranking
+MIN_TRADES = 30
+
+# Nome de "sem filtro" em cada dimensão
+ALL_LABEL = 'Todos'
+
+_STOP = OUTCOMES.index('STOP')
+
+
+class OutcomeCube:
+    """Contagens de resultados por dia x hora do sinal x par x direção x resultado.
+
+    `counts[d, h, p, s, o]` é o número de operações do dia `days[d]`, com
+    sinal na hora `h`, no par `pairs[p]`, na direção SCAN_DIRECTIONS[s] e
+    com resultado OUTCOMES[o]. Qualquer filtro de horas, pares e direção é
+    uma soma sobre fatias do cubo, sem voltar às operações.
+    """
+
+    def __init__(self, counts, days, pairs):
+        self.counts = counts
+        self.days = days
+        self.pairs = pairs
+
+    def period(self, start_date=None, end_date=None):
+        """Cubo somado nos dias do período: (hora, par, direção, resultado)."""
+        inicio = 0 if start_date is None else self.days.searchsorted(pd.Timestamp(start_date))
+        fim = len(self.days) if end_date is None else self.days.searchsorted(pd.Timestamp(end_date), 'right')
+        return self.counts[inicio:fim].sum(axis=0)
+
+
+def outcome_cube(trades):
+    """Monta o cubo das operações completas (sinal com resultado) e direção conhecida.
+
+    A hora é a do sinal (entry_time): é ela que um filtro de horário decide
+    se a operação seria feita.
+    """
+    fechadas = trades[(trades['status'] == COMPLETE) & trades['direction'].isin(SCAN_DIRECTIONS)
+                      & trades['result'].isin(OUTCOMES)]
+    entrada = fechadas['entry_time']
+    dia_codigos, dias = pd.factorize(entrada.dt.floor('D'), sort=True)
+    par_codigos, pares = pd.factorize(fechadas['par'].astype(str), sort=True)
+    direcoes = pd.Categorical(fechadas['direction'], categories=SCAN_DIRECTIONS).codes
+    resultados = pd.Categorical(fechadas['result'], categories=OUTCOMES).codes
+
+    forma = (len(dias), 24, len(pares), len(SCAN_DIRECTIONS), len(OUTCOMES))
+    indices = np.ravel_multi_index(
+        (dia_codigos, entrada.dt.hour.to_numpy(), par_codigos, direcoes, resultados), forma)
+    contagens = np.bincount(indices, minlength=int(np.prod(forma))).reshape(forma).astype(np.int32)
+    return OutcomeCube(contagens, pd.DatetimeIndex(dias), list(pares))
+
+
+def hour_windows():
+    """Janelas de horário contíguas (podem passar da meia-noite): (rótulos, máscara janelas x 24)."""
+    rotulos, mascaras = [ALL_LABEL], [np.ones(24, dtype=bool)]
+    for tamanho in range(1, 24):
+        for inicio in range(24):
+            mascara = np.zeros(24, dtype=bool)
+            mascara[(inicio + np.arange(tamanho)) % 24] = True
+            rotulos.append(f'{inicio:02d}h-{(inicio + tamanho) % 24:02d}h')
+            mascaras.append(mascara)
+    return rotulos, np.array(mascaras)
+
+
+def pair_sets(pairs):
+    """Conjuntos de pares testados: (rótulos, máscara conjuntos x pares)."""
+    n = len(pairs)
+    if n <= MAX_PAIRS_FOR_SUBSETS:
+        conjuntos = [c for k in range(1, n + 1) for c in itertools.combinations(range(n), k)]
+    else:
+        conjuntos = [(i,) for i in range(n)] + [tuple(range(n))]
+    rotulos, mascaras = [], np.zeros((len(conjuntos), n), dtype=bool)
+    for linha, conjunto in enumerate(conjuntos):
+        mascaras[linha, list(conjunto)] = True
+        rotulos.append(ALL_LABEL if len(conjunto) == n else ', '.join(pairs[i] for i in conjunto))
+    return rotulos, mascaras
+
+
+def _direction_sets():
+    rotulos = SCAN_DIRECTIONS + [ALL_LABEL]
+    mascaras = np.vstack([np.eye(len(SCAN_DIRECTIONS), dtype=bool), np.ones(len(SCAN_DIRECTIONS), dtype=bool)])
+    return rotulos, mascaras
+
+
+def _summary(contagens, ganhos):
+    """Operações, WINs, STOPs, assertividade e resultado de contagens (..., OUTCOMES)."""
+    operacoes = contagens.sum(axis=-1)
+    stops = contagens[..., _STOP]
+    wins = operacoes - stops
+    with np.errstate(invalid='ignore', divide='ignore'):
+        assertividade = np.where(operacoes > 0, wins / operacoes * 100, np.nan)
+    return operacoes, wins, stops, assertividade, contagens @ ganhos
+
+
+def scan(cube, start_date=None, end_date=None, stake=10, multiplier=2, payout=0.9, min_trades=MIN_TRADES):
+    """Avalia todos os filtros janela de horário x conjunto de pares x direção.
+
+    As somas saem de três produtos tensoriais das máscaras com o cubo do
+    período, então milhares de filtros custam poucos milissegundos. O
+    resultado simulado usa a mesma tabela de ganhos de simulation.py.
+    Retorna um filtro por linha (com pelo menos `min_trades` operações),
+    do maior resultado para o menor; entre janelas com as mesmas operações
+    fica só a mais curta.
+    """
+    ganhos = payoff_table(build_grid([stake], [multiplier], [payout]))[0]
+    cubo = cube.period(start_date, end_date).astype(np.float64)
+    horas, mascara_horas = hour_windows()
+    pares, mascara_pares = pair_sets(cube.pairs)
+    direcoes, mascara_direcoes = _direction_sets()
+
+    somas = np.tensordot(mascara_horas, cubo, axes=(1, 0))          # janelas, pares, direções, resultados
+    somas = np.tensordot(mascara_pares, somas, axes=(1, 1))         # conjuntos, janelas, direções, resultados
+    somas = np.tensordot(mascara_direcoes, somas, axes=(1, 2))      # direções, conjuntos, janelas, resultados
+    operacoes, wins, stops, assertividade, resultado = _summary(somas, ganhos)
+
+    d, p, h = np.meshgrid(np.arange(len(direcoes)), np.arange(len(pares)), np.arange(len(horas)), indexing='ij')
+    ranking = pd.DataFrame({
+        'hours': np.array(horas, dtype=object)[h.ravel()],
+        'hour_count': mascara_horas.sum(axis=1)[h.ravel()],
+        'pairs': np.array(pares, dtype=object)[p.ravel()],
+        'direction': np.array(direcoes, dtype=object)[d.ravel()],
+        'trades': operacoes.ravel().astype(np.int64),
+        'wins': wins.ravel().astype(np.int64),
+        'stops': stops.ravel().astype(np.int64),
+        'assertividade': assertividade.ravel(),
+        'pnl': resultado.ravel(),
+    })
+    ranking = ranking[ranking['trades'] >= max(min_trades, 1)]
+    ranking['pnl_per_trade'] = ranking['pnl'] / ranking['trades']
+    ranking = ranking.sort_values(['pnl', 'assertividade', 'hour_count'], ascending=[False, False, True], kind='stable')
+    # Janelas que só acrescentam horas sem operações dão o mesmo filtro: fica a mais curta
+    ranking = ranking.drop_duplicates(['pairs', 'direction', 'trades', 'wins', 'stops', 'pnl'])
+    return ranking.reset_index(drop=True)
+
+
+def heatmap_table(cube, start_date=None, end_date=None, value='pnl', stake=10, multiplier=2, payout=0.9):
+    """Hora (linhas) x par e direção (colunas) com o resultado ou a assertividade de cada célula.
+
+    Células sem operações ficam NaN.
+    """
+    ganhos = payoff_table(build_grid([stake], [multiplier], [payout]))[0]
+    operacoes, _, _, assertividade, resultado = _summary(cube.period(start_date, end_date), ganhos)
+    valores = assertividade if value == 'assertividade' else np.where(operacoes > 0, resultado, np.nan)
+    colunas = pd.MultiIndex.from_product([cube.pairs, SCAN_DIRECTIONS], names=['par', 'direction'])
+    return pd.DataFrame(valores.reshape(24, -1), index=pd.RangeIndex(24, name='hora'), columns=colunas)
+
+
+if __name__ == "__main__":
+    # python scanner.py [arquivo.csv] [mínimo de operações]: melhores filtros de horário, par e direção
+    from lifecycle import reconstruct_trades
+    from store import DATA_FILE, load_classified_csv
+
+    trades = reconstruct_trades(load_classified_csv(sys.argv[1] if len(sys.argv) > 1 else DATA_FILE))
+    minimo = int(sys.argv[2]) if len(sys.argv) > 2 else MIN_TRADES
+    inicio = time.perf_counter()
+    cubo = outcome_cube(trades)
+    montagem = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    ranking = scan(cubo, min_trades=0)
+    varredura = time.perf_counter() - inicio
+    candidatos = len(hour_windows()[0]) * len(pair_sets(cubo.pairs)[0]) * len(_direction_sets()[0])
+    print(f"Cubo {cubo.counts.shape} de {int(cubo.counts.sum()):,} operações em {montagem * 1000:.1f} ms; "
+          f"{candidatos:,} filtros avaliados em {varredura * 1000:.1f} ms ({len(ranking):,} distintos)")
+    print(ranking[ranking['trades'] >= minimo].head(15).round(1).to_string(index=False))
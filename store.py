@@ -0,0 +1,352 @@
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from classifier import DIRECTIONS, MSG_TYPES, RESULTS, classify_frame, classify_message
+from instrumentation import measure, timed
+
+# Arquivo tratado lido pelo dashboard
+DATA_FILE = 'mensagens_tratadas.csv'
+
+# Histórico classificado em Parquet: um arquivo por mês (mes=AAAA-MM/part-0.parquet),
+# mais os lotes acrescentados pela ingestão em tempo real (mes=AAAA-MM/part-<ns>.parquet)
+STORE_DIR = 'mensagens_tratadas.parquet'
+ROW_GROUP_SIZE = 64 * 1024
+
+# Tipos das colunas do store (o Parquet guarda só as categorias observadas)
+STORE_DTYPES = {
+    'id': 'int64',
+    'autor_id': 'int64',
+    'msg_type': pd.CategoricalDtype(MSG_TYPES),
+    'par': 'category',
+    'direction': pd.CategoricalDtype(DIRECTIONS),
+    'result': pd.CategoricalDtype(RESULTS),
+    'gale_level': 'int8',
+}
+
+# Tipos em memória do frame compacto: o autor (poucos canais) também vira categoria
+COMPACT_DTYPES = {**STORE_DTYPES, 'autor_id': 'category'}
+
+
+def file_fingerprint(path):
+    """Identifica uma versão do arquivo: (caminho absoluto, tamanho, mtime em ns).
+
+    Serve de chave de cache: muda sempre que o arquivo é reescrito. Para um
+    diretório (store particionado) soma os tamanhos e usa o maior mtime.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    tamanho, mtime = 0, os.stat(path).st_mtime_ns
+    for raiz, _, arquivos in os.walk(path):
+        mtime = max(mtime, os.stat(raiz).st_mtime_ns)
+        for nome in arquivos:
+            stat = os.stat(os.path.join(raiz, nome))
+            tamanho += stat.st_size
+            mtime = max(mtime, stat.st_mtime_ns)
+    return os.path.abspath(path), tamanho, mtime
+
+
+@timed('load_classified_csv')
+def load_classified_csv(path=DATA_FILE, keep_text=True):
+    """Lê o CSV tratado, classifica as mensagens e ordena por data.
+
+    Retorna apenas as mensagens classificadas, com as colunas originais
+    (`id`, `data`, `autor_id`, `mensagem`) mais as de classify_frame.
+    Com `keep_text=False`, devolve o frame compacto (ver compact_frame).
+    """
+    with measure('read_csv') as span:
+        df = pd.read_csv(path)
+        df['data'] = pd.to_datetime(df['data'])
+        span.rows = len(df)
+    classificacao = classify_frame(df['mensagem'], df['autor_id'])
+    df = pd.concat([df.loc[classificacao.index], classificacao], axis=1)
+    df = df.sort_values('data', kind='stable').reset_index(drop=True)
+    return df if keep_text else compact_frame(df)
+
+
+def compact_frame(df, keep_text=False):
+    """Frame classificado com o mínimo de memória por linha.
+
+    O texto só serve para classificar; depois disso é a maior parte da
+    memória (uma string Python por linha) e sai, a menos de `keep_text`.
+    Tipo, par, direção, resultado e autor viram categorias (1 byte por
+    linha) e o nível de gale, int8.
+    """
+    if not keep_text and 'mensagem' in df:
+        df = df.drop(columns='mensagem')
+    return df.astype({coluna: tipo for coluna, tipo in COMPACT_DTYPES.items() if coluna in df})
+
+
+def slice_period(df, start_date, end_date):
+    """Recorta um frame ordenado por `data` entre dois dias (inclusive).
+
+    Usa busca binária na coluna de datas, então o custo não depende do
+    tamanho do histórico carregado.
+    """
+    datas = df['data'].to_numpy()
+    inicio = np.datetime64(pd.Timestamp(start_date))
+    fim = np.datetime64(pd.Timestamp(end_date) + pd.Timedelta(days=1))
+    return df.iloc[datas.searchsorted(inicio, 'left'):datas.searchsorted(fim, 'left')]
+
+
+def _month_dir(store_dir, mes):
+    return os.path.join(store_dir, f'mes={mes}')
+
+
+def _split_months(df):
+    """Divide um frame ordenado por data em (AAAA-MM, fatia do mês)."""
+    mes = (df['data'].dt.year * 100 + df['data'].dt.month).to_numpy()
+    cortes = np.concatenate([[0], np.flatnonzero(np.diff(mes)) + 1, [len(df)]])
+    for inicio, fim in zip(cortes[:-1], cortes[1:]):
+        parte = df.iloc[inicio:fim]
+        yield parte['data'].iloc[0].strftime('%Y-%m'), parte
+
+
+def _write_part(parte, caminho):
+    """Grava um arquivo Parquet de forma atômica.
+
+    O temporário começa com '.', prefixo que a leitura do dataset ignora,
+    então quem lê o store nunca vê um arquivo pela metade.
+    """
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = os.path.join(os.path.dirname(caminho), '.' + os.path.basename(caminho) + '.tmp')
+    parte = parte.astype({coluna: tipo for coluna, tipo in STORE_DTYPES.items() if coluna in parte})
+    tabela = pa.Table.from_pandas(parte, preserve_index=False)
+    pq.write_table(tabela, temporario, row_group_size=ROW_GROUP_SIZE)
+    os.replace(temporario, caminho)
+
+
+def write_store(df, store_dir=STORE_DIR, replaces=None):
+    """Grava um frame classificado no store, um arquivo por mês.
+
+    As linhas vão ordenadas por data, então as estatísticas de `data` de
+    cada row group delimitam um intervalo de tempo e a leitura de um
+    período pula os row groups de fora. Os meses presentes em `df` são
+    substituídos (inclusive lotes acrescentados); os demais ficam como estão.
+
+    Só são apagados os arquivos do mês que existiam antes da gravação ou,
+    com `replaces`, só os arquivos listados (os que foram lidos para montar
+    `df`): um lote que append_to_store grave no meio do caminho fica no store.
+    """
+    df = df.sort_values('data', kind='stable').reset_index(drop=True)
+    substituidos = None if replaces is None else {os.path.abspath(caminho) for caminho in replaces}
+    for mes, parte in _split_months(df):
+        pasta = _month_dir(store_dir, mes)
+        destino = os.path.join(pasta, 'part-0.parquet')
+        antigos = [caminho for caminho in glob.glob(os.path.join(pasta, '*.parquet'))
+                   if substituidos is None or os.path.abspath(caminho) in substituidos]
+        _write_part(parte, destino)
+        for caminho in antigos:
+            if os.path.abspath(caminho) != os.path.abspath(destino):
+                os.remove(caminho)
+
+
+def append_to_store(df, store_dir=STORE_DIR):
+    """Acrescenta um lote de mensagens classificadas ao store.
+
+    Cada mês do lote vira um arquivo novo (part-<ns>.parquet) ao lado dos
+    existentes, sem reescrever nada. Retorna os caminhos gravados.
+    """
+    if df.empty:
+        return []
+    df = df.sort_values('data', kind='stable').reset_index(drop=True)
+    caminhos = []
+    for mes, parte in _split_months(df):
+        caminho = os.path.join(_month_dir(store_dir, mes), f'part-{time.time_ns()}.parquet')
+        _write_part(parte, caminho)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def compact_store(store_dir=STORE_DIR):
+    """Junta os lotes acrescentados de cada mês de volta em um único arquivo."""
+    compactados = 0
+    for pasta in sorted(glob.glob(os.path.join(store_dir, 'mes=*'))):
+        arquivos = sorted(glob.glob(os.path.join(pasta, '*.parquet')))
+        if len(arquivos) > 1:
+            # Lê e substitui só os arquivos listados agora; lotes novos ficam para a próxima
+            write_store(read_store(store_dir, files=arquivos), store_dir, replaces=arquivos)
+            compactados += 1
+    return compactados
+
+
+def convert_csv_to_store(csv_path=DATA_FILE, store_dir=STORE_DIR):
+    """Converte o CSV tratado em um store Parquet novo (substitui o anterior)."""
+    df = load_classified_csv(csv_path)
+    temporario = store_dir + '.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    write_store(df, temporario)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.rename(temporario, store_dir)
+    return len(df)
+
+
+def store_files(store_dir=STORE_DIR):
+    """Arquivos do store com (caminho, tamanho, mtime em ns), em ordem.
+
+    Um arquivo reescrito muda de tamanho/mtime, então a lista serve para
+    descobrir o que é novo desde a última leitura.
+    """
+    arquivos = []
+    for caminho in sorted(glob.glob(os.path.join(store_dir, 'mes=*', '*.parquet'))):
+        stat = os.stat(caminho)
+        arquivos.append((caminho, stat.st_size, stat.st_mtime_ns))
+    return arquivos
+
+
+def _dataset(store_dir, files=None):
+    if files is not None:
+        return ds.dataset(list(files), format='parquet', partitioning='hive', partition_base_dir=store_dir)
+    return ds.dataset(store_dir, format='parquet', partitioning='hive')
+
+
+def store_summary(store_dir=STORE_DIR):
+    """Total de mensagens e primeiro/último dia do store, sem ler os dados.
+
+    Usa só os metadados do Parquet (contagem e estatísticas de `data`).
+    """
+    dataset = _dataset(store_dir)
+    meses = {}
+    for fragmento in dataset.get_fragments():
+        mes = ds.get_partition_keys(fragmento.partition_expression)['mes']
+        meses.setdefault(mes, []).append(fragmento)
+    if not meses:
+        return {'total': 0, 'first_day': None, 'last_day': None}
+    primeiro = min(
+        grupo.statistics['data']['min']
+        for fragmento in meses[min(meses)] for grupo in fragmento.row_groups
+    )
+    ultimo = max(
+        grupo.statistics['data']['max']
+        for fragmento in meses[max(meses)] for grupo in fragmento.row_groups
+    )
+    return {
+        'total': dataset.count_rows(),
+        'first_day': pd.Timestamp(primeiro).date(),
+        'last_day': pd.Timestamp(ultimo).date(),
+    }
+
+
+def concat_store_frames(frames):
+    """Concatena frames lidos do store mantendo os tipos e a ordem por data."""
+    df = pd.concat(frames, ignore_index=True)
+    df = df.astype({coluna: tipo for coluna, tipo in STORE_DTYPES.items() if coluna in df})
+    return df.sort_values('data', kind='stable').reset_index(drop=True)
+
+
+@timed('read_store')
+def read_store(store_dir=STORE_DIR, start_date=None, end_date=None, columns=None, files=None):
+    """Lê o store ordenado por data, opcionalmente só um período e algumas colunas.
+
+    O período é empurrado para a leitura: meses fora dele nem são abertos
+    e, dentro de um mês, os row groups fora dele são pulados. `files`
+    restringe a leitura a alguns arquivos do store (ver store_files).
+    """
+    filtro = None
+    if start_date is not None:
+        inicio = pd.Timestamp(start_date)
+        filtro = (ds.field('mes') >= inicio.strftime('%Y-%m')) & (ds.field('data') >= inicio)
+    if end_date is not None:
+        fim = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        condicao = (ds.field('mes') <= pd.Timestamp(end_date).strftime('%Y-%m')) & (ds.field('data') < fim)
+        filtro = condicao if filtro is None else filtro & condicao
+    if columns is not None and 'data' not in columns:
+        columns = ['data'] + list(columns)
+
+    dataset = _dataset(store_dir, files)
+    if columns is None:
+        columns = [nome for nome in dataset.schema.names if nome != 'mes']
+    df = dataset.to_table(columns=columns, filter=filtro).to_pandas()
+    return concat_store_frames([df])
+
+
+def _measure_cold_start(fonte):
+    """Roda em um processo novo: tempo e pico de memória de uma carga a frio."""
+    codigo = f"""
+import resource, time
+import store
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+inicio = time.perf_counter()
+df = store.{fonte}
+tempo = time.perf_counter() - inicio
+pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+print(tempo, pico, len(df), int(df.memory_usage(deep=True).sum()))
+"""
+    saida = subprocess.run(
+        [sys.executable, '-c', codigo], check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout.split()
+    tempo, pico, linhas, memoria = float(saida[0]), int(saida[1]), int(saida[2]), int(saida[3])
+    return tempo, pico, linhas, memoria
+
+
+def benchmark(csv_path=DATA_FILE, store_dir=STORE_DIR):
+    """Compara a carga a frio do CSV com a do store Parquet."""
+    colunas = ['data', 'msg_type', 'par', 'direction', 'result', 'gale_level']
+    casos = [
+        ('CSV + classificação', f'load_classified_csv({csv_path!r})'),
+        ('Parquet (todas as colunas)', f'read_store({store_dir!r})'),
+        ('Parquet (colunas do dashboard)', f'read_store({store_dir!r}, columns={colunas!r})'),
+    ]
+    print(f"{'fonte':<32}{'tempo (s)':>10}{'pico RSS (MB)':>15}{'linhas':>10}{'frame (MB)':>12}")
+    for nome, fonte in casos:
+        tempo, pico, linhas, memoria = _measure_cold_start(fonte)
+        print(f"{nome:<32}{tempo:>10.3f}{pico / 1024:>15.1f}{linhas:>10}{memoria / 2**20:>12.1f}")
+
+
+def _legacy_frame(csv_path):
+    """Frame como o dashboard montava antes: texto, um dict por linha e colunas object."""
+    df = pd.read_csv(csv_path)
+    df['data'] = pd.to_datetime(df['data'])
+    df['classification'] = df['mensagem'].apply(classify_message)
+    df = df[df['classification'].notna()].copy()
+    for coluna, chave in [('msg_type', 'type'), ('par', 'par'), ('result', 'result'),
+                          ('gale_level', 'gale_level'), ('direction', 'direction')]:
+        df[coluna] = df['classification'].apply(lambda x: x[chave])
+    return df
+
+
+def memory_report(csv_path=DATA_FILE):
+    """Bytes por linha (memória profunda) de cada representação do frame classificado."""
+    classificado = load_classified_csv(csv_path)
+    representacoes = [
+        ('original (dict por linha, object)', _legacy_frame(csv_path)),
+        ('load_classified_csv', classificado),
+        ('compacto com texto', compact_frame(classificado, keep_text=True)),
+        ('compacto', compact_frame(classificado)),
+    ]
+    colunas = list(dict.fromkeys(c for _, df in representacoes for c in df.columns))
+    print(f"{'bytes por linha':<36}" + ''.join(f"{c[:14]:>15}" for c in colunas) + f"{'total':>10}")
+    for nome, df in representacoes:
+        por_coluna = df.memory_usage(deep=True, index=False) / len(df)
+        print(f"{nome:<36}" + ''.join(f"{por_coluna[c]:>15.1f}" if c in df else f"{'-':>15}" for c in colunas)
+              + f"{por_coluna.sum():>10.1f}")
+
+
+if __name__ == "__main__":
+    # python store.py convert [csv] [store]  |  compact [store]  |  benchmark [csv] [store]  |  memory [csv]
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'convert'
+    argumentos = sys.argv[2:]
+    if comando == 'convert':
+        inicio = time.perf_counter()
+        total = convert_csv_to_store(*argumentos)
+        print(f"{total} mensagens gravadas em {time.perf_counter() - inicio:.2f}s")
+    elif comando == 'compact':
+        print(f"{compact_store(*argumentos)} meses compactados")
+    elif comando == 'benchmark':
+        benchmark(*argumentos)
+    elif comando == 'memory':
+        memory_report(*argumentos)
+    else:
+        sys.exit(f"Comando desconhecido: {comando}")
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from cleaning import UTC_OFFSET
+
+# Pares e taxas de acerto padrão (perto das do histórico real): acerto na
+# entrada, recuperação no G1 e recuperação no G2, cada uma condicional à anterior
+DEFAULT_PAIRS = ('BTC/USDT', 'ETH/USDT')
+DEFAULT_WIN_RATES = (0.52, 0.50, 0.49)
+DEFAULT_AUTHOR = -1002836003329
+
+# Linhas geradas por bloco: a memória fica constante para qualquer tamanho
+CHUNK_ROWS = 1_000_000
+
+# Textos no formato exato das mensagens da sala
+SIGNAL_PREFIX = "⚠️ **Novo Sinal Encontrado** ⚠️\n\n🪙 **Par:** `{par}`\n⏰ **Entrada:** "
+DIRECTION_SUFFIXES = ["\n🔴⬇️ **Vender**", "\n🟢⬆️ **Comprar**"]
+GALE_TEXT = "⚠️ **Faça o GALE {nivel} para {par}** ⚠️"
+RESULT_TEXTS = [
+    "✅ **WIN em {par}** ✅",
+    "✅ **WIN (G1) em {par}** ✅",
+    "✅ **WIN (G2) em {par}** ✅",
+    "❎ **STOP em {par}** ❎",
+]
+# Mensagens que o tratamento descarta (só na exportação bruta)
+NOISE_TEXTS = [
+    "⚠️ **AVISO IMPORTANTE** ⚠️\n\nAmanhã não teremos sinais. ✅ **WIN em BTC/USDT** ✅ é só exemplo.",
+    "Bom dia, pessoal! Hoje tem sala às 9h.",
+    "📊 Resultado da semana disponível no canal.",
+]
+
+# Gales chamados antes de cada resultado (WIN, WIN_G1, WIN_G2, STOP)
+_GALES = np.array([0, 1, 2, 2])
+_HHMM = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+
+def outcome_probabilities(win_rates=DEFAULT_WIN_RATES):
+    """Probabilidade de WIN, WIN_G1, WIN_G2 e STOP a partir das taxas condicionais."""
+    entrada, g1, g2 = win_rates
+    return np.array([
+        entrada,
+        (1 - entrada) * g1,
+        (1 - entrada) * (1 - g1) * g2,
+        (1 - entrada) * (1 - g1) * (1 - g2),
+    ])
+
+
+def messages_per_signal(win_rates=DEFAULT_WIN_RATES):
+    """Média de mensagens por sinal (sinal + gales + resultado)."""
+    return float(2 + outcome_probabilities(win_rates) @ _GALES)
+
+
+class SignalRoomGenerator:
+    """Gera mensagens de uma sala de sinais em blocos, continuando ids e horários.
+
+    Cada sinal vem seguido dos seus gales e do resultado, um minuto depois do
+    outro, com 2 a 14 minutos entre o fim de um sinal e o próximo. Com
+    `raw=True` as datas ficam em UTC (como na exportação do Telegram) e uma
+    fração `noise` de mensagens irrelevantes é misturada; sem isso, o formato
+    é o de mensagens_tratadas.csv.
+    """
+
+    def __init__(self, pairs=DEFAULT_PAIRS, win_rates=DEFAULT_WIN_RATES, start=datetime(2025, 8, 1),
+                 raw=False, noise=0.0, author_id=DEFAULT_AUTHOR, first_id=1, seed=None):
+        self.pairs = list(pairs)
+        self.win_rates = win_rates
+        self.probabilities = outcome_probabilities(win_rates)
+        self.raw = raw
+        self.noise = noise
+        self.author_id = author_id
+        self.next_id = first_id
+        self.start = pd.Timestamp(start)
+        self.minute = 0
+        self.rng = np.random.default_rng(seed)
+
+        # Textos fixos por (tipo, par): gales 1 e 2 e os quatro resultados
+        self.fixed_texts = np.array(
+            [[GALE_TEXT.format(nivel=nivel, par=par) for par in self.pairs] for nivel in (1, 2)]
+            + [[texto.format(par=par) for par in self.pairs] for texto in RESULT_TEXTS],
+            dtype=object,
+        )
+        self.signal_prefixes = np.array([SIGNAL_PREFIX.format(par=par) for par in self.pairs], dtype=object)
+
+    def signals(self, n_signals):
+        """Frame com as mensagens dos próximos `n_signals` sinais."""
+        rng = self.rng
+        resultados = rng.choice(4, size=n_signals, p=self.probabilities)
+        pares = rng.integers(0, len(self.pairs), size=n_signals)
+        direcoes = rng.integers(0, 2, size=n_signals)
+        n_mensagens = 2 + _GALES[resultados]
+
+        # Minuto de início de cada sinal e posição de cada mensagem no seu sinal
+        intervalos = rng.integers(2, 15, size=n_signals)
+        duracao_anterior = np.concatenate([[0], n_mensagens[:-1]])
+        inicios = self.minute + np.cumsum(intervalos + duracao_anterior)
+        sinal = np.repeat(np.arange(n_signals), n_mensagens)
+        posicao = np.arange(len(sinal)) - np.repeat(np.cumsum(n_mensagens) - n_mensagens, n_mensagens)
+        minutos = inicios[sinal] + posicao
+        if n_signals:
+            self.minute = int(minutos[-1])
+
+        # Texto: sinal (com horário de entrada e direção), gale ou resultado
+        par = pares[sinal]
+        ultima = posicao == n_mensagens[sinal] - 1
+        tipo = np.where(ultima, 2 + resultados[sinal], posicao - 1)
+        textos = np.empty(len(sinal), dtype=object)
+        e_sinal = posicao == 0
+        fixas = ~e_sinal
+        textos[fixas] = self.fixed_texts[tipo[fixas], par[fixas]]
+        entrada = (self.start.hour * 60 + self.start.minute + minutos[e_sinal] + 1) % 1440
+        textos[e_sinal] = (self.signal_prefixes[par[e_sinal]] + _HHMM[entrada]
+                           + np.array(DIRECTION_SUFFIXES, dtype=object)[direcoes[sinal[e_sinal]]])
+
+        segundos = minutos * 60 + rng.integers(0, 60, size=len(sinal))
+        if self.raw and self.noise > 0:
+            textos, segundos = self._add_noise(textos, segundos)
+
+        datas = self.start + pd.to_timedelta(segundos, unit='s')
+        if self.raw:
+            datas = datas - UTC_OFFSET
+        ids = np.arange(self.next_id, self.next_id + len(textos))
+        self.next_id += len(textos)
+        return pd.DataFrame({'id': ids, 'data': datas, 'autor_id': self.author_id, 'mensagem': textos})
+
+    def _add_noise(self, textos, segundos):
+        n_ruido = self.rng.binomial(len(textos), self.noise / (1 + self.noise))
+        posicoes = np.sort(self.rng.integers(0, len(textos) + 1, size=n_ruido))
+        ruido = np.array(NOISE_TEXTS, dtype=object)[self.rng.integers(0, len(NOISE_TEXTS), size=n_ruido)]
+        anteriores = segundos[np.maximum(posicoes - 1, 0)]
+        return np.insert(textos, posicoes, ruido), np.insert(segundos, posicoes, anteriores)
+
+    def frames(self, n_rows, chunk_rows=CHUNK_ROWS):
+        """Gera frames de até `chunk_rows` linhas, somando exatamente `n_rows`."""
+        por_sinal = messages_per_signal(self.win_rates) * (1 + (self.noise if self.raw else 0))
+        restantes = n_rows
+        while restantes > 0:
+            bloco = self.signals(max(1, int(min(restantes, chunk_rows) / por_sinal)) + 1)
+            if len(bloco) > restantes:
+                bloco = bloco.iloc[:restantes]
+            restantes -= len(bloco)
+            yield bloco
+
+
+# Colunas do CSV; datas em segundos, no mesmo formato do pandas (2025-08-01 00:02:10)
+CSV_SCHEMA = pa.schema([
+    ('id', pa.int64()), ('data', pa.timestamp('s')), ('autor_id', pa.int64()), ('mensagem', pa.string()),
+])
+
+
+def write_csv(path, n_rows, chunk_rows=CHUNK_ROWS, **opcoes):
+    """Grava `n_rows` mensagens sintéticas em CSV, bloco a bloco.
+
+    As opções são as de SignalRoomGenerator. O CSV é escrito pelo pyarrow
+    (cerca de 8x mais rápido que DataFrame.to_csv) e lido pelo pandas igual
+    a um CSV gravado por ele. Retorna quantas linhas gravou.
+    """
+    gerador = SignalRoomGenerator(**opcoes)
+    gravadas = 0
+    with pa_csv.CSVWriter(path, CSV_SCHEMA) as saida:
+        for bloco in gerador.frames(n_rows, chunk_rows):
+            saida.write_table(pa.Table.from_pandas(bloco, schema=CSV_SCHEMA, preserve_index=False, safe=False))
+            gravadas += len(bloco)
+    return gravadas
+
+
+if __name__ == "__main__":
+    # python synthetic.py linhas [saida.csv] [bruto]: 'bruto' gera a exportação sem tratamento
+    n_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    saida = sys.argv[2] if len(sys.argv) > 2 else f'sintetico_{n_linhas}.csv'
+    bruto = len(sys.argv) > 3 and sys.argv[3] == 'bruto'
+    inicio = time.perf_counter()
+    total = write_csv(saida, n_linhas, raw=bruto, noise=0.05 if bruto else 0.0, seed=0)
+    segundos = time.perf_counter() - inicio
+    print(f"{total:,} mensagens em {saida} ({os.path.getsize(saida) / 2**20:.1f} MB) "
+          f"em {segundos:.2f}s ({total / segundos:,.0f} linhas/s)")
@@ -0,0 +1,103 @@
+"""Classificador original do dashboard (if/elif), congelado como oráculo.
+
+Cópia literal de classify_message antes da vetorização: classifier.py
+precisa classificar igual a ele. Não alterar.
+"""
+import re
+
+import pandas as pd
+
+
+def classify_message(message):
+    """Classifica o tipo de mensagem"""
+    if pd.isna(message):
+        return None
+
+    message = str(message)
+
+    # Sinais
+    if "Novo Sinal Encontrado" in message:
+        # Extrair par
+        par_match = re.search(r'\*\*Par:\*\* `([^`]+)`', message)
+        # Extrair direção
+        if "🔴⬇️" in message or "Vender" in message:
+            direction = "PUT"
+        elif "🟢⬆️" in message or "Comprar" in message:
+            direction = "CALL"
+        else:
+            direction = "UNKNOWN"
+        
+        return {
+            'type': 'SIGNAL',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': direction,
+            'result': None,
+            'gale_level': 0
+        }
+
+    # WIN direto
+    elif "WIN em" in message and "G1" not in message and "G2" not in message:
+        par_match = re.search(r'WIN em ([A-Z/]+)', message)
+        return {
+            'type': 'WIN',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': None,
+            'result': 'WIN',
+            'gale_level': 0
+        }
+
+    # WIN G1
+    elif "WIN (G1)" in message:
+        par_match = re.search(r'WIN \(G1\) em ([A-Z/]+)', message)
+        return {
+            'type': 'WIN_G1',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': None,
+            'result': 'WIN',
+            'gale_level': 1
+        }
+
+    # WIN G2
+    elif "WIN (G2)" in message:
+        par_match = re.search(r'WIN \(G2\) em ([A-Z/]+)', message)
+        return {
+            'type': 'WIN_G2',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': None,
+            'result': 'WIN',
+            'gale_level': 2
+        }
+
+    # STOP (LOSS)
+    elif "STOP em" in message:
+        par_match = re.search(r'STOP em ([A-Z/]+)', message)
+        return {
+            'type': 'STOP',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': None,
+            'result': 'LOSS',
+            'gale_level': 2  # STOP sempre acontece após G2
+        }
+
+    # Chamadas para GALE
+    elif "Faça o GALE 1" in message:
+        par_match = re.search(r'para ([A-Z/]+)', message)
+        return {
+            'type': 'GALE_CALL_1',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': None,
+            'result': None,
+            'gale_level': 1
+        }
+
+    elif "Faça o GALE 2" in message:
+        par_match = re.search(r'para ([A-Z/]+)', message)
+        return {
+            'type': 'GALE_CALL_2',
+            'par': par_match.group(1) if par_match else 'UNKNOWN',
+            'direction': None,
+            'result': None,
+            'gale_level': 2
+        }
+
+    return None
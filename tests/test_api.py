@@ -0,0 +1,99 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from api import MetricsService, _handle_connection
+from ingest import append_to_csv
+from metrics import calculate_metrics
+from store import load_classified_csv
+from synthetic import SignalRoomGenerator
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    caminho = tmp_path / 'mensagens_tratadas.csv'
+    append_to_csv(SignalRoomGenerator(start=datetime(2025, 8, 1), seed=1).signals(200), caminho)
+    return caminho
+
+
+def test_metrics_match_full_read(csv_path):
+    service = MetricsService(str(csv_path))
+    status, cabecalhos, corpo = service.respond('/metrics', '')
+    assert status == 200
+    assert cabecalhos['Content-Type'].startswith('application/json')
+    esperado = calculate_metrics(load_classified_csv(str(csv_path)))
+    assert json.loads(corpo)['metrics'] == pytest.approx(esperado)
+
+
+def test_if_none_match_returns_304_until_data_changes(csv_path):
+    service = MetricsService(str(csv_path))
+    status, cabecalhos, corpo = service.respond('/metrics', 'start=2025-08-01')
+    etag = cabecalhos['ETag']
+
+    status, cabecalhos, corpo = service.respond('/metrics', 'start=2025-08-01', etag)
+    assert (status, corpo, cabecalhos['ETag']) == (304, b'', etag)
+    # Lista de ETags e ETag de outra resposta
+    assert service.respond('/metrics', 'start=2025-08-01', f'"outro", {etag}')[0] == 304
+    assert service.respond('/metrics', 'start=2025-08-01', '"outro"')[0] == 200
+    # Outro período é outra resposta
+    assert service.respond('/metrics', 'start=2025-08-02', etag)[0] == 200
+
+    append_to_csv(SignalRoomGenerator(start=datetime(2025, 8, 10), first_id=10_000, seed=2).signals(5), csv_path)
+    assert service.refresh() > 0
+    status, cabecalhos, corpo = service.respond('/metrics', 'start=2025-08-01', etag)
+    assert status == 200
+    assert cabecalhos['ETag'] != etag
+
+
+def test_cache_reuses_body_for_same_query(csv_path):
+    service = MetricsService(str(csv_path))
+    primeira = service.respond('/pairs', 'end=2025-08-02&start=2025-08-01')
+    # Ordem dos parâmetros não muda a chave do cache
+    assert service.respond('/pairs', 'start=2025-08-01&end=2025-08-02')[2] is primeira[2]
+    assert len(service.cache) == 1
+
+
+def test_errors_are_not_revalidated(csv_path):
+    service = MetricsService(str(csv_path))
+    status, cabecalhos, corpo = service.respond('/metrics', 'start=01/08/2025')
+    assert status == 400
+    assert 'error' in json.loads(corpo)
+    assert service.respond('/metrics', 'start=01/08/2025', cabecalhos['ETag'])[0] == 400
+
+    assert service.respond('/nada', '')[0] == 404
+    assert service.respond('/metrics', 'channel=123')[0] == 404
+    assert service.respond('/metrics', 'channel=abc')[0] == 400
+
+
+def test_http_conditional_get(csv_path):
+    service = MetricsService(str(csv_path))
+
+    async def pedir(escritor, leitor, linhas):
+        escritor.write(('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1'))
+        await escritor.drain()
+        cabecalho = (await leitor.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        cabecalhos = dict(linha.split(': ', 1) for linha in cabecalho[1:] if linha)
+        corpo = await leitor.readexactly(int(cabecalhos['Content-Length'])) if 'HEAD' not in linhas[0] else b''
+        return int(cabecalho[0].split(' ')[1]), cabecalhos, corpo
+
+    async def conversa():
+        servidor = await asyncio.start_server(
+            lambda reader, writer: _handle_connection(service, reader, writer), '127.0.0.1', 0)
+        porta = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+            # Mesma conexão (keep-alive) para os três pedidos
+            primeira = await pedir(escritor, leitor, ['GET /daily HTTP/1.1', 'Host: x'])
+            segunda = await pedir(escritor, leitor, ['GET /daily HTTP/1.1', 'Host: x',
+                                                     f"If-None-Match: {primeira[1]['ETag']}"])
+            cabeca = await pedir(escritor, leitor, ['HEAD /daily HTTP/1.1', 'Host: x'])
+            escritor.close()
+        return primeira, segunda, cabeca
+
+    primeira, segunda, cabeca = asyncio.run(conversa())
+    assert primeira[0] == 200 and json.loads(primeira[2])
+    assert segunda[0] == 304 and segunda[2] == b''
+    assert segunda[1]['ETag'] == primeira[1]['ETag']
+    assert cabeca[0] == 200 and cabeca[1]['ETag'] == primeira[1]['ETag']
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from classifier import classify_frame, classify_message
+from tests.legacy_classifier import classify_message as legacy_classify_message
+
+DATA_FILE = Path(__file__).resolve().parent.parent / 'mensagens_tratadas.csv'
+
+# Casos de borda: ordem das regras, direção ausente, par fora do padrão, vazios
+EDGE_CASES = [
+    None,
+    '',
+    'mensagem qualquer',
+    'WIN em BTC/USDT',
+    'WIN em btc/usdt',
+    '✅ WIN (G1) em ETH/USDT ✅',
+    'WIN (G2) em SOL/USDT',
+    'WIN em ETH/USDT depois do G1',
+    'STOP em BTC/USDT',
+    '⚠️ **Faça o GALE 1 para BTC/USDT** ⚠️',
+    'Faça o GALE 2 para',
+    '🚨 Novo Sinal Encontrado 🚨 **Par:** `BTC/USDT` 🔴⬇️',
+    'Novo Sinal Encontrado **Par:** `ETH/USDT` Comprar',
+    'Novo Sinal Encontrado sem par nem direção',
+    'Novo Sinal Encontrado Vender Comprar WIN em BTC/USDT',
+    'STOP em XRP/USDT WIN (G2) em XRP/USDT',
+]
+
+
+def _expected_frame(mensagens):
+    esperado = {idx: legacy_classify_message(texto) for idx, texto in mensagens.items()}
+    esperado = {idx: valor for idx, valor in esperado.items() if valor is not None}
+    return pd.DataFrame({
+        'msg_type': [valor['type'] for valor in esperado.values()],
+        'par': [valor['par'] for valor in esperado.values()],
+        'direction': [valor['direction'] for valor in esperado.values()],
+        'result': [valor['result'] for valor in esperado.values()],
+        'gale_level': [valor['gale_level'] for valor in esperado.values()],
+    }, index=pd.Index(list(esperado), dtype=mensagens.index.dtype))
+
+
+def _divergences(mensagens, autores=None):
+    """Índices em que classify_frame e o classificador original divergem."""
+    esperado = pd.Series([legacy_classify_message(texto) for texto in mensagens], index=mensagens.index,
+                         dtype=object).dropna()
+    obtido = classify_frame(mensagens, autores)
+
+    divergentes = sorted(set(esperado.index).symmetric_difference(obtido.index))
+    for idx in esperado.index.intersection(obtido.index):
+        linha = obtido.loc[idx]
+        for chave, coluna in [('type', 'msg_type'), ('par', 'par'), ('direction', 'direction'),
+                              ('result', 'result'), ('gale_level', 'gale_level')]:
+            valor, atual = esperado[idx][chave], linha[coluna]
+            if (valor is None and not pd.isna(atual)) or (valor is not None and valor != atual):
+                divergentes.append(idx)
+                break
+    return divergentes
+
+
+def _assert_same(mensagens, autores=None):
+    obtido = classify_frame(mensagens, autores).astype(object).where(lambda df: df.notna(), None)
+    obtido['gale_level'] = obtido['gale_level'].astype(int)
+    pd.testing.assert_frame_equal(obtido, _expected_frame(mensagens), check_dtype=False)
+
+
+@pytest.mark.skipif(not DATA_FILE.exists(), reason='sem mensagens_tratadas.csv')
+def test_classify_frame_matches_legacy_on_real_data():
+    df = pd.read_csv(DATA_FILE)
+    # Lista os índices divergentes antes da comparação completa, que só mostra a primeira diferença
+    assert _divergences(df['mensagem'], df['autor_id']) == []
+    _assert_same(df['mensagem'], df['autor_id'])
+
+
+def test_classify_frame_matches_legacy_on_edge_cases():
+    _assert_same(pd.Series(EDGE_CASES, dtype=object))
+
+
+def test_classify_message_matches_legacy():
+    for texto in EDGE_CASES:
+        assert classify_message(texto) == legacy_classify_message(texto), texto
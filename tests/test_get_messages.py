@@ -0,0 +1,123 @@
+import asyncio
+import csv
+
+import pytest
+
+from fake_telegram import FakeTelegramClient, synthetic_messages
+from get_messages import CSV_HEADER, export_group_messages, load_checkpoint, partition_path
+
+CANAL = 'https://t.me/+canal'
+
+
+def _rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def _export(mensagens, saida, limit=None, batch_size=7):
+    # Um canal exporta direto em `saida`; vários, um arquivo por canal
+    grupos = list(mensagens) if len(mensagens) > 1 else next(iter(mensagens))
+    cliente = FakeTelegramClient(mensagens)
+    exportadas = asyncio.run(export_group_messages(grupos, str(saida), limit=limit, batch_size=batch_size,
+                                                   client=cliente))
+    return exportadas, cliente
+
+
+def test_resume_continues_after_last_checkpoint(tmp_path):
+    mensagens = synthetic_messages(10, seed=3)
+    saida = tmp_path / 'mensagens.csv'
+
+    exportadas, _ = _export({CANAL: mensagens}, saida, limit=12)
+    assert exportadas == {CANAL: 12}
+    assert load_checkpoint(str(saida))['max_id'] == mensagens[11].id
+
+    exportadas, cliente = _export({CANAL: mensagens}, saida)
+    assert exportadas == {CANAL: len(mensagens) - 12}
+    assert cliente.calls[0][2] == mensagens[11].id
+
+    linhas = _rows(saida)
+    assert linhas[0] == CSV_HEADER
+    assert [int(linha[0]) for linha in linhas[1:]] == [m.id for m in mensagens]
+
+
+def test_resume_discards_batch_written_after_checkpoint(tmp_path):
+    mensagens = synthetic_messages(10, seed=4)
+    saida = tmp_path / 'mensagens.csv'
+    _export({CANAL: mensagens}, saida, limit=14)
+
+    # Lote gravado pela metade quando a exportação caiu, sem checkpoint
+    with open(saida, 'a', encoding='utf-8') as f:
+        f.write(f'{mensagens[14].id},2025-09-01 00:00:00,-1000,"pela met')
+
+    _export({CANAL: mensagens}, saida)
+    assert [int(linha[0]) for linha in _rows(saida)[1:]] == [m.id for m in mensagens]
+
+
+def test_resume_restarts_when_output_was_deleted(tmp_path):
+    mensagens = synthetic_messages(10, seed=6)
+    saida = tmp_path / 'mensagens.csv'
+    _export({CANAL: mensagens}, saida, limit=12)
+
+    # Só o checkpoint sobrou: exporta tudo de novo, com cabeçalho
+    saida.unlink()
+    exportadas, cliente = _export({CANAL: mensagens}, saida)
+    assert cliente.calls[0][2] == 0
+    assert exportadas == {CANAL: len(mensagens)}
+    linhas = _rows(saida)
+    assert linhas[0] == CSV_HEADER
+    assert [int(linha[0]) for linha in linhas[1:]] == [m.id for m in mensagens]
+
+
+def test_resume_refuses_output_shorter_than_checkpoint(tmp_path):
+    mensagens = synthetic_messages(10, seed=7)
+    saida = tmp_path / 'mensagens.csv'
+    _export({CANAL: mensagens}, saida, limit=12)
+    conteudo = saida.read_bytes()
+    saida.write_bytes(conteudo[:len(conteudo) // 2])
+
+    with pytest.raises(ValueError, match='checkpoint'):
+        _export({CANAL: mensagens}, saida)
+    assert saida.read_bytes() == conteudo[:len(conteudo) // 2]
+
+
+def test_resume_legacy_export_without_checkpoint(tmp_path):
+    mensagens = synthetic_messages(10, seed=5)
+    saida = tmp_path / 'mensagens.csv'
+    with open(saida, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows([m.id, m.date.strftime('%Y-%m-%d %H:%M:%S'), m.sender_id, m.text] for m in mensagens[:9])
+
+    exportadas, cliente = _export({CANAL: mensagens}, saida)
+    assert cliente.calls[0][2] == mensagens[8].id
+    assert exportadas == {CANAL: len(mensagens) - 9}
+    assert [int(linha[0]) for linha in _rows(saida)[1:]] == [m.id for m in mensagens]
+
+
+def test_resume_legacy_export_ignores_rows_without_numeric_id(tmp_path):
+    saida = tmp_path / 'mensagens.csv'
+    saida.write_text('id,data,autor_id,mensagem\n'
+                     '5,2025-09-01 00:00:00,-1000,a\n'
+                     '\n'
+                     'x7,2025-09-01 00:01:00,-1000,b\n'
+                     '12,2025-09-01 00:02:00,-1000,c\n'
+                     ',2025-09-01 00:03:00,-1000,d\n', encoding='utf-8')
+    assert load_checkpoint(str(saida))['max_id'] == 12
+
+
+def test_concurrent_channels_resume_independently(tmp_path):
+    canais = [f'https://t.me/+canal{i}' for i in range(3)]
+    mensagens = {canal: synthetic_messages(8, seed=10 + i, sender_id=-1000 - i) for i, canal in enumerate(canais)}
+    saida = tmp_path / 'mensagens.csv'
+
+    cliente = FakeTelegramClient(mensagens, flood_waits={canais[0]: [(5, 0)]})
+    exportadas = asyncio.run(export_group_messages(canais, str(saida), limit=10, batch_size=4, client=cliente,
+                                                   max_concurrency=2))
+    assert exportadas == dict.fromkeys(canais, 10)
+
+    exportadas, _ = _export(mensagens, saida)
+    for canal in canais:
+        assert exportadas[canal] == len(mensagens[canal]) - 10
+        linhas = _rows(partition_path(str(saida), canal))
+        assert [int(linha[0]) for linha in linhas[1:]] == [m.id for m in mensagens[canal]]
+        assert {int(linha[2]) for linha in linhas[1:]} == {mensagens[canal][0].sender_id}
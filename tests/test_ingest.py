@@ -0,0 +1,51 @@
+import pandas as pd
+
+from database import MessageDatabase
+from fake_telegram import synthetic_messages
+from ingest import StreamIngestor
+from metrics import MetricsAccumulator, calculate_metrics
+from store import load_classified_csv, read_store
+
+
+def _ingest(tmp_path, mensagens, max_rows):
+    ingestor = StreamIngestor(store_dir=str(tmp_path / 'store'), max_rows=max_rows,
+                              database_path=str(tmp_path / 'mensagens.sqlite'),
+                              csv_path=str(tmp_path / 'mensagens.csv'))
+    for mensagem in mensagens:
+        ingestor.add_message(mensagem.id, mensagem.date, mensagem.sender_id, mensagem.text)
+    ingestor.flush()
+    return ingestor
+
+
+def test_ingest_store_database_and_csv_agree(tmp_path):
+    mensagens = synthetic_messages(50, seed=1)
+    # Lotes de tamanho que não divide o total: o último só sai no flush final
+    _ingest(tmp_path, mensagens, max_rows=37)
+
+    store = read_store(str(tmp_path / 'store'))
+    with MessageDatabase(str(tmp_path / 'mensagens.sqlite')) as banco:
+        banco_df = banco.read_period()
+        rollups = banco.accumulator()
+    # O CSV acrescentado, reclassificado do zero, é a referência do tratamento em lote
+    lote = load_classified_csv(str(tmp_path / 'mensagens.csv'))
+
+    assert len(lote) == len(mensagens)
+    pd.testing.assert_frame_equal(store, lote)
+    pd.testing.assert_frame_equal(banco_df, lote)
+
+    esperado = calculate_metrics(lote)
+    assert MetricsAccumulator.from_frame(store).metrics() == esperado
+    assert rollups.metrics() == esperado
+    assert rollups.by_day().equals(MetricsAccumulator.from_frame(lote).by_day())
+
+
+def test_ingest_skips_irrelevant_messages(tmp_path):
+    mensagens = synthetic_messages(5, seed=2)
+    ingestor = StreamIngestor(store_dir=None, max_rows=1000, csv_path=str(tmp_path / 'mensagens.csv'))
+    assert ingestor.add_message(999, mensagens[0].date, mensagens[0].sender_id, 'bom dia a todos') is None
+    assert ingestor.add_message(1000, mensagens[0].date, mensagens[0].sender_id, '') is None
+    for mensagem in mensagens:
+        ingestor.add_message(mensagem.id, mensagem.date, mensagem.sender_id, mensagem.text)
+    assert ingestor.flush() == len(mensagens)
+    assert ingestor.flush() == 0
+    assert not (tmp_path / 'store').exists()
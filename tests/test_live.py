@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pandas as pd
+
+from ingest import append_to_csv
+from live import LiveFrame
+from metrics import calculate_metrics
+from store import load_classified_csv
+from synthetic import SignalRoomGenerator
+
+
+def _assert_matches_full_read(live, path):
+    esperado = load_classified_csv(str(path), keep_text=False)
+    pd.testing.assert_frame_equal(live.frame(), esperado)
+    assert live.accumulator.metrics() == calculate_metrics(esperado)
+    canais = {canal: acumulador.metrics() for canal, acumulador in live.channels.items()}
+    assert canais == {int(canal): calculate_metrics(grupo)
+                      for canal, grupo in esperado.groupby('autor_id', observed=True)}
+
+
+def test_update_reads_only_appended_rows(tmp_path):
+    caminho = tmp_path / 'mensagens_tratadas.csv'
+    gerador = SignalRoomGenerator(pairs=['BTC/USDT'], seed=1)
+    append_to_csv(gerador.signals(20), caminho)
+
+    live = LiveFrame(str(caminho))
+    assert live.update() is None
+    _assert_matches_full_read(live, caminho)
+    assert live.update() == 0
+
+    # Lote de outro canal, com um par que ainda não apareceu
+    novos = SignalRoomGenerator(pairs=['SOL/USDT'], start=datetime(2025, 8, 3), author_id=-2000, first_id=1000,
+                                seed=2).signals(10)
+    append_to_csv(novos, caminho)
+    revisao = live.revision
+    assert live.update() == len(novos)
+    assert live.revision == revisao + 1
+    _assert_matches_full_read(live, caminho)
+
+
+def test_update_waits_for_complete_records(tmp_path):
+    caminho = tmp_path / 'mensagens_tratadas.csv'
+    gerador = SignalRoomGenerator(seed=3)
+    append_to_csv(gerador.signals(10), caminho)
+    live = LiveFrame(str(caminho))
+    live.update()
+
+    # Escrita cortada no meio de um registro (dentro do texto entre aspas)
+    novos = gerador.signals(5)
+    texto = novos.to_csv(header=False, index=False)
+    corte = texto.index('\n', texto.index('"')) + 1
+    with open(caminho, 'a', newline='', encoding='utf-8') as f:
+        f.write(texto[:corte])
+    parcial = live.update()
+    assert parcial < len(novos)
+    with open(caminho, 'a', newline='', encoding='utf-8') as f:
+        f.write(texto[corte:])
+    assert parcial + live.update() == len(novos)
+    _assert_matches_full_read(live, caminho)
+
+
+def test_update_reloads_when_rewritten_in_place(tmp_path):
+    caminho = tmp_path / 'mensagens_tratadas.csv'
+    append_to_csv(SignalRoomGenerator(seed=4).signals(20), caminho)
+    live = LiveFrame(str(caminho))
+    live.update()
+
+    # Mesmo arquivo (mesmo inode), conteúdo trocado e maior: não é um acréscimo
+    outro = SignalRoomGenerator(pairs=['XRP/USDT'], seed=5).signals(30)
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        f.write(outro.to_csv(index=False))
+    assert live.update() is None
+    _assert_matches_full_read(live, caminho)
+    assert set(live.frame()['par'].unique()) == {'XRP/USDT'}
+
+
+def test_update_reloads_when_file_is_replaced(tmp_path):
+    caminho = tmp_path / 'mensagens_tratadas.csv'
+    append_to_csv(SignalRoomGenerator(seed=6).signals(20), caminho)
+    live = LiveFrame(str(caminho))
+    live.update()
+
+    temporario = tmp_path / 'novo.csv'
+    append_to_csv(SignalRoomGenerator(seed=7).signals(5), temporario)
+    temporario.replace(caminho)
+    assert live.update() is None
+    _assert_matches_full_read(live, caminho)
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+import merge
+from merge import KEY_COLUMNS, merge_exports
+
+
+def _export(path, canal, ids, texto='msg {id}', colunas=('id', 'data', 'autor_id', 'mensagem')):
+    df = pd.DataFrame({
+        'id': ids,
+        'data': [f'2025-09-01 00:{i % 60:02d}:00' for i in ids],
+        'autor_id': canal,
+        'mensagem': [texto.format(id=i) for i in ids],
+    })
+    df[list(colunas)].to_csv(path, index=False)
+    return df
+
+
+def _expected(frames):
+    # Oráculo em memória: vale a última cópia lida de cada (autor_id, id)
+    df = pd.concat(frames, ignore_index=True).drop_duplicates(KEY_COLUMNS, keep='last')
+    return df.sort_values(KEY_COLUMNS, kind='stable').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('chunksize, min_batch', [(100_000, merge.MIN_BATCH), (7, 3)])
+def test_merge_keeps_last_copy_of_each_message(tmp_path, monkeypatch, chunksize, min_batch):
+    # Blocos pequenos: a mesma mensagem cai em arquivos temporários e lotes diferentes
+    monkeypatch.setattr(merge, 'MIN_BATCH', min_batch)
+    primeira = _export(tmp_path / 'a.csv', -100, range(1, 41))
+    # Sobrepõe 31..40 com texto editado e segue até 60, com colunas em outra ordem
+    segunda = _export(tmp_path / 'b.csv', -100, range(31, 61), texto='editada {id}',
+                      colunas=('autor_id', 'mensagem', 'id', 'data'))
+    # Outro canal com os mesmos ids: não são duplicatas
+    outro = _export(tmp_path / 'c.csv', -200, range(1, 21))
+    # Reexportação idêntica do começo do primeiro canal
+    repetida = _export(tmp_path / 'd.csv', -100, range(1, 11))
+
+    saida = tmp_path / 'merged.csv'
+    relatorio = merge_exports([tmp_path / nome for nome in ('a.csv', 'b.csv', 'c.csv', 'd.csv')], saida,
+                              chunksize=chunksize, report_path=tmp_path / 'report.csv')
+
+    esperado = _expected([primeira, segunda, outro, repetida])
+    pd.testing.assert_frame_equal(pd.read_csv(saida), esperado)
+    assert relatorio['rows_in'] == 40 + 30 + 20 + 10
+    assert relatorio['rows_out'] == len(esperado) == 60 + 20
+    assert relatorio['duplicate_messages'] == 20
+    assert relatorio['duplicate_rows'] == 20
+    assert relatorio['edited_messages'] == 10
+    assert relatorio['gaps'] == relatorio['missing_ids'] == 0
+    assert relatorio['channels'] == {
+        -200: {'first_id': 1, 'last_id': 20, 'messages': 20, 'missing_ids': 0},
+        -100: {'first_id': 1, 'last_id': 60, 'messages': 60, 'missing_ids': 0},
+    }
+
+    detalhes = pd.read_csv(tmp_path / 'report.csv')
+    duplicatas = detalhes[detalhes['kind'] == 'duplicate']
+    assert sorted(duplicatas['first_id']) == list(range(1, 11)) + list(range(31, 41))
+    assert set(duplicatas['autor_id']) == {-100}
+    assert duplicatas.set_index('first_id')['edited'].to_dict() == {
+        **dict.fromkeys(range(1, 11), 0), **dict.fromkeys(range(31, 41), 1)}
+
+
+def test_merge_reports_gaps(tmp_path):
+    _export(tmp_path / 'a.csv', -100, [1, 2, 3, 7, 8])
+    _export(tmp_path / 'b.csv', -100, [8, 9, 20])
+    relatorio = merge_exports([tmp_path / 'a.csv', tmp_path / 'b.csv'], tmp_path / 'merged.csv')
+
+    assert pd.read_csv(tmp_path / 'merged.csv')['id'].tolist() == [1, 2, 3, 7, 8, 9, 20]
+    assert relatorio['gaps'] == 2
+    assert relatorio['missing_ids'] == 3 + 10
+    assert relatorio['gap_ranges'] == [
+        {'autor_id': -100, 'first_id': 4, 'last_id': 6},
+        {'autor_id': -100, 'first_id': 10, 'last_id': 19},
+    ]
+
+
+def test_merge_rejects_different_columns(tmp_path):
+    _export(tmp_path / 'a.csv', -100, [1, 2])
+    pd.DataFrame({'id': [3], 'autor_id': [-100]}).to_csv(tmp_path / 'b.csv', index=False)
+    (tmp_path / 'merged.csv').write_text('anterior\n')
+    with pytest.raises(ValueError):
+        merge_exports([tmp_path / 'a.csv', tmp_path / 'b.csv'], tmp_path / 'merged.csv')
+    # A saída anterior só seria substituída no fim
+    assert (tmp_path / 'merged.csv').read_text() == 'anterior\n'
+    assert not any(nome.name.startswith('.merged') for nome in tmp_path.iterdir())